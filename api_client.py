@@ -0,0 +1,289 @@
+import os
+import time
+
+import requests
+
+from flow_control import AdaptiveLimiter, BackendUnavailableError, CircuitBreaker, is_unavailable_error
+from http_transport import (
+    DEFAULT_BACKOFF_BASE,
+    DEFAULT_BACKOFF_MAX,
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_READ_TIMEOUT,
+    RETRY_STATUS_CODES,
+    get_default_session,
+    send_with_retries,
+)
+from metrics import REGISTRY, span
+from prefilter import fallback_result
+from request_coalescing import BulkNotSupportedError, MicroBatcher, SingleFlight
+from result_cache import pair_key
+
+# API Configuration
+# Set NAME_MATCH_API_URL (e.g. http://127.0.0.1:8000 for `python mock_server.py`) to use another backend
+API_BASE_URL = os.environ.get(
+    "NAME_MATCH_API_URL",
+    "https://namematchbk-c2ecaaaqcjhccsbz.australiaeast-01.azurewebsites.net"
+)
+API_PATH = "/api/v1/utility/util"
+API_ENDPOINT = f"{API_BASE_URL}{API_PATH}"
+HEALTH_CHECK_TIMEOUT = 5
+BULK_SUFFIX = "/batch"
+BULK_UNSUPPORTED_STATUS_CODES = frozenset({404, 405, 501})
+
+# Sheet routing
+TRUE_DATA_SHEET = "Name Match API True Data"
+FALSE_DATA_SHEET = "Name Match API False Data"
+DEFAULT_DATA_SHEET = "Name Match API Data"
+ROUTING_CONFIDENCE_THRESHOLD = 0.8
+
+
+def build_endpoint(base_url):
+    """Build the match endpoint URL from an API base URL"""
+    return f"{base_url.rstrip('/')}{API_PATH}"
+
+
+def build_bulk_endpoint(endpoint):
+    """Build the bulk match endpoint URL from the single-pair endpoint"""
+    return f"{endpoint.rstrip('/')}{BULK_SUFFIX}"
+
+
+class MatchClient:
+    """Name matching API client.
+
+    Holds the pooled HTTP session, optional in-memory cache and persistent
+    result store, local pre-filter, request coalescing layers, adaptive
+    concurrency limiter, circuit breaker and transport settings so one
+    instance can be shared by the UI and batch workers.
+    """
+
+    def __init__(self, session=None, cache=None, prefilter=None,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT,
+                 max_retries=DEFAULT_MAX_RETRIES,
+                 backoff_base=DEFAULT_BACKOFF_BASE,
+                 backoff_max=DEFAULT_BACKOFF_MAX,
+                 single_flight=None, store=None, limiter=None, breaker=None, local_fallback=True):
+        self.session = session if session is not None else get_default_session()
+        self.cache = cache
+        self.prefilter = prefilter
+        self.store = store
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.single_flight = single_flight if single_flight is not None else SingleFlight()
+        self.limiter = limiter if limiter is not None else AdaptiveLimiter()
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        # Answer locally instead of failing when the backend is shed or the breaker is open
+        self.local_fallback = local_fallback
+        # Disabled until configured; falls back to single calls per endpoint if bulk is unsupported
+        self.micro_batcher = MicroBatcher(self.request_single, self.request_bulk)
+
+    def match(self, name1, name2, endpoint=API_ENDPOINT):
+        """Call the name matching API and return (result, error).
+
+        Safe to call from worker threads: it does not touch any Streamlit state.
+        Repeated pairs are answered from the memory cache or the persistent
+        store, when configured, with entries kept per endpoint, and flagged
+        with ``cached: True`` and their ``cache_tier``; obvious pairs are
+        decided by the pre-filter and flagged with ``prefiltered: True``.
+        Concurrent calls for the same pair share one HTTP request. If the
+        limiter sheds the call or the circuit breaker is open, a local verdict
+        flagged ``fallback: True`` is returned when ``local_fallback`` is set.
+        """
+        if self.cache is not None:
+            lookup_start = time.perf_counter()
+            cached_result = self.cache.get(name1, name2, endpoint)
+            if cached_result is not None:
+                cached_result['cached'] = True
+                cached_result['cache_tier'] = 'memory'
+                cached_result['response_time_ms'] = round((time.perf_counter() - lookup_start) * 1000, 2)
+                cached_result['connect_time_ms'] = 0.0
+                cached_result['server_time_ms'] = 0.0
+                REGISTRY.inc("match_results_total", source="memory")
+                return cached_result, None
+
+        if self.store is not None:
+            lookup_start = time.perf_counter()
+            stored_result = self.store.get(name1, name2, endpoint)
+            if stored_result is not None:
+                age_seconds = stored_result.pop('age_seconds', 0.0)
+                if self.cache is not None:
+                    self.cache.put(name1, name2, stored_result, endpoint, age_seconds=age_seconds)
+                stored_result['cached'] = True
+                stored_result['cache_tier'] = 'disk'
+                stored_result['response_time_ms'] = round((time.perf_counter() - lookup_start) * 1000, 2)
+                stored_result['connect_time_ms'] = 0.0
+                stored_result['server_time_ms'] = 0.0
+                REGISTRY.inc("match_results_total", source="disk")
+                return stored_result, None
+
+        if self.prefilter is not None:
+            decision_start = time.perf_counter()
+            local_result = self.prefilter.evaluate(name1, name2)
+            if local_result is not None:
+                local_result['response_time_ms'] = round((time.perf_counter() - decision_start) * 1000, 2)
+                local_result['connect_time_ms'] = 0.0
+                local_result['server_time_ms'] = 0.0
+                REGISTRY.inc("match_results_total", source="prefilter")
+                return local_result, None
+
+        result, error = self.single_flight.do((endpoint, pair_key(name1, name2)), self._fetch, name1, name2, endpoint)
+        if error:
+            source = "error"
+        else:
+            source = "fallback" if result.get('fallback') else "api"
+        REGISTRY.inc("match_results_total", source=source)
+        return result, error
+
+    def _fetch(self, name1, name2, endpoint):
+        result, error = self.micro_batcher.match(name1, name2, endpoint)
+        if self.local_fallback and is_unavailable_error(error):
+            # Degraded answers are never cached, so the API is asked again once it recovers
+            result = fallback_result(name1, name2)
+            result['fallback_reason'] = error
+            result['response_time_ms'] = 0.0
+            result['connect_time_ms'] = 0.0
+            result['server_time_ms'] = 0.0
+            return result, None
+        if result is not None:
+            if self.cache is not None:
+                self.cache.put(name1, name2, result, endpoint)
+            if self.store is not None:
+                self.store.put(name1, name2, result, endpoint)
+        return result, error
+
+    def _send(self, url, expected_statuses=(), track_latency=True, **kwargs):
+        """``send_with_retries`` behind the concurrency limiter and circuit breaker.
+
+        Raises ``BackendUnavailableError`` when the call is shed or rejected.
+        Connection failures, timeouts and 429/5xx responses (other than
+        ``expected_statuses``) count as failures; a retried call also tells
+        the limiter the backend is overloaded.
+        """
+        self.limiter.acquire()
+        if not self.breaker.allow():
+            self.limiter.release()
+            raise BackendUnavailableError("circuit breaker open")
+
+        response = timing = None
+        try:
+            response, timing = send_with_retries(
+                self.session,
+                url,
+                timeout=(self.connect_timeout, self.read_timeout),
+                max_retries=self.max_retries,
+                backoff_base=self.backoff_base,
+                backoff_max=self.backoff_max,
+                **kwargs
+            )
+            return response, timing
+        finally:
+            failed = response is None or (
+                response.status_code in RETRY_STATUS_CODES and response.status_code not in expected_statuses
+            )
+            self.breaker.record(not failed)
+            latency = None if failed or not track_latency else timing['connect_ms'] + timing['server_ms']
+            self.limiter.release(latency, overloaded=failed or timing['attempts'] > 1)
+
+    def request_single(self, name1, name2, endpoint=API_ENDPOINT):
+        """Send one pair to the match endpoint, bypassing cache and pre-filter"""
+        try:
+            params = {
+                "name1": name1,
+                "name2": name2
+            }
+
+            headers = {
+                "accept": "application/json"
+            }
+
+            with span("http_request"):
+                response, timing = self._send(endpoint, params=params, headers=headers)
+
+            if response.status_code == 200:
+                with span("json_decode"):
+                    result = response.json()
+                result['response_time_ms'] = timing['total_ms']
+                result['connect_time_ms'] = timing['connect_ms']
+                result['server_time_ms'] = timing['server_ms']
+                result['attempts'] = timing['attempts']
+                return result, None
+            else:
+                return None, f"API Error: {response.status_code} - {response.text}"
+
+        except requests.exceptions.ConnectionError:
+            return None, f"Connection Error: Could not connect to API at {endpoint}. Make sure your API server is running."
+        except BackendUnavailableError as e:
+            return None, str(e)
+        except requests.exceptions.Timeout:
+            return None, f"Timeout Error: API at {endpoint} did not respond in time."
+        except Exception as e:
+            return None, f"Error: {str(e)}"
+
+    def request_bulk(self, pairs, endpoint=API_ENDPOINT):
+        """POST many pairs to the bulk endpoint and return (results, error).
+
+        The request body is ``{"pairs": [{"name1": ..., "name2": ...}]}`` and
+        the response ``{"results": [...]}`` in the same order. Raises
+        ``BulkNotSupportedError`` if the backend has no bulk endpoint.
+        """
+        try:
+            # Bulk latency grows with batch size, so it is not a congestion signal
+            with span("http_bulk_request"):
+                response, timing = self._send(
+                    build_bulk_endpoint(endpoint),
+                    expected_statuses=BULK_UNSUPPORTED_STATUS_CODES,
+                    track_latency=False,
+                    method="POST",
+                    json={"pairs": [{"name1": name1, "name2": name2} for name1, name2 in pairs]}
+                )
+        except BackendUnavailableError as e:
+            return None, str(e)
+        except requests.exceptions.ConnectionError:
+            return None, f"Connection Error: Could not connect to API at {endpoint}. Make sure your API server is running."
+        except requests.exceptions.Timeout:
+            return None, f"Timeout Error: API at {endpoint} did not respond in time."
+
+        if response.status_code in BULK_UNSUPPORTED_STATUS_CODES:
+            raise BulkNotSupportedError(endpoint)
+        if response.status_code != 200:
+            return None, f"API Error: {response.status_code} - {response.text}"
+
+        with span("json_decode"):
+            results = response.json().get('results', [])
+        if len(results) != len(pairs):
+            return None, f"API Error: bulk response returned {len(results)} results for {len(pairs)} pairs"
+        for result in results:
+            result['response_time_ms'] = timing['total_ms']
+            result['connect_time_ms'] = timing['connect_ms']
+            result['server_time_ms'] = timing['server_ms']
+            result['attempts'] = timing['attempts']
+            result['batch_size'] = len(pairs)
+        return results, None
+
+    def check_health(self, base_url, timeout=HEALTH_CHECK_TIMEOUT):
+        """GET the /health endpoint once, without retries, and return the response"""
+        with span("health_check"):
+            response, _ = send_with_retries(
+                self.session,
+                f"{base_url.rstrip('/')}/health",
+                timeout=(self.connect_timeout, timeout),
+                max_retries=0
+            )
+        return response
+
+
+def get_sheet_routing(result):
+    """Return (sheet_name, sheet_color, sheet_icon) for an API result"""
+    is_match = result.get('is_match') == 'yes'
+    confidence = result.get('confidence_score', 0.0)
+
+    if is_match and confidence >= ROUTING_CONFIDENCE_THRESHOLD:
+        return TRUE_DATA_SHEET, "green", "✅"
+    elif not is_match and confidence < ROUTING_CONFIDENCE_THRESHOLD:
+        return FALSE_DATA_SHEET, "red", "❌"
+    else:
+        return DEFAULT_DATA_SHEET, "orange", "📊"
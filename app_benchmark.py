@@ -0,0 +1,173 @@
+"""Startup and rerun timing for the Streamlit app.
+
+Each sample runs the app in a fresh interpreter through Streamlit's
+AppTest harness against the local stand-in server and records:
+
+- cold start: interpreter launch to the end of the first script run
+- first run: the first script run alone (imports, cached resources)
+- rerun: a full script rerun with nothing to do
+- compare: a full rerun that compares one pair
+- compare fragment: the compare section alone, which is all a compare
+  click re-executes in the browser since it is an ``st.fragment``
+
+    python app_benchmark.py --samples 5 --output startup.json
+    python app_benchmark.py --compare startup.json --max-regression 0.25
+
+Exits non-zero if the app raised, or if its first run imported any of
+``HEAVY_MODULES``: those belong behind the features that need them.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "streamlit_app.py")
+DEFAULT_SAMPLES = 3
+DEFAULT_RERUNS = 10
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl")
+TIMING_KEYS = ('cold_start_ms', 'first_run_ms', 'rerun_ms', 'compare_ms', 'compare_fragment_ms')
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+def measure_app(reruns=DEFAULT_RERUNS, launched_at=None):
+    """Time one app session in this process; meant to run in a fresh interpreter"""
+    launched_at = launched_at if launched_at is not None else time.time()
+    from streamlit.testing.v1 import AppTest
+
+    start = time.perf_counter()
+    app = AppTest.from_file(APP_PATH, default_timeout=60).run()
+    first_run = time.perf_counter() - start
+    cold_start = time.time() - launched_at
+    loaded_after_first_run = [name for name in HEAVY_MODULES if name in sys.modules]
+    errors = [str(exception.message) for exception in app.exception]
+
+    next(box for box in app.sidebar.checkbox if box.label == "Use local stand-in server").check().run()
+
+    rerun_times = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        app.run()
+        rerun_times.append(time.perf_counter() - start)
+
+    from metrics import REGISTRY
+
+    compare_times = []
+    for index in range(reruns):
+        app.text_input(key="input_name1").input(f"John Smith {index}")
+        app.text_input(key="input_name2").input(f"Jon Smith {index}")
+        start = time.perf_counter()
+        next(button for button in app.button if button.label.startswith("🚀")).click().run()
+        compare_times.append(time.perf_counter() - start)
+    errors += [str(exception.message) for exception in app.exception]
+
+    fragment = next(
+        (summary for labels, summary in REGISTRY.snapshot("span_seconds").items()
+         if dict(labels)['span'] == "compare_fragment"),
+        {'mean': 0.0}
+    )
+    return {
+        'cold_start_ms': _ms(cold_start),
+        'first_run_ms': _ms(first_run),
+        'rerun_ms': _ms(statistics.median(rerun_times)),
+        'compare_ms': _ms(statistics.median(compare_times)),
+        'compare_fragment_ms': _ms(fragment['mean']),
+        'heavy_modules_at_startup': loaded_after_first_run,
+        'errors': errors,
+    }
+
+
+def run_sample(reruns=DEFAULT_RERUNS):
+    """Measure one session in a child interpreter and return its result dict"""
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ, NAME_MATCH_STORE_PATH=os.path.join(workdir, "results.db"))
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", "--reruns", str(reruns),
+             "--launched-at", repr(time.time())],
+            cwd=workdir, env=env, capture_output=True, text=True, check=True
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run_app_benchmark(samples=DEFAULT_SAMPLES, reruns=DEFAULT_RERUNS):
+    """Median timings over ``samples`` fresh interpreters"""
+    results = [run_sample(reruns) for _ in range(samples)]
+    report = {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'config': {'samples': samples, 'reruns': reruns, 'python': sys.version.split()[0]},
+        'heavy_modules_at_startup': sorted({name for result in results for name in result['heavy_modules_at_startup']}),
+        'errors': [error for result in results for error in result['errors']],
+        'samples': results,
+    }
+    for key in TIMING_KEYS:
+        report[key] = round(statistics.median(result[key] for result in results), 2)
+    return report
+
+
+def compare_app_reports(baseline, current):
+    """Relative change of each timing; positive means slower"""
+    return {
+        key: round((current[key] - baseline[key]) / baseline[key], 4) if baseline.get(key) else None
+        for key in TIMING_KEYS
+    }
+
+
+def format_app_report(report):
+    lines = [f"{key.replace('_ms', '').replace('_', ' ')}: {report[key]} ms" for key in TIMING_KEYS]
+    heavy = ", ".join(report['heavy_modules_at_startup']) or "none"
+    lines.append(f"heavy modules loaded by first run: {heavy}")
+    if report['errors']:
+        lines.append(f"app errors: {len(report['errors'])}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure Streamlit app startup and rerun time")
+    parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES, help="Fresh interpreters to measure")
+    parser.add_argument("--reruns", type=int, default=DEFAULT_RERUNS, help="Reruns and compares per sample")
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    parser.add_argument("--compare", help="Baseline JSON report to compare against")
+    parser.add_argument("--max-regression", type=float,
+                        help="Exit non-zero if cold start regresses by more than this fraction vs --compare")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--launched-at", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure_app(args.reruns, args.launched_at)))
+        return 0
+
+    report = run_app_benchmark(args.samples, args.reruns)
+    print(format_app_report(report))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+    status = 1 if report['errors'] else 0
+    if report['heavy_modules_at_startup']:
+        print("The first run must not import heavy modules; load them where they are used")
+        status = 1
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        comparison = compare_app_reports(baseline, report)
+        print("Change vs baseline:")
+        for key, value in comparison.items():
+            print(f"  {key}: n/a" if value is None else f"  {key}: {value:+.2%}")
+        regression = comparison['cold_start_ms']
+        if args.max_regression is not None and regression is not None and regression > args.max_regression:
+            print(f"Cold start regressed by more than {args.max_regression:.0%}")
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
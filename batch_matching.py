@@ -0,0 +1,117 @@
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from api_client import API_ENDPOINT, MatchClient, get_sheet_routing
+
+DEFAULT_MAX_WORKERS = 8
+MAX_WORKERS_LIMIT = 64
+# Legacy .xls workbooks would need xlrd; only .xlsx is read (by openpyxl)
+UPLOAD_TYPES = ["csv", "xlsx"]
+
+RESULT_COLUMNS = [
+    'name1', 'name2', 'is_match', 'confidence_score', 'reason',
+    'sheet_name', 'response_time_ms', 'connect_time_ms', 'server_time_ms',
+    'cached', 'prefiltered', 'fallback', 'error'
+]
+
+
+def load_pairs(uploaded_file):
+    """Read a CSV or Excel upload with name1/name2 columns into a list of pairs"""
+    # pandas is imported on first use so the app can start without it
+    import pandas as pd
+
+    filename = getattr(uploaded_file, 'name', str(uploaded_file)).lower()
+    if filename.endswith('.xlsx'):
+        df = pd.read_excel(uploaded_file, dtype=str)
+    else:
+        df = pd.read_csv(uploaded_file, dtype=str)
+
+    # Column names are matched case-insensitively
+    columns = {str(column).strip().lower(): column for column in df.columns}
+    if 'name1' not in columns or 'name2' not in columns:
+        raise ValueError("File must contain 'name1' and 'name2' columns")
+
+    df = df[[columns['name1'], columns['name2']]].fillna('')
+    return [(str(name1).strip(), str(name2).strip()) for name1, name2 in df.itertuples(index=False)]
+
+
+def match_row(name1, name2, endpoint=API_ENDPOINT, client=None):
+    """Match a single pair and flatten the outcome into a result row"""
+    row = {'name1': name1, 'name2': name2}
+    if not name1 or not name2:
+        row['error'] = "Missing name"
+        return row
+
+    client = client if client is not None else MatchClient()
+    result, error = client.match(name1, name2, endpoint)
+    if error:
+        row['error'] = error
+        return row
+    return result_to_row(name1, name2, result)
+
+
+def result_to_row(name1, name2, result):
+    """Flatten an API result into a result row with its routing sheet"""
+    row = {'name1': name1, 'name2': name2}
+    row['is_match'] = result.get('is_match', 'no')
+    row['confidence_score'] = result.get('confidence_score', 0.0)
+    row['reason'] = result.get('reason', '')
+    row['sheet_name'] = get_sheet_routing(result)[0]
+    row['response_time_ms'] = result.get('response_time_ms', 0)
+    row['connect_time_ms'] = result.get('connect_time_ms', 0)
+    row['server_time_ms'] = result.get('server_time_ms', 0)
+    row['cached'] = result.get('cached', False)
+    row['prefiltered'] = result.get('prefiltered', False)
+    row['fallback'] = result.get('fallback', False)
+    return row
+
+
+def run_batch(pairs, endpoint=API_ENDPOINT, max_workers=DEFAULT_MAX_WORKERS, progress_callback=None, client=None):
+    """Match all pairs through a bounded thread pool.
+
+    Results are returned in input order. ``progress_callback(done, total, elapsed)``
+    is invoked from the calling thread after every completed pair, so it may
+    safely update Streamlit elements.
+    """
+    max_workers = max(1, min(int(max_workers), MAX_WORKERS_LIMIT))
+    client = client if client is not None else MatchClient()
+    total = len(pairs)
+    results = [None] * total
+    start_time = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch-match") as executor:
+        futures = {
+            executor.submit(match_row, name1, name2, endpoint, client): index
+            for index, (name1, name2) in enumerate(pairs)
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            index = futures[future]
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                name1, name2 = pairs[index]
+                results[index] = {'name1': name1, 'name2': name2, 'error': f"Error: {str(e)}"}
+            if progress_callback:
+                progress_callback(done, total, time.perf_counter() - start_time)
+
+    return results
+
+
+def results_to_dataframe(results):
+    """Build a results DataFrame with a stable column order"""
+    import pandas as pd
+
+    return pd.DataFrame(results, columns=RESULT_COLUMNS)
+
+
+def results_to_csv(results):
+    """Serialize batch results to CSV bytes for download"""
+    return results_to_dataframe(results).to_csv(index=False).encode('utf-8')
+
+
+def results_to_excel(results):
+    """Serialize batch results to XLSX bytes for download"""
+    buffer = io.BytesIO()
+    results_to_dataframe(results).to_excel(buffer, index=False, sheet_name="Results")
+    return buffer.getvalue()
@@ -0,0 +1,305 @@
+"""Load test and latency benchmark for the name matching endpoint.
+
+Replays a pair corpus at a fixed concurrency (closed loop) or target QPS
+(open loop) and writes a JSON report:
+
+    python benchmark.py --local --requests 2000 --concurrency 16 --output bench.json
+    python benchmark.py --url https://... --corpus pairs.csv --qps 50 --duration 60
+    python benchmark.py --local --compare bench.json
+    python benchmark.py --local --mock-latency-ms 30 --mock-error-rate 0.05 --cache
+    python benchmark.py --local --mock-rate-limit 300 --concurrency 64 --adaptive
+"""
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from api_client import API_BASE_URL, MatchClient, build_endpoint
+from flow_control import AdaptiveLimiter, CircuitBreaker
+from http_transport import create_session
+from metrics import LatencyHistogram
+from mock_server import add_server_arguments, server_options, start_server
+from prefilter import PreFilter
+from result_cache import ResultCache
+
+DEFAULT_BENCH_REQUESTS = 1000
+DEFAULT_BENCH_CONCURRENCY = 8
+DEFAULT_CORPUS_SIZE = 200
+DEFAULT_REPEAT_RATIO = 0.3
+
+_FIRST_NAMES = [
+    "John", "Jon", "Michael", "Mike", "Elizabeth", "Liz", "William", "Bill", "Robert", "Bob",
+    "Alice", "Alicia", "Katherine", "Kate", "José", "Jose", "Mohammed", "Muhammad", "Anne", "Ann",
+]
+_LAST_NAMES = [
+    "Smith", "Smyth", "Johnson", "Jonson", "Williams", "Brown", "Nguyen", "Garcia", "Müller",
+    "Mueller", "O'Brien", "Obrien", "Ajayi", "Okafor", "Wilson", "Taylor",
+]
+
+
+def generate_corpus(size=DEFAULT_CORPUS_SIZE, seed=0):
+    """Deterministic synthetic corpus of name pairs with realistic variants"""
+    rng = random.Random(seed)
+    pairs = []
+    for _ in range(size):
+        first1, last1 = rng.choice(_FIRST_NAMES), rng.choice(_LAST_NAMES)
+        roll = rng.random()
+        if roll < 0.3:
+            pair = (f"{first1} {last1}", f"{first1.upper()} {last1}")
+        elif roll < 0.6:
+            pair = (f"{first1} {last1}", f"{rng.choice(_FIRST_NAMES)} {last1}")
+        else:
+            pair = (f"{first1} {last1}", f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}")
+        pairs.append(pair)
+    return pairs
+
+
+def load_corpus(path):
+    """Load name pairs from a CSV or Excel file with name1/name2 columns"""
+    from streaming_pipeline import iter_pairs
+
+    return [(name1, name2) for name1, name2 in iter_pairs(path) if name1 and name2]
+
+
+def build_replay(corpus, total, repeat_ratio=DEFAULT_REPEAT_RATIO, seed=0):
+    """Yield ``total`` pairs, re-issuing earlier pairs at ``repeat_ratio`` to exercise caching"""
+    rng = random.Random(seed)
+    issued = []
+    source = itertools.cycle(corpus)
+    for _ in range(total):
+        if issued and rng.random() < repeat_ratio:
+            yield rng.choice(issued)
+        else:
+            pair = next(source)
+            issued.append(pair)
+            yield pair
+
+
+def run_benchmark(client, endpoint, corpus, total_requests=DEFAULT_BENCH_REQUESTS,
+                  concurrency=DEFAULT_BENCH_CONCURRENCY, qps=None, duration=None,
+                  repeat_ratio=DEFAULT_REPEAT_RATIO):
+    """Replay ``corpus`` against ``endpoint`` and return a report dict.
+
+    Without ``qps`` the run is closed loop: ``concurrency`` workers issue the
+    next request as soon as the previous one finishes. With ``qps`` the run
+    is open loop: requests are scheduled at a fixed rate and latency is
+    measured from the scheduled start, so queueing delay is not hidden
+    (coordinated omission). ``duration`` in seconds caps the run.
+    """
+    histogram = LatencyHistogram()
+    counters = defaultdict(int)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    replay = build_replay(corpus, total_requests, repeat_ratio)
+    replay_lock = threading.Lock()
+    start_time = time.perf_counter()
+    deadline = start_time + duration if duration else None
+
+    def execute(name1, name2, scheduled_at):
+        result, error = client.match(name1, name2, endpoint)
+        latency_ms = (time.perf_counter() - scheduled_at) * 1000
+        histogram.record(latency_ms)
+        with lock:
+            counters['completed'] += 1
+            if error:
+                errors[error.split(':', 1)[0]] += 1
+            else:
+                counters['cache_hits'] += bool(result.get('cached'))
+                counters['prefiltered'] += bool(result.get('prefiltered'))
+                counters['matches'] += result.get('is_match') == 'yes'
+
+    def next_pair():
+        with replay_lock:
+            if deadline and time.perf_counter() >= deadline:
+                return None
+            return next(replay, None)
+
+    if qps:
+        interval = 1.0 / qps
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench") as executor:
+            for index in itertools.count():
+                pair = next_pair()
+                if pair is None:
+                    break
+                scheduled_at = start_time + index * interval
+                delay = scheduled_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(execute, pair[0], pair[1], scheduled_at)
+    else:
+        def worker():
+            while True:
+                pair = next_pair()
+                if pair is None:
+                    return
+                execute(pair[0], pair[1], time.perf_counter())
+
+        threads = [threading.Thread(target=worker, name=f"bench-{i}", daemon=True) for i in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    elapsed = time.perf_counter() - start_time
+    completed = counters['completed']
+    error_count = sum(errors.values())
+    successes = completed - error_count
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'config': {
+            'endpoint': endpoint,
+            'mode': "open-loop" if qps else "closed-loop",
+            'target_qps': qps,
+            'concurrency': concurrency,
+            'requests': total_requests,
+            'duration_limit_s': duration,
+            'repeat_ratio': repeat_ratio,
+            'corpus_size': len(corpus),
+            'cache': client.cache is not None,
+            'prefilter': client.prefilter is not None,
+            'adaptive': client.limiter.enabled,
+        },
+        'elapsed_s': round(elapsed, 3),
+        'completed': completed,
+        'throughput_rps': round(completed / elapsed, 2) if elapsed > 0 else 0.0,
+        'error_count': error_count,
+        'error_rate': round(error_count / completed, 4) if completed else 0.0,
+        'errors': dict(errors),
+        'cache_hits': counters['cache_hits'],
+        'cache_hit_rate': round(counters['cache_hits'] / successes, 4) if successes else 0.0,
+        'prefiltered': counters['prefiltered'],
+        'match_rate': round(counters['matches'] / successes, 4) if successes else 0.0,
+        'latency_ms': histogram.summary(),
+        'histogram': histogram.to_dict(),
+        'flow_control': {'limiter': client.limiter.stats(), 'breaker': client.breaker.stats()},
+    }
+
+
+def build_benchmark_client(session=None, use_cache=False, use_prefilter=False, max_retries=0, adaptive=False):
+    """Client for benchmarking with a fresh cache so runs do not influence each other.
+
+    Flow control is off unless ``adaptive`` is set, so by default the
+    backend sees exactly the requested concurrency. Shed calls are reported
+    as errors rather than answered locally.
+    """
+    return MatchClient(
+        session=session if session is not None else create_session(),
+        cache=ResultCache() if use_cache else None,
+        prefilter=PreFilter() if use_prefilter else None,
+        max_retries=max_retries,
+        limiter=AdaptiveLimiter(enabled=adaptive),
+        breaker=CircuitBreaker(enabled=adaptive),
+        local_fallback=False
+    )
+
+
+def compare_reports(baseline, current):
+    """Relative change of the headline numbers between two reports"""
+    def delta(old, new):
+        return round((new - old) / old, 4) if old else None
+
+    comparison = {
+        'throughput_rps': delta(baseline['throughput_rps'], current['throughput_rps']),
+        'error_rate': round(current['error_rate'] - baseline['error_rate'], 4),
+    }
+    for key, value in current['latency_ms'].items():
+        comparison[f"latency_{key}"] = delta(baseline['latency_ms'].get(key, 0), value)
+    return comparison
+
+
+def format_report(report):
+    latency = report['latency_ms']
+    return (
+        f"{report['completed']} requests in {report['elapsed_s']}s "
+        f"({report['throughput_rps']} req/s, {report['config']['mode']}, "
+        f"concurrency {report['config']['concurrency']})\n"
+        f"latency ms: p50 {latency['p50']}  p90 {latency['p90']}  p99 {latency['p99']}  "
+        f"p99.9 {latency['p99.9']}  max {latency['max']}\n"
+        f"errors: {report['error_count']} ({report['error_rate']:.2%})  "
+        f"cache hits: {report['cache_hits']} ({report['cache_hit_rate']:.2%})  "
+        f"prefiltered: {report['prefiltered']}"
+    ) + _format_flow_control(report)
+
+
+def _format_flow_control(report):
+    if not report['config'].get('adaptive'):
+        return ""
+    limiter = report['flow_control']['limiter']
+    breaker = report['flow_control']['breaker']
+    return (
+        f"\nflow control: limit {limiter['limit']} (peak in flight {limiter['peak_in_flight']})  "
+        f"shed {limiter['shed']}  breaker {breaker['state']} ({breaker['trips']} trips, {breaker['rejected']} rejected)"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the name matching API")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", default=API_BASE_URL, help="API base URL")
+    target.add_argument("--local", action="store_true", help="Start the local stand-in server and benchmark it")
+    add_server_arguments(parser, prefix="mock-")
+    parser.add_argument("--corpus", help="CSV/Excel file with name1,name2 columns (default: synthetic corpus)")
+    parser.add_argument("--corpus-size", type=int, default=DEFAULT_CORPUS_SIZE)
+    parser.add_argument("--requests", type=int, default=DEFAULT_BENCH_REQUESTS)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_BENCH_CONCURRENCY)
+    parser.add_argument("--qps", type=float, help="Target request rate (open loop); default is closed loop")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds")
+    parser.add_argument("--repeat-ratio", type=float, default=DEFAULT_REPEAT_RATIO,
+                        help="Fraction of requests that repeat an earlier pair")
+    parser.add_argument("--cache", action="store_true", help="Enable the client result cache")
+    parser.add_argument("--prefilter", action="store_true", help="Enable the local pre-filter")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Enable the adaptive concurrency limit and circuit breaker")
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    parser.add_argument("--compare", help="Baseline JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    server = None
+    base_url = args.url
+    if args.local:
+        server = start_server(**server_options(args, prefix="mock-"))
+        base_url = server.base_url
+
+    corpus = load_corpus(args.corpus) if args.corpus else generate_corpus(args.corpus_size)
+    client = build_benchmark_client(use_cache=args.cache, use_prefilter=args.prefilter, adaptive=args.adaptive)
+    try:
+        report = run_benchmark(
+            client,
+            build_endpoint(base_url),
+            corpus,
+            total_requests=args.requests,
+            concurrency=args.concurrency,
+            qps=args.qps,
+            duration=args.duration,
+            repeat_ratio=args.repeat_ratio
+        )
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    print(format_report(report))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print("Change vs baseline:")
+        for key, value in compare_reports(baseline, report).items():
+            if value is None:
+                print(f"  {key}: n/a")
+            elif key == 'error_rate':
+                print(f"  {key}: {value:+.4f}")
+            else:
+                print(f"  {key}: {value:+.2%}")
+    return 1 if report['completed'] and report['error_rate'] == 1.0 else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
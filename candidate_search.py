@@ -0,0 +1,278 @@
+import heapq
+import threading
+from array import array
+from collections import Counter, defaultdict
+
+from name_tables import canonical_token, strip_honorifics
+from prefilter import normalize_for_matching
+
+DEFAULT_TOP_K = 10
+DEFAULT_NGRAM_SIZE = 3
+# N-grams carried by more than this share of records (and at least
+# MIN_STOP_POSTINGS of them) are too common to discriminate and are skipped
+DEFAULT_MAX_POSTING_FRACTION = 0.02
+MIN_STOP_POSTINGS = 200
+KEY_MATCH_BONUS = 0.5
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"),
+    **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"),
+    "l": "4",
+    **dict.fromkeys("mn", "5"),
+    "r": "6",
+}
+
+
+def soundex(token):
+    """American Soundex code of a single token, e.g. ``robert`` -> ``R163``"""
+    letters = [ch for ch in token.lower() if "a" <= ch <= "z"]
+    if not letters:
+        return ""
+    code = [letters[0].upper()]
+    previous = _SOUNDEX_CODES.get(letters[0], "")
+    for ch in letters[1:]:
+        digit = _SOUNDEX_CODES.get(ch, "")
+        if digit and digit != previous:
+            code.append(digit)
+            if len(code) == 4:
+                break
+        # h and w do not separate letters with the same code; vowels do
+        if ch not in "hw":
+            previous = digit
+    return "".join(code).ljust(4, "0")
+
+
+def blocking_keys(normalized):
+    """Exact-match blocking keys for a normalized name.
+
+    The sorted-token key groups reordered names ("smith john" / "john smith");
+    the canonical key groups known nicknames and aliases ("mike" / "michael");
+    the phonetic key groups spelling variants that sound alike. Titles and
+    credentials are left out of all of them.
+    """
+    tokens = strip_honorifics(normalized.split())
+    if not tokens:
+        return []
+    keys = ["tok:" + " ".join(sorted(tokens))]
+    keys.append("can:" + " ".join(sorted(canonical_token(token) for token in tokens)))
+    codes = sorted(filter(None, (soundex(token) for token in tokens)))
+    if codes:
+        keys.append("snd:" + " ".join(codes))
+    return keys
+
+
+def char_ngrams(normalized, size=DEFAULT_NGRAM_SIZE):
+    """Set of padded character n-grams of a normalized name"""
+    padded = f" {normalized} "
+    if len(padded) <= size:
+        return {padded}
+    return {padded[i:i + size] for i in range(len(padded) - size + 1)}
+
+
+class BlockingIndex:
+    """In-memory blocking index over a list of names.
+
+    Each record is indexed under its blocking keys and in an inverted list per
+    character n-gram. A query only touches the posting lists of its own keys
+    and n-grams, so finding candidates costs roughly the size of those lists
+    instead of a scan of every record.
+    """
+
+    def __init__(self, ngram_size=DEFAULT_NGRAM_SIZE, max_posting_fraction=DEFAULT_MAX_POSTING_FRACTION):
+        self.ngram_size = ngram_size
+        self.max_posting_fraction = max_posting_fraction
+        self.names = []
+        self._ngram_counts = array('H')
+        self._keys = defaultdict(lambda: array('I'))
+        self._postings = defaultdict(lambda: array('I'))
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.candidates_returned = 0
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name):
+        """Index a name and return its record id"""
+        normalized = normalize_for_matching(name)
+        grams = char_ngrams(normalized, self.ngram_size)
+        record_id = len(self.names)
+        self.names.append(str(name))
+        self._ngram_counts.append(min(len(grams), 0xFFFF))
+        for key in blocking_keys(normalized):
+            self._keys[key].append(record_id)
+        for gram in grams:
+            self._postings[gram].append(record_id)
+        return record_id
+
+    @classmethod
+    def build(cls, names, **options):
+        index = cls(**options)
+        for name in names:
+            index.add(name)
+        return index
+
+    def _stop_limit(self):
+        return max(MIN_STOP_POSTINGS, int(self.max_posting_fraction * len(self.names)))
+
+    def candidates(self, name, k=DEFAULT_TOP_K, exclude=None):
+        """Return up to ``k`` ``(record_id, name, block_score)`` tuples, best first.
+
+        ``block_score`` is the n-gram Jaccard similarity plus a bonus for
+        sharing a blocking key; it only ranks candidates and is not a match
+        decision.
+        """
+        normalized = normalize_for_matching(name)
+        grams = char_ngrams(normalized, self.ngram_size)
+        overlap = Counter()
+        limit = self._stop_limit()
+        postings = [self._postings[gram] for gram in grams if gram in self._postings]
+        selective = [ids for ids in postings if len(ids) <= limit]
+        # A name made only of common n-grams falls back to its rarest lists
+        if not selective and postings:
+            selective = sorted(postings, key=len)[:2]
+        for ids in selective:
+            overlap.update(ids)
+
+        keyed = set()
+        for key in blocking_keys(normalized):
+            keyed.update(self._keys.get(key, ()))
+
+        query_size = len(grams)
+        counts = self._ngram_counts
+        scored = []
+        for record_id in set(overlap) | keyed:
+            if record_id == exclude:
+                continue
+            shared = overlap.get(record_id, 0)
+            score = shared / (query_size + counts[record_id] - shared)
+            if record_id in keyed:
+                score += KEY_MATCH_BONUS
+            scored.append((score, record_id))
+
+        top = heapq.nlargest(k, scored)
+        with self._lock:
+            self.queries += 1
+            self.candidates_returned += len(top)
+        return [(record_id, self.names[record_id], round(score, 4)) for score, record_id in top]
+
+    def candidate_pairs(self, k=DEFAULT_TOP_K, progress_callback=None):
+        """Unique ``(id1, id2)`` candidate pairs for deduplicating the indexed names"""
+        pairs = set()
+        total = len(self.names)
+        for record_id, name in enumerate(self.names):
+            for other_id, _, _ in self.candidates(name, k=k, exclude=record_id):
+                pairs.add((min(record_id, other_id), max(record_id, other_id)))
+            if progress_callback and (record_id + 1) % 500 == 0:
+                progress_callback(record_id + 1, total)
+        if progress_callback:
+            progress_callback(total, total)
+        return sorted(pairs)
+
+    def stats(self):
+        limit = self._stop_limit()
+        return {
+            'records': len(self.names),
+            'blocking_keys': len(self._keys),
+            'ngrams': len(self._postings),
+            'stop_ngrams': sum(1 for ids in self._postings.values() if len(ids) > limit),
+            'queries': self.queries,
+            'mean_candidates': self.candidates_returned / self.queries if self.queries else 0.0,
+        }
+
+
+def reduction_ratio(candidate_count, query_count, record_count, dedup=False):
+    """Share of the exhaustive comparisons that blocking avoided"""
+    total = record_count * (record_count - 1) / 2 if dedup else query_count * record_count
+    return 1 - candidate_count / total if total else 0.0
+
+
+def cluster_duplicates(matched_pairs):
+    """Group matched ``(id1, id2)`` pairs into duplicate clusters (union-find)"""
+    parent = {}
+
+    def find(item):
+        parent.setdefault(item, item)
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    for id1, id2 in matched_pairs:
+        root1, root2 = find(id1), find(id2)
+        if root1 != root2:
+            parent[max(root1, root2)] = min(root1, root2)
+
+    clusters = defaultdict(list)
+    for item in parent:
+        clusters[find(item)].append(item)
+    return sorted((sorted(members) for members in clusters.values()), key=lambda members: (-len(members), members[0]))
+
+
+def evaluate_blocking(labeled_pairs, k=DEFAULT_TOP_K, index=None):
+    """Measure blocking quality on a labeled sample of ``(name1, name2, is_match)``.
+
+    Every ``name2`` not already present is indexed (into ``index`` if one is
+    given, so the sample competes with the real list) and each ``name1`` is
+    queried. Recall is the share of true matches whose partner shows up in
+    the top ``k``.
+    """
+    index = index if index is not None else BlockingIndex()
+    indexed = {normalize_for_matching(name) for name in index.names}
+    for _, name2, _ in labeled_pairs:
+        normalized = normalize_for_matching(name2)
+        if normalized not in indexed:
+            indexed.add(normalized)
+            index.add(name2)
+
+    positives = found = candidate_count = 0
+    for name1, name2, is_match in labeled_pairs:
+        candidates = index.candidates(name1, k=k)
+        candidate_count += len(candidates)
+        if is_match:
+            positives += 1
+            target = normalize_for_matching(name2)
+            found += any(normalize_for_matching(name) == target for _, name, _ in candidates)
+    return {
+        'pairs': len(labeled_pairs),
+        'positives': positives,
+        'found': found,
+        'recall': found / positives if positives else 0.0,
+        'reduction_ratio': reduction_ratio(candidate_count, len(labeled_pairs), len(index)),
+        'k': k,
+    }
+
+
+def _read_table(uploaded_file):
+    import pandas as pd
+
+    filename = getattr(uploaded_file, 'name', str(uploaded_file)).lower()
+    if filename.endswith('.xlsx'):
+        df = pd.read_excel(uploaded_file, dtype=str)
+    else:
+        df = pd.read_csv(uploaded_file, dtype=str)
+    columns = {str(column).strip().lower(): column for column in df.columns}
+    return df, columns
+
+
+def load_names(uploaded_file):
+    """Read the ``name`` column (or the first column) of a CSV or Excel upload"""
+    df, columns = _read_table(uploaded_file)
+    if df.empty:
+        return []
+    column = columns.get('name', df.columns[0])
+    return [name.strip() for name in df[column].fillna('') if name.strip()]
+
+
+def load_labeled_pairs(uploaded_file):
+    """Read name1/name2/is_match rows; is_match accepts yes/no, true/false or 1/0"""
+    df, columns = _read_table(uploaded_file)
+    missing = [column for column in ('name1', 'name2', 'is_match') if column not in columns]
+    if missing:
+        raise ValueError(f"File must contain {', '.join(repr(column) for column in missing)} columns")
+    df = df[[columns['name1'], columns['name2'], columns['is_match']]].fillna('')
+    return [
+        (str(name1).strip(), str(name2).strip(), str(label).strip().lower() in ("yes", "true", "1", "y"))
+        for name1, name2, label in df.itertuples(index=False)
+    ]
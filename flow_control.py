@@ -0,0 +1,266 @@
+import threading
+import time
+from collections import deque
+
+DEFAULT_INITIAL_LIMIT = 8
+DEFAULT_MIN_LIMIT = 1
+DEFAULT_MAX_LIMIT = 64
+DEFAULT_BACKOFF_RATIO = 0.7
+DEFAULT_LATENCY_TOLERANCE = 2.0  # recent vs. long-term latency that counts as congestion
+SHORT_LATENCY_WEIGHT = 0.2
+LONG_LATENCY_WEIGHT = 0.02
+DEFAULT_QUEUE_TIMEOUT = 10.0  # seconds a call may wait for a slot before being shed
+DEFAULT_MAX_QUEUE = 256
+
+DEFAULT_FAILURE_RATE_THRESHOLD = 0.5
+DEFAULT_MIN_CALLS = 20
+DEFAULT_WINDOW_SECONDS = 30.0
+DEFAULT_OPEN_SECONDS = 15.0
+DEFAULT_HALF_OPEN_PROBES = 3
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half-open"
+
+UNAVAILABLE_PREFIX = "Backend unavailable"
+
+
+class BackendUnavailableError(Exception):
+    """Raised when a call is shed by the limiter or rejected by an open breaker"""
+
+    def __init__(self, reason):
+        super().__init__(f"{UNAVAILABLE_PREFIX}: {reason}")
+
+
+def is_unavailable_error(error):
+    """True if an error string came from ``BackendUnavailableError``"""
+    return bool(error) and error.startswith(UNAVAILABLE_PREFIX)
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit for calls to the match backend.
+
+    Every successful call grows the limit by ``1 / limit`` (about one slot per
+    round trip at full load). A failure, a retried call, or recent average
+    latency above ``latency_tolerance`` times the long-term average shrinks it
+    by ``backoff_ratio``, at most once per round trip so one burst of slow
+    responses does not collapse the limit. Callers beyond the limit wait for a slot and are
+    shed after ``queue_timeout`` seconds or when ``max_queue`` are waiting.
+    """
+
+    def __init__(self, initial_limit=DEFAULT_INITIAL_LIMIT, min_limit=DEFAULT_MIN_LIMIT,
+                 max_limit=DEFAULT_MAX_LIMIT, backoff_ratio=DEFAULT_BACKOFF_RATIO,
+                 latency_tolerance=DEFAULT_LATENCY_TOLERANCE, queue_timeout=DEFAULT_QUEUE_TIMEOUT,
+                 max_queue=DEFAULT_MAX_QUEUE, enabled=True):
+        self._cond = threading.Condition()
+        self.enabled = enabled
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self.queue_timeout = queue_timeout
+        self.max_queue = max_queue
+        self._limit = float(initial_limit)
+        self._baseline = None
+        self._recent = None
+        self._last_decrease = 0.0
+        self.in_flight = 0
+        self.waiting = 0
+        self.peak_in_flight = 0
+        self.shed = 0
+        self.increases = 0
+        self.decreases = 0
+
+    @property
+    def limit(self):
+        return max(self.min_limit, int(self._limit))
+
+    def configure(self, enabled=None, min_limit=None, max_limit=None, queue_timeout=None):
+        """Update settings in place"""
+        with self._cond:
+            if enabled is not None:
+                self.enabled = enabled
+            if min_limit is not None:
+                self.min_limit = max(1, int(min_limit))
+            if max_limit is not None:
+                self.max_limit = max(self.min_limit, int(max_limit))
+            if queue_timeout is not None:
+                self.queue_timeout = max(0.0, queue_timeout)
+            self._limit = min(max(self._limit, self.min_limit), self.max_limit)
+            self._cond.notify_all()
+
+    def acquire(self):
+        """Take a slot, waiting if the limit is reached; raise ``BackendUnavailableError`` if shed"""
+        with self._cond:
+            if self.enabled and self.in_flight >= self.limit:
+                if self.waiting >= self.max_queue:
+                    self.shed += 1
+                    raise BackendUnavailableError("too many queued requests")
+                deadline = time.monotonic() + self.queue_timeout
+                self.waiting += 1
+                try:
+                    while self.enabled and self.in_flight >= self.limit:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.shed += 1
+                            raise BackendUnavailableError(f"no capacity within {self.queue_timeout:g}s")
+                        self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def release(self, latency_ms=None, overloaded=False):
+        """Return a slot and adjust the limit from the call's outcome.
+
+        ``latency_ms=None`` without ``overloaded`` leaves the limit unchanged
+        (e.g. client errors that say nothing about backend load).
+        """
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            congested = overloaded
+            if latency_ms is not None and not overloaded:
+                # Short- vs. long-term average latency: a rising ratio means requests are queueing
+                if self._baseline is None:
+                    self._baseline = self._recent = latency_ms
+                self._baseline += (latency_ms - self._baseline) * LONG_LATENCY_WEIGHT
+                self._recent += (latency_ms - self._recent) * SHORT_LATENCY_WEIGHT
+                congested = self._recent > self._baseline * self.latency_tolerance
+
+            if congested:
+                cooldown = (self._baseline or 0.0) / 1000
+                if now - self._last_decrease >= cooldown:
+                    self._limit = max(self.min_limit, self._limit * self.backoff_ratio)
+                    self._last_decrease = now
+                    self.decreases += 1
+            elif latency_ms is not None and self.in_flight + 1 >= self.limit // 2:
+                # Only grow while the current limit is actually being used
+                previous = self.limit
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+                self.increases += self.limit > previous
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'enabled': self.enabled,
+                'limit': self.limit,
+                'in_flight': self.in_flight,
+                'peak_in_flight': self.peak_in_flight,
+                'waiting': self.waiting,
+                'shed': self.shed,
+                'increases': self.increases,
+                'decreases': self.decreases,
+                'baseline_ms': round(self._baseline, 2) if self._baseline is not None else None,
+                'recent_ms': round(self._recent, 2) if self._recent is not None else None,
+            }
+
+
+class CircuitBreaker:
+    """Fails fast once the backend's recent failure rate crosses a threshold.
+
+    Outcomes are kept for ``window_seconds``; with at least ``min_calls`` in
+    the window and a failure rate at or above the threshold the breaker opens
+    and rejects calls for ``open_seconds``. It then lets ``half_open_probes``
+    calls through: all succeeding closes it, any failure reopens it.
+    """
+
+    def __init__(self, failure_rate_threshold=DEFAULT_FAILURE_RATE_THRESHOLD, min_calls=DEFAULT_MIN_CALLS,
+                 window_seconds=DEFAULT_WINDOW_SECONDS, open_seconds=DEFAULT_OPEN_SECONDS,
+                 half_open_probes=DEFAULT_HALF_OPEN_PROBES, enabled=True):
+        self._lock = threading.Lock()
+        self.enabled = enabled
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.state = BREAKER_CLOSED
+        self._outcomes = deque()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes_started = 0
+        self._probes_passed = 0
+        self.rejected = 0
+        self.trips = 0
+
+    def configure(self, enabled=None, failure_rate_threshold=None, open_seconds=None):
+        """Update settings in place; disabling also closes the breaker"""
+        with self._lock:
+            if enabled is not None:
+                self.enabled = enabled
+                if not enabled:
+                    self._close()
+            if failure_rate_threshold is not None:
+                self.failure_rate_threshold = failure_rate_threshold
+            if open_seconds is not None:
+                self.open_seconds = max(0.0, open_seconds)
+
+    def allow(self):
+        """Return True if a call may go to the backend, counting rejections"""
+        with self._lock:
+            if not self.enabled or self.state == BREAKER_CLOSED:
+                return True
+            if self.state == BREAKER_OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    self.rejected += 1
+                    return False
+                self.state = BREAKER_HALF_OPEN
+                self._probes_started = self._probes_passed = 0
+            if self._probes_started < self.half_open_probes:
+                self._probes_started += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, success):
+        """Record the outcome of a call that ``allow`` let through"""
+        with self._lock:
+            if not self.enabled:
+                return
+            now = time.monotonic()
+            if self.state == BREAKER_HALF_OPEN:
+                if not success:
+                    self._open(now)
+                else:
+                    self._probes_passed += 1
+                    if self._probes_passed >= self.half_open_probes:
+                        self._close()
+                return
+            if self.state == BREAKER_OPEN:
+                return
+
+            self._outcomes.append((now, success))
+            self._failures += not success
+            while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+                self._failures -= not self._outcomes.popleft()[1]
+            calls = len(self._outcomes)
+            if calls >= self.min_calls and self._failures / calls >= self.failure_rate_threshold:
+                self._open(now)
+
+    def _open(self, now):
+        self.state = BREAKER_OPEN
+        self._opened_at = now
+        self.trips += 1
+
+    def _close(self):
+        self.state = BREAKER_CLOSED
+        self._outcomes.clear()
+        self._failures = 0
+
+    def stats(self):
+        with self._lock:
+            calls = len(self._outcomes)
+            retry_in = 0.0
+            if self.state == BREAKER_OPEN:
+                retry_in = max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+            return {
+                'enabled': self.enabled,
+                'state': self.state,
+                'window_calls': calls,
+                'failure_rate': self._failures / calls if calls else 0.0,
+                'rejected': self.rejected,
+                'trips': self.trips,
+                'retry_in_seconds': round(retry_in, 1),
+            }
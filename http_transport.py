@@ -0,0 +1,154 @@
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Transport defaults
+DEFAULT_POOL_SIZE = 32
+DEFAULT_CONNECT_TIMEOUT = 3.05
+DEFAULT_READ_TIMEOUT = 30.0
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_BASE = 0.25
+DEFAULT_BACKOFF_MAX = 8.0
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+# Time spent opening connections (TCP + TLS) by the current thread
+_connect_timing = threading.local()
+
+
+def _reset_connect_time():
+    _connect_timing.seconds = 0.0
+
+
+def _get_connect_time():
+    return getattr(_connect_timing, 'seconds', 0.0)
+
+
+class _TimedConnectMixin:
+    """Records how long ``connect()`` takes on the calling thread"""
+
+    def connect(self):
+        start_time = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            _connect_timing.seconds = _get_connect_time() + (time.perf_counter() - start_time)
+
+
+class TimedHTTPConnection(_TimedConnectMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose pooled connections report their connect time"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+
+def create_session(pool_size=DEFAULT_POOL_SIZE):
+    """Create a keep-alive session with a connection pool of ``pool_size``.
+
+    Retries are handled by ``send_with_retries`` so urllib3's own retry
+    logic is disabled.
+    """
+    session = requests.Session()
+    adapter = TimedHTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"accept": "application/json", "Connection": "keep-alive"})
+    return session
+
+
+_default_session = None
+_default_session_lock = threading.Lock()
+
+
+def get_default_session():
+    """Return the process-wide session used when no session is passed in"""
+    global _default_session
+    with _default_session_lock:
+        if _default_session is None:
+            _default_session = create_session()
+        return _default_session
+
+
+def backoff_delay(attempt, backoff_base=DEFAULT_BACKOFF_BASE, backoff_max=DEFAULT_BACKOFF_MAX):
+    """Full-jitter exponential backoff delay in seconds for a retry attempt"""
+    return random.uniform(0, min(backoff_max, backoff_base * (2 ** attempt)))
+
+
+def _retry_after_seconds(response, backoff_max):
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return min(backoff_max, max(0.0, float(value)))
+    except ValueError:
+        return None
+
+
+def send_with_retries(session, url, params=None, headers=None, method="GET", json=None,
+                      timeout=(DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT),
+                      max_retries=DEFAULT_MAX_RETRIES,
+                      backoff_base=DEFAULT_BACKOFF_BASE,
+                      backoff_max=DEFAULT_BACKOFF_MAX):
+    """Send a request to ``url`` retrying 429/5xx responses and connection failures.
+
+    Returns ``(response, timing)`` where timing holds ``connect_ms`` (TCP/TLS
+    setup), ``server_ms`` (request sent to response headers, excluding
+    connect), ``total_ms`` (including backoff sleeps) and ``attempts``. The
+    last response is returned once retries are exhausted; the last exception
+    is re-raised if every attempt failed to connect.
+    """
+    start_time = time.perf_counter()
+    attempt = 0
+    while True:
+        _reset_connect_time()
+        try:
+            response = session.request(method, url, params=params, headers=headers, json=json, timeout=timeout)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt >= max_retries:
+                raise
+            time.sleep(backoff_delay(attempt, backoff_base, backoff_max))
+            attempt += 1
+            continue
+
+        if response.status_code in RETRY_STATUS_CODES and attempt < max_retries:
+            delay = _retry_after_seconds(response, backoff_max)
+            if delay is None:
+                delay = backoff_delay(attempt, backoff_base, backoff_max)
+            response.close()
+            time.sleep(delay)
+            attempt += 1
+            continue
+
+        connect_ms = _get_connect_time() * 1000
+        ttfb_ms = response.elapsed.total_seconds() * 1000
+        timing = {
+            'connect_ms': round(connect_ms, 2),
+            'server_ms': round(max(0.0, ttfb_ms - connect_ms), 2),
+            'total_ms': round((time.perf_counter() - start_time) * 1000, 2),
+            'attempts': attempt + 1,
+        }
+        return response, timing
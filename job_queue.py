@@ -0,0 +1,432 @@
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from collections import defaultdict
+from datetime import datetime
+
+from result_store import RESULT_STORE_PATH, TIMESTAMP_FORMAT
+
+# Jobs live next to the result store unless NAME_MATCH_JOB_PATH says otherwise
+JOB_STORE_PATH = os.environ.get(
+    "NAME_MATCH_JOB_PATH", os.path.join(os.path.dirname(RESULT_STORE_PATH), "jobs.db")
+)
+DEFAULT_JOB_WORKERS = int(os.environ.get("NAME_MATCH_JOB_WORKERS", "4"))
+DEFAULT_SLICE_SIZE = 25
+IDLE_POLL_INTERVAL = 1.0  # seconds
+
+QUEUED = "queued"
+RUNNING = "running"
+CANCELLED = "cancelled"
+DONE = "done"
+FAILED = "failed"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+RESUMABLE_STATUSES = (CANCELLED, FAILED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    label TEXT,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    matches INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    message TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_owner ON jobs (owner, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    name1 TEXT,
+    name2 TEXT,
+    PRIMARY KEY (job_id, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    row TEXT NOT NULL,
+    PRIMARY KEY (job_id, position)
+) WITHOUT ROWID;
+"""
+
+_JOB_COLUMNS = [
+    'job_id', 'owner', 'kind', 'label', 'status', 'total', 'completed', 'matches', 'errors',
+    'message', 'created_at', 'updated_at', 'finished_at'
+]
+
+# Items of a job that have no result yet, from a position onwards
+_PENDING_ITEMS = """
+SELECT position, name1, name2 FROM job_items AS item
+WHERE job_id = ? AND position >= ? AND NOT EXISTS (
+    SELECT 1 FROM job_results AS result WHERE result.job_id = item.job_id AND result.position = item.position
+)
+ORDER BY position LIMIT ?
+"""
+
+
+def _now():
+    return datetime.now().strftime(TIMESTAMP_FORMAT)
+
+
+class JobQueue:
+    """Persistent background job queue shared by every Streamlit session.
+
+    A job is a list of name pairs stored in SQLite. A fixed pool of worker
+    threads claims jobs a slice at a time, runs each pair through the
+    handler registered for the job's kind and commits the slice's rows
+    together with the job's progress. Slices go to the owner with the
+    fewest slices in flight, then the fewest pairs served, so one user's
+    huge job cannot starve everyone else and the backend never sees more
+    than ``workers`` concurrent requests from this process.
+
+    Jobs survive restarts: work that was running when the process stopped
+    is picked up again on start, skipping pairs that already have a result.
+    Cancelled and failed jobs can be resumed the same way.
+    """
+
+    _sequence = itertools.count()
+
+    def __init__(self, handlers, path=JOB_STORE_PATH, workers=DEFAULT_JOB_WORKERS, slice_size=DEFAULT_SLICE_SIZE):
+        self.handlers = dict(handlers)
+        self.path = path
+        self.workers = max(1, int(workers))
+        self.slice_size = max(1, int(slice_size))
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._local = threading.local()
+        connection = self._connect()
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+            # Anything left running by a previous process goes back in line
+            connection.execute("UPDATE jobs SET status = ? WHERE status = ?", (QUEUED, RUNNING))
+            connection.commit()
+            active = connection.execute(
+                "SELECT job_id, owner FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)
+            ).fetchall()
+        finally:
+            connection.close()
+
+        # Scheduling state: claim cursor and in-flight slices per active job
+        self._condition = threading.Condition()
+        self._active = {row['job_id']: self._schedule_entry(row['owner']) for row in active}
+        self._owner_leases = defaultdict(int)
+        self._owner_served = defaultdict(int)
+        self._closed = False
+        self.slices = 0
+        self._threads = [
+            threading.Thread(target=self._work_loop, name=f"job-worker-{index}", daemon=True)
+            for index in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    @classmethod
+    def _schedule_entry(cls, owner):
+        return {
+            'owner': owner, 'order': next(cls._sequence), 'cursor': 0, 'leases': 0,
+            'exhausted': False, 'cancelled': False, 'claiming': False,
+        }
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def _connection(self):
+        # One connection per thread; WAL readers never block the workers' commits
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    def submit(self, owner, kind, pairs, params=None, label=None):
+        """Queue a job over ``pairs`` and return its ID"""
+        if kind not in self.handlers:
+            raise ValueError(f"No handler registered for job kind {kind!r}")
+        job_id = uuid.uuid4().hex[:12]
+        pairs = list(pairs)
+        now = _now()
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "INSERT INTO jobs (job_id, owner, kind, label, params, status, total, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, owner, kind, label, json.dumps(params or {}), QUEUED, len(pairs), now, now)
+            )
+            connection.executemany(
+                "INSERT INTO job_items (job_id, position, name1, name2) VALUES (?, ?, ?, ?)",
+                ((job_id, position, name1, name2) for position, (name1, name2) in enumerate(pairs))
+            )
+        with self._condition:
+            self._active[job_id] = self._schedule_entry(owner)
+            self._condition.notify_all()
+        return job_id
+
+    def cancel(self, job_id):
+        """Stop a queued or running job; pairs already matched are kept"""
+        connection = self._connection()
+        with connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE job_id = ? AND status IN (?, ?)",
+                (CANCELLED, _now(), job_id, *ACTIVE_STATUSES)
+            )
+        with self._condition:
+            entry = self._active.pop(job_id, None)
+            if entry is not None:
+                entry['cancelled'] = True
+                self._forget_idle_owner(entry['owner'])
+        return cursor.rowcount > 0
+
+    def resume(self, job_id):
+        """Re-queue a cancelled or failed job; it continues with the pairs that have no result"""
+        connection = self._connection()
+        with connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET status = ?, message = NULL, finished_at = NULL, updated_at = ? "
+                "WHERE job_id = ? AND status IN (?, ?)",
+                (QUEUED, _now(), job_id, *RESUMABLE_STATUSES)
+            )
+            owner = connection.execute("SELECT owner FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if not cursor.rowcount:
+            return False
+        with self._condition:
+            self._active[job_id] = self._schedule_entry(owner['owner'])
+            self._condition.notify_all()
+        return True
+
+    def delete(self, job_id):
+        """Remove a job and its results; a slice still in flight stores nothing"""
+        self.cancel(job_id)
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM job_results WHERE job_id = ?", (job_id,))
+            connection.execute("DELETE FROM job_items WHERE job_id = ?", (job_id,))
+            connection.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def get(self, job_id):
+        """Job status, progress and params as a dict, or None"""
+        row = self._connection().execute(
+            f"SELECT {', '.join(_JOB_COLUMNS)}, params FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        return dict(row, params=json.loads(row['params'])) if row is not None else None
+
+    def has_active(self, owner):
+        """Whether the owner has any queued or running job"""
+        row = self._connection().execute(
+            "SELECT 1 FROM jobs WHERE owner = ? AND status IN (?, ?) LIMIT 1", (owner, *ACTIVE_STATUSES)
+        ).fetchone()
+        return row is not None
+
+    def list_jobs(self, owner=None, limit=50):
+        """Most recent jobs first, optionally for one owner"""
+        sql = f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs"
+        params = []
+        if owner is not None:
+            sql += " WHERE owner = ?"
+            params.append(owner)
+        sql += " ORDER BY created_at DESC, rowid DESC LIMIT ?"
+        params.append(int(limit))
+        return [dict(row) for row in self._connection().execute(sql, params)]
+
+    def results(self, job_id, limit=50, offset=0):
+        """A page of a job's result rows in input order; works while the job is running"""
+        rows = self._connection().execute(
+            "SELECT position, row FROM job_results WHERE job_id = ? ORDER BY position LIMIT ? OFFSET ?",
+            (job_id, int(limit), int(offset))
+        )
+        return [dict(json.loads(row['row']), row=row['position'] + 1) for row in rows]
+
+    def all_results(self, job_id):
+        """Every result row of a job so far, in input order"""
+        return self.results(job_id, limit=-1)
+
+    def stats(self):
+        """Scheduler counters for the sidebar"""
+        with self._condition:
+            in_flight = sum(entry['leases'] for entry in self._active.values())
+            return {
+                'workers': self.workers,
+                'active_jobs': len(self._active),
+                'busy_workers': in_flight,
+                'owners': len({entry['owner'] for entry in self._active.values()}),
+                'slices': self.slices,
+            }
+
+    def close(self, timeout=5.0):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _pick(self):
+        """Choose the job to take the next slice from, fairly; called with the lock held"""
+        candidates = [
+            (self._owner_leases[entry['owner']], self._owner_served[entry['owner']], entry['leases'],
+             entry['order'], job_id)
+            for job_id, entry in self._active.items() if not entry['exhausted'] and not entry['claiming']
+        ]
+        if not candidates:
+            return None
+        job_id = min(candidates)[-1]
+        entry = self._active[job_id]
+        # Other workers skip this job until its cursor has moved past the slice
+        entry['claiming'] = True
+        return job_id, entry
+
+    def _claim(self, job_id, entry):
+        """Read the picked job's next slice and lease it; returns ``(job, items)`` or None.
+
+        Called without the lock, so SQLite reads never stall the other workers.
+        """
+        connection = self._connection()
+        job = connection.execute("SELECT kind, params, status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        live = job is not None and job['status'] in ACTIVE_STATUSES
+        items = connection.execute(_PENDING_ITEMS, (job_id, entry['cursor'], self.slice_size)).fetchall() if live else []
+
+        finished = False
+        with self._condition:
+            entry['claiming'] = False
+            self._condition.notify_all()
+            if self._active.get(job_id) is not entry:
+                # Cancelled, or cancelled and resumed, while the slice was read
+                return None
+            if not live:
+                self._retire(job_id)
+                return None
+            if not items:
+                entry['exhausted'] = True
+                finished = not entry['leases']
+                if finished:
+                    self._retire(job_id)
+            else:
+                entry['cursor'] = items[-1]['position'] + 1
+                entry['leases'] += 1
+                self._owner_leases[entry['owner']] += 1
+
+        if finished:
+            self._finish(job_id)
+            return None
+        if not items:
+            return None
+        if job['status'] == QUEUED:
+            with connection:
+                connection.execute(
+                    "UPDATE jobs SET status = ?, updated_at = ? WHERE job_id = ? AND status = ?",
+                    (RUNNING, _now(), job_id, QUEUED)
+                )
+        return job, items
+
+    def _retire(self, job_id):
+        """Drop a job from scheduling; called with the lock held"""
+        entry = self._active.pop(job_id, None)
+        if entry is not None:
+            self._forget_idle_owner(entry['owner'])
+
+    def _forget_idle_owner(self, owner):
+        # Fairness weighs current demand: an owner with nothing queued or in flight starts afresh
+        if not self._owner_leases[owner] and all(entry['owner'] != owner for entry in self._active.values()):
+            self._owner_leases.pop(owner, None)
+            self._owner_served.pop(owner, None)
+
+    def _finish(self, job_id, status=DONE, message=None):
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "UPDATE jobs SET status = ?, message = ?, finished_at = ?, updated_at = ? "
+                "WHERE job_id = ? AND status IN (?, ?)",
+                (status, message, _now(), _now(), job_id, *ACTIVE_STATUSES)
+            )
+
+    def _work_loop(self):
+        while True:
+            with self._condition:
+                picked = None
+                while not self._closed and picked is None:
+                    picked = self._pick()
+                    if picked is None:
+                        self._condition.wait(IDLE_POLL_INTERVAL)
+                if self._closed:
+                    return
+            job_id, entry = picked
+            claim = self._claim(job_id, entry)
+            if claim is None:
+                continue
+            job, items = claim
+
+            failure = None
+            try:
+                self._run_slice(job_id, job, items, entry)
+            except Exception as e:
+                failure = f"{type(e).__name__}: {e}"
+
+            finish = None
+            with self._condition:
+                entry['leases'] -= 1
+                self._owner_leases[entry['owner']] -= 1
+                self._owner_served[entry['owner']] += len(items)
+                self.slices += 1
+                if self._active.get(job_id) is entry:
+                    if failure is not None:
+                        finish = (FAILED, failure)
+                    elif entry['exhausted'] and not entry['leases']:
+                        # Another worker saw the end while this slice was in flight
+                        finish = (DONE, None)
+                    if finish is not None:
+                        self._retire(job_id)
+                else:
+                    self._forget_idle_owner(entry['owner'])
+                self._condition.notify_all()
+            if finish is not None:
+                self._finish(job_id, *finish)
+
+    def _run_slice(self, job_id, job, items, entry):
+        handler = self.handlers[job['kind']]
+        params = json.loads(job['params'])
+        rows = []
+        for item in items:
+            if entry['cancelled']:
+                break
+            try:
+                row = handler(item['name1'], item['name2'], params)
+            except Exception as e:
+                row = {'name1': item['name1'], 'name2': item['name2'], 'error': f"Error: {str(e)}"}
+            rows.append((item['position'], row))
+
+        connection = self._connection()
+        with connection:
+            # A job resumed while its old slice was still in flight may match a pair twice; count it once.
+            # A job deleted meanwhile gets nothing: the existence check runs inside this write transaction.
+            stored = [
+                row for position, row in rows
+                if connection.execute(
+                    "INSERT OR IGNORE INTO job_results (job_id, position, row) "
+                    "SELECT ?, ?, ? WHERE EXISTS (SELECT 1 FROM jobs WHERE job_id = ?)",
+                    (job_id, position, json.dumps(row), job_id)
+                ).rowcount
+            ]
+            connection.execute(
+                "UPDATE jobs SET completed = completed + ?, matches = matches + ?, errors = errors + ?, updated_at = ? "
+                "WHERE job_id = ?",
+                (
+                    len(stored),
+                    sum(row.get('is_match') == 'yes' for row in stored),
+                    sum(bool(row.get('error')) for row in stored),
+                    _now(),
+                    job_id,
+                )
+            )
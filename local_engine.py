@@ -0,0 +1,400 @@
+"""Vectorized local name scoring.
+
+Computes the features behind the API's ``confidence_score`` (token Jaccard
+and Jaro-Winkler on normalized names, 1.0 for exact matches, as in
+``prefilter.score_pair``) plus Levenshtein and character n-gram
+similarity, with NumPy over whole batches instead of pair by pair:
+
+    engine = LocalEngine(workers=4)
+    scores = engine.score(pairs)
+    rows = engine.rows(pairs, scores)
+
+Names with no letters after normalization (digits or punctuation only)
+score 0.0 on every feature and are reported as errors by ``rows()``.
+
+Every distinct name is normalized once and packed into fixed-width code
+and id arrays; each kernel then loops over character positions, not pairs.
+Large batches are split across a process pool whose workers read the
+packed inputs from shared memory and write scores back in place.
+
+    python local_engine.py --pairs 200000 --workers 4
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import get_context, shared_memory
+
+import numpy as np
+
+from batch_matching import result_to_row
+from candidate_search import DEFAULT_NGRAM_SIZE, char_ngrams
+from prefilter import normalize_for_matching, score_pair
+
+# Same cut-off as the local stand-in API
+DEFAULT_MATCH_THRESHOLD = 0.75
+DEFAULT_WORKERS = os.cpu_count() or 1
+DEFAULT_CHUNK_SIZE = 8192
+# Below this many pairs starting workers costs more than it saves
+PARALLEL_MIN_PAIRS = 50000
+JARO_WINKLER_PREFIX_WEIGHT = 0.1
+SCORE_COLUMNS = ['confidence_score', 'jaccard', 'jaro_winkler', 'levenshtein', 'ngram_jaccard', 'exact', 'comparable']
+NO_LETTERS_ERROR = "No letters to compare"
+
+
+def _pad_ids(id_sets):
+    """Pack sets of ints into a matrix padded with -1"""
+    width = max(1, max((len(ids) for ids in id_sets), default=0))
+    matrix = np.full((len(id_sets), width), -1, dtype=np.int32)
+    for row, ids in enumerate(id_sets):
+        matrix[row, :len(ids)] = sorted(ids)
+    return matrix
+
+
+def encode_names(names, ngram_size=DEFAULT_NGRAM_SIZE):
+    """Normalize each distinct name once and pack the results into arrays.
+
+    Returns ``(encoded, inverse)``: ``encoded`` holds per-name code points of
+    the compact (space-free) name, its length, and padded token and n-gram
+    ids; ``inverse[i]`` is the encoded row of ``names[i]``.
+    """
+    positions = {}
+    inverse = np.fromiter((positions.setdefault(name, len(positions)) for name in names), dtype=np.int64, count=len(names))
+    vocabulary = {}
+    compacts, tokens, grams = [], [], []
+    for name in positions:
+        normalized = normalize_for_matching(name)
+        compacts.append(normalized.replace(" ", ""))
+        tokens.append({vocabulary.setdefault("t:" + token, len(vocabulary)) for token in normalized.split()})
+        grams.append({vocabulary.setdefault("g:" + gram, len(vocabulary)) for gram in char_ngrams(normalized, ngram_size)})
+
+    width = max(1, max((len(compact) for compact in compacts), default=0))
+    codes = np.array(compacts, dtype=f"<U{width}").view(np.uint32).reshape(len(compacts), width)
+    encoded = {
+        'codes': codes,
+        'lengths': np.fromiter((len(compact) for compact in compacts), dtype=np.int32, count=len(compacts)),
+        'tokens': _pad_ids(tokens),
+        'grams': _pad_ids(grams),
+    }
+    return encoded, inverse
+
+
+def set_jaccard_batch(ids1, ids2):
+    """Row-wise Jaccard similarity of two padded id matrices (0 if either set is empty)"""
+    valid1 = ids1 >= 0
+    shared = ((ids1[:, :, None] == ids2[:, None, :]) & valid1[:, :, None]).sum(axis=(1, 2))
+    union = valid1.sum(axis=1) + (ids2 >= 0).sum(axis=1) - shared
+    return np.where(union > 0, shared / np.maximum(union, 1), 0.0)
+
+
+def jaro_winkler_batch(codes1, len1, codes2, len2, prefix_weight=JARO_WINKLER_PREFIX_WEIGHT):
+    """Row-wise Jaro-Winkler similarity, identical to ``prefilter.jaro_winkler_similarity``"""
+    count, width1 = codes1.shape
+    width2 = codes2.shape[1]
+    rows = np.arange(count)
+    columns = np.arange(width2)
+    window = np.maximum(0, np.maximum(len1, len2) // 2 - 1)
+    in_range2 = columns[None, :] < len2[:, None]
+    matched1 = np.zeros((count, width1), dtype=bool)
+    matched2 = np.zeros((count, width2), dtype=bool)
+    # Greedy matching in s1 order: each char takes the first free equal char of s2 within the window
+    for i in range(width1):
+        candidates = (
+            (codes2 == codes1[:, i:i + 1])
+            & ~matched2
+            & in_range2
+            & (np.abs(columns - i)[None, :] <= window[:, None])
+            & (i < len1)[:, None]
+        )
+        found = candidates.any(axis=1)
+        first = candidates.argmax(axis=1)
+        matched1[found, i] = True
+        matched2[rows[found], first[found]] = True
+    matches = matched1.sum(axis=1)
+
+    # Transpositions: the k-th matched char of s1 against the k-th matched char of s2
+    width = min(width1, width2)
+    order1 = np.argsort(~matched1, axis=1, kind='stable')[:, :width]
+    order2 = np.argsort(~matched2, axis=1, kind='stable')[:, :width]
+    mismatched = np.take_along_axis(codes1, order1, axis=1) != np.take_along_axis(codes2, order2, axis=1)
+    transpositions = (mismatched & (np.arange(width)[None, :] < matches[:, None])).sum(axis=1)
+
+    safe_matches = np.maximum(matches, 1)
+    jaro = (
+        matches / np.maximum(len1, 1) + matches / np.maximum(len2, 1)
+        + (matches - transpositions / 2) / safe_matches
+    ) / 3
+    jaro = np.where(matches > 0, jaro, 0.0)
+    identical = (len1 > 0) & (len1 == len2) & (codes1[:, :width] == codes2[:, :width]).all(axis=1)
+    jaro = np.where(identical, 1.0, jaro)
+
+    prefix_width = min(4, width)
+    same = (codes1[:, :prefix_width] == codes2[:, :prefix_width]) & (
+        np.arange(prefix_width)[None, :] < np.minimum(len1, len2)[:, None]
+    )
+    prefix = np.cumprod(same, axis=1).sum(axis=1)
+    return jaro + prefix * prefix_weight * (1 - jaro)
+
+
+def levenshtein_batch(codes1, len1, codes2, len2):
+    """Row-wise Levenshtein similarity, ``1 - distance / longer length``"""
+    count, width1 = codes1.shape
+    width2 = codes2.shape[1]
+    rows = np.arange(count)
+    columns = np.arange(width2 + 1, dtype=np.int32)
+    previous = np.broadcast_to(columns, (count, width2 + 1)).copy()
+    distance = previous[rows, len2].copy()
+    for i in range(1, width1 + 1):
+        current = np.empty_like(previous)
+        current[:, 0] = i
+        current[:, 1:] = np.minimum(
+            previous[:, :-1] + (codes2 != codes1[:, i - 1:i]),  # substitution
+            previous[:, 1:] + 1  # deletion
+        )
+        # Insertions chain left to right: D[i][j] = min over k <= j of D[i][k] + (j - k)
+        current = np.minimum.accumulate(current - columns, axis=1) + columns
+        finished = len1 == i
+        distance[finished] = current[finished, len2[finished]]
+        previous = current
+    longest = np.maximum(len1, len2)
+    return np.where(longest > 0, 1 - distance / np.maximum(longest, 1), 0.0)
+
+
+def _score_range(arrays, start, stop, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Score pairs ``start:stop`` of ``arrays`` into ``arrays['scores']``"""
+    codes, lengths = arrays['codes'], arrays['lengths']
+    tokens, grams = arrays['tokens'], arrays['grams']
+    scores = arrays['scores']
+    for chunk_start in range(start, stop, chunk_size):
+        chunk_stop = min(stop, chunk_start + chunk_size)
+        left = arrays['left'][chunk_start:chunk_stop]
+        right = arrays['right'][chunk_start:chunk_stop]
+        len1, len2 = lengths[left], lengths[right]
+        # Pairs are sorted by length, so trimming to this chunk's longest name skips most padding
+        codes1 = codes[left, :max(1, int(len1.max()))]
+        codes2 = codes[right, :max(1, int(len2.max()))]
+
+        jaccard = set_jaccard_batch(tokens[left], tokens[right])
+        jaro_winkler = jaro_winkler_batch(codes1, len1, codes2, len2)
+        exact = (len1 > 0) & (len1 == len2) & (codes[left] == codes[right]).all(axis=1)
+        comparable = (len1 > 0) & (len2 > 0)
+        block = scores[chunk_start:chunk_stop]
+        block[:, 0] = np.where(exact, 1.0, (jaccard + jaro_winkler) / 2)
+        block[:, 1] = jaccard
+        block[:, 2] = jaro_winkler
+        block[:, 3] = levenshtein_batch(codes1, len1, codes2, len2)
+        block[:, 4] = set_jaccard_batch(grams[left], grams[right])
+        block[:, 5] = exact
+        # A name with no letters left has nothing to compare
+        block[~comparable, :5] = 0.0
+        block[:, 6] = comparable
+
+
+def _share(arrays):
+    """Copy arrays into new shared memory blocks; returns ``(blocks, spec)``"""
+    blocks, spec = [], {}
+    for key, array in arrays.items():
+        block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        blocks.append(block)
+        spec[key] = (block.name, array.shape, array.dtype.str)
+    return blocks, spec
+
+
+def _score_shared(spec, start, stop, chunk_size):
+    """Worker entry point: attach to the shared inputs and score one slice in place"""
+    blocks = {key: shared_memory.SharedMemory(name=name) for key, (name, _, _) in spec.items()}
+    try:
+        arrays = {
+            key: np.ndarray(shape, dtype=dtype, buffer=blocks[key].buf)
+            for key, (_, shape, dtype) in spec.items()
+        }
+        _score_range(arrays, start, stop, chunk_size)
+        # Views must go before the blocks can be closed
+        del arrays
+    finally:
+        for block in blocks.values():
+            block.close()
+
+
+class LocalEngine:
+    """Batch scorer with an optional process pool, reused across calls.
+
+    The pool uses the spawn start method so it is safe to create from a
+    threaded process such as the Streamlit server.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, chunk_size=DEFAULT_CHUNK_SIZE,
+                 match_threshold=DEFAULT_MATCH_THRESHOLD, parallel_min_pairs=PARALLEL_MIN_PAIRS):
+        self.workers = max(1, int(workers))
+        self.chunk_size = chunk_size
+        self.match_threshold = match_threshold
+        self.parallel_min_pairs = parallel_min_pairs
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn"))
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def score(self, pairs):
+        """Score ``(name1, name2)`` pairs; returns ``{column: array}`` for ``SCORE_COLUMNS``"""
+        pairs = list(pairs)
+        encoded, inverse = encode_names([name for pair in pairs for name in pair])
+        left, right = inverse[0::2], inverse[1::2]
+        # Sorting by length keeps each chunk's padding (and loop count) small
+        order = np.argsort(np.maximum(encoded['lengths'][left], encoded['lengths'][right]), kind='stable')
+        arrays = dict(encoded, left=left[order], right=right[order])
+        arrays['scores'] = np.zeros((len(pairs), len(SCORE_COLUMNS)), dtype=np.float64)
+
+        if self.workers > 1 and len(pairs) >= self.parallel_min_pairs:
+            sorted_scores = self._score_parallel(arrays)
+        else:
+            _score_range(arrays, 0, len(pairs), self.chunk_size)
+            sorted_scores = arrays['scores']
+
+        scores = np.empty_like(sorted_scores)
+        scores[order] = sorted_scores
+        columns = {column: scores[:, position] for position, column in enumerate(SCORE_COLUMNS)}
+        columns['exact'] = columns['exact'].astype(bool)
+        columns['comparable'] = columns['comparable'].astype(bool)
+        return columns
+
+    def _score_parallel(self, arrays):
+        blocks, spec = _share(arrays)
+        try:
+            total = len(arrays['left'])
+            # A few slices per worker so one slow (long-name) slice does not hold up the rest
+            step = max(self.chunk_size, -(-total // (self.workers * 4)))
+            futures = [
+                self._get_pool().submit(_score_shared, spec, start, min(total, start + step), self.chunk_size)
+                for start in range(0, total, step)
+            ]
+            wait(futures)
+            for future in futures:
+                future.result()
+            name, shape, dtype = spec['scores']
+            scores_block = next(block for block in blocks if block.name == name)
+            return np.ndarray(shape, dtype=dtype, buffer=scores_block.buf).copy()
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    def results(self, pairs, scores):
+        """Yield API-schema results for scored pairs"""
+        for index in range(len(scores['confidence_score'])):
+            confidence = round(float(scores['confidence_score'][index]), 4)
+            yield {
+                'is_match': "yes" if confidence >= self.match_threshold else "no",
+                'confidence_score': confidence,
+                'reason': (
+                    f"Local engine: token overlap {scores['jaccard'][index]:.2f}, "
+                    f"Jaro-Winkler {scores['jaro_winkler'][index]:.2f}"
+                ),
+            }
+
+    def rows(self, pairs, scores):
+        """Result rows (as ``batch_matching.match_row`` builds them) for scored pairs"""
+        rows = []
+        for index, ((name1, name2), result) in enumerate(zip(pairs, self.results(pairs, scores))):
+            if not name1 or not name2:
+                rows.append({'name1': name1, 'name2': name2, 'error': "Missing name"})
+            elif not scores['comparable'][index]:
+                rows.append({'name1': name1, 'name2': name2, 'error': NO_LETTERS_ERROR})
+            else:
+                rows.append(result_to_row(name1, name2, result))
+        return rows
+
+
+def validate_results(rows, scores, match_threshold=DEFAULT_MATCH_THRESHOLD):
+    """Compare API result rows with local scores for the same pairs"""
+    compared = agreed = 0
+    differences = []
+    disagreements = []
+    for index, row in enumerate(rows):
+        if row.get('error'):
+            continue
+        compared += 1
+        local_confidence = float(scores['confidence_score'][index])
+        local_match = "yes" if local_confidence >= match_threshold else "no"
+        differences.append(abs(float(row.get('confidence_score') or 0.0) - local_confidence))
+        if local_match == row.get('is_match'):
+            agreed += 1
+        else:
+            disagreements.append(index)
+    return {
+        'compared': compared,
+        'agreement': agreed / compared if compared else 0.0,
+        'mean_confidence_difference': sum(differences) / compared if compared else 0.0,
+        'max_confidence_difference': max(differences, default=0.0),
+        'disagreements': disagreements,
+    }
+
+
+def benchmark_engine(pairs, workers=DEFAULT_WORKERS, python_sample=20000):
+    """Pairs per second for the pure-Python scorer, one vectorized process, and the pool"""
+    pairs = list(pairs)
+    sample = pairs[:python_sample]
+    start = time.perf_counter()
+    for name1, name2 in sample:
+        score_pair(name1, name2)
+    report = {'pairs': len(pairs), 'workers': workers, 'python': len(sample) / (time.perf_counter() - start)}
+
+    with LocalEngine(workers=1) as engine:
+        start = time.perf_counter()
+        engine.score(pairs)
+        report['vectorized'] = len(pairs) / (time.perf_counter() - start)
+    if workers > 1:
+        with LocalEngine(workers=workers, parallel_min_pairs=0) as engine:
+            # Warm the pool first so worker start-up is not counted
+            engine.score(pairs[:engine.chunk_size])
+            start = time.perf_counter()
+            engine.score(pairs)
+            report['parallel'] = len(pairs) / (time.perf_counter() - start)
+    return report
+
+
+def format_engine_report(report):
+    lines = [f"{report['pairs']} pairs"]
+    for key, label in (('python', "pure Python"), ('vectorized', "vectorized, 1 process"),
+                       ('parallel', f"vectorized, {report['workers']} processes")):
+        if key in report:
+            lines.append(f"  {label}: {report[key]:,.0f} pairs/sec ({report[key] / report['python']:.1f}x)")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    from benchmark import generate_corpus, load_corpus
+
+    parser = argparse.ArgumentParser(description="Measure local scoring engine throughput")
+    parser.add_argument("--corpus", help="CSV/Excel file with name1,name2 columns (default: synthetic corpus)")
+    parser.add_argument("--pairs", type=int, default=200000, help="Synthetic pairs to score")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    args = parser.parse_args(argv)
+
+    pairs = load_corpus(args.corpus) if args.corpus else generate_corpus(args.pairs)
+    report = benchmark_engine(pairs, workers=args.workers)
+    print(format_engine_report(report))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
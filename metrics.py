@@ -0,0 +1,353 @@
+"""In-process counters, latency histograms and timing spans.
+
+Spans record into a shared registry that can be rendered in the Prometheus
+text exposition format, written to a file for a textfile collector, or
+served over HTTP:
+
+    with span("health_check"):
+        ...
+
+    @timed("display_result")
+    def display_result(result): ...
+
+Set NAME_MATCH_METRICS_PORT to serve ``/metrics`` from the app process and
+NAME_MATCH_METRICS_FILE to have the app rewrite a metrics file every rerun.
+"""
+import cProfile
+import functools
+import io
+import math
+import os
+import pstats
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_PREFIX = "namematch"
+METRICS_PORT = os.environ.get("NAME_MATCH_METRICS_PORT")
+METRICS_FILE = os.environ.get("NAME_MATCH_METRICS_FILE")
+# Bucket upper bounds in seconds, from sub-millisecond UI work to slow API calls
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+PROFILE_LINES = 30
+# Percentiles in LatencyHistogram summaries and benchmark reports
+REPORT_PERCENTILES = (50, 90, 99, 99.9)
+
+
+class Histogram:
+    """Fixed-bucket histogram in the Prometheus cumulative-bucket model"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.min = float('inf')
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Estimate a quantile by interpolating inside the bucket that contains it"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= target:
+                # Bucket edges clamped to the observed range keep small samples honest
+                lower = max(self.buckets[index - 1] if index else 0.0, self.min)
+                upper = min(self.buckets[index] if index < len(self.buckets) else self.max, self.max)
+                return lower + (upper - lower) * (target - seen) / count
+            seen += count
+        return self.max
+
+
+class LatencyHistogram:
+    """Log-linear latency histogram in the style of HdrHistogram.
+
+    Values are stored in whole microseconds in buckets whose width grows with
+    magnitude, so memory is constant and every reported percentile is within
+    a relative error of ``1 / 2**precision_bits``.
+    """
+
+    def __init__(self, precision_bits=7):
+        self.precision_bits = precision_bits
+        self.counts = defaultdict(int)
+        self.count = 0
+        self.total_us = 0
+        self.min_us = None
+        self.max_us = 0
+        self._lock = threading.Lock()
+
+    def _bucket(self, value_us):
+        shift = max(0, value_us.bit_length() - self.precision_bits - 1)
+        return (value_us >> shift) << shift, shift
+
+    def record(self, value_ms):
+        """Record one latency sample in milliseconds"""
+        value_us = max(1, int(round(value_ms * 1000)))
+        lower, _ = self._bucket(value_us)
+        with self._lock:
+            self.counts[lower] += 1
+            self.count += 1
+            self.total_us += value_us
+            self.max_us = max(self.max_us, value_us)
+            self.min_us = value_us if self.min_us is None else min(self.min_us, value_us)
+
+    def record_many(self, values_ms):
+        """Record an array of latency samples in milliseconds (vectorized)"""
+        import numpy as np
+
+        values_us = np.maximum(1, np.round(np.asarray(values_ms, dtype=np.float64) * 1000)).astype(np.int64)
+        if not len(values_us):
+            return
+        # frexp's exponent is the bit length for integers below 2**53
+        shift = np.maximum(0, np.frexp(values_us)[1] - self.precision_bits - 1)
+        lowers, counts = np.unique((values_us >> shift) << shift, return_counts=True)
+        with self._lock:
+            for lower, count in zip(lowers.tolist(), counts.tolist()):
+                self.counts[lower] += count
+            self.count += len(values_us)
+            self.total_us += int(values_us.sum())
+            self.max_us = max(self.max_us, int(values_us.max()))
+            low = int(values_us.min())
+            self.min_us = low if self.min_us is None else min(self.min_us, low)
+
+    def merge(self, other):
+        """Add another histogram's samples into this one"""
+        with self._lock:
+            for lower, count in other.counts.items():
+                self.counts[lower] += count
+            self.count += other.count
+            self.total_us += other.total_us
+            self.max_us = max(self.max_us, other.max_us)
+            if other.min_us is not None:
+                self.min_us = other.min_us if self.min_us is None else min(self.min_us, other.min_us)
+
+    def percentile(self, percent):
+        """Highest value equivalent to the given percentile, in milliseconds"""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            target = max(1, math.ceil(percent / 100 * self.count))
+            seen = 0
+            for lower in sorted(self.counts):
+                seen += self.counts[lower]
+                if seen >= target:
+                    _, shift = self._bucket(lower)
+                    return min(self.max_us, lower + (1 << shift) - 1) / 1000
+            return self.max_us / 1000
+
+    def mean(self):
+        return self.total_us / self.count / 1000 if self.count else 0.0
+
+    def summary(self):
+        """Percentile summary in milliseconds"""
+        summary = {f"p{p:g}": round(self.percentile(p), 3) for p in REPORT_PERCENTILES}
+        summary['min'] = round((self.min_us or 0) / 1000, 3)
+        summary['mean'] = round(self.mean(), 3)
+        summary['max'] = round(self.max_us / 1000, 3)
+        return summary
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'precision_bits': self.precision_bits,
+                'buckets_us': sorted([lower, count] for lower, count in self.counts.items()),
+            }
+
+
+class MetricsRegistry:
+    """Thread-safe store of labelled counters and histograms.
+
+    Recording is a dict lookup and a bisect under one lock, cheap enough to
+    leave on for every request.
+    """
+
+    def __init__(self, prefix=METRICS_PREFIX):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self, name):
+        """Per-label summaries of one histogram: count, mean, p50, p95 (seconds)"""
+        with self._lock:
+            return {
+                labels: {
+                    'count': histogram.count,
+                    'mean': histogram.sum / histogram.count if histogram.count else 0.0,
+                    'p50': histogram.quantile(0.5),
+                    'p95': histogram.quantile(0.95),
+                }
+                for (metric, labels), histogram in self._histograms.items()
+                if metric == name
+            }
+
+    def counters(self, name):
+        with self._lock:
+            return {labels: value for (metric, labels), value in self._counters.items() if metric == name}
+
+    def render_prometheus(self):
+        """Text exposition format (version 0.0.4)"""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, (list(h.counts), h.sum, h.count, h.buckets)) for key, h in self._histograms.items()
+            )
+
+        described = set()
+
+        def header(name, kind):
+            if name not in described:
+                described.add(name)
+                if name in self._help:
+                    lines.append(f"# HELP {self.prefix}_{name} {self._help[name]}")
+                lines.append(f"# TYPE {self.prefix}_{name} {kind}")
+
+        for (name, labels), value in counters:
+            header(name, "counter")
+            lines.append(f"{self.prefix}_{name}{_format_labels(labels)} {value}")
+        for (name, labels), (counts, total, count, buckets) in histograms:
+            header(name, "histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                bound_label = "+Inf" if bound == float('inf') else f"{bound:g}"
+                lines.append(
+                    f"{self.prefix}_{name}_bucket{_format_labels(labels + (('le', bound_label),))} {cumulative}"
+                )
+            lines.append(f"{self.prefix}_{name}_sum{_format_labels(labels)} {total:.6f}")
+            lines.append(f"{self.prefix}_{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Atomically rewrite ``path`` with the current metrics"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render_prometheus())
+        os.replace(temp_path, path)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels) + "}"
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY = MetricsRegistry()
+REGISTRY.describe("span_seconds", "Duration of instrumented code paths")
+REGISTRY.describe("span_errors_total", "Instrumented code paths that raised")
+REGISTRY.describe("match_results_total", "Match calls by where the answer came from")
+
+
+class span:
+    """Context manager timing a block into the ``span_seconds`` histogram"""
+
+    __slots__ = ('name', 'registry', '_start')
+
+    def __init__(self, name, registry=REGISTRY):
+        self.name = name
+        self.registry = registry
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe("span_seconds", time.perf_counter() - self._start, span=self.name)
+        # Only real errors; BaseException covers control flow such as Streamlit reruns
+        if exc_type is not None and issubclass(exc_type, Exception):
+            self.registry.inc("span_errors_total", span=self.name)
+        return False
+
+
+def timed(name, registry=REGISTRY):
+    """Decorator recording every call of the function as a span"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, registry):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def profile_call(fn, *args, lines=PROFILE_LINES, **kwargs):
+    """Run ``fn`` under cProfile and return ``(result, report_text)``.
+
+    The report lists the functions with the highest cumulative time.
+    """
+    profiler = cProfile.Profile()
+    try:
+        result = profiler.runcall(fn, *args, **kwargs)
+    finally:
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(lines)
+    return result, output.getvalue()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.registry.render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, host="0.0.0.0", registry=REGISTRY):
+    """Serve ``/metrics`` on a background thread and return the server"""
+    server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+    server.daemon_threads = True
+    server.registry = registry
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
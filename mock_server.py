@@ -0,0 +1,246 @@
+"""Local stand-in for the name matching API.
+
+Serves ``/api/v1/utility/util``, its ``/batch`` bulk variant and ``/health``
+with the same response schema as the Azure backend, so the app and
+benchmarks can run without network. Latency, errors and rate limiting can be
+injected to exercise retries, caching and concurrency control:
+
+    python mock_server.py --port 8000 --latency-ms 40 --jitter-ms 20 --error-rate 0.02 --rate-limit 200
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from api_client import API_PATH, BULK_SUFFIX
+from prefilter import score_pair
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+MATCH_THRESHOLD = 0.75
+MAX_BULK_PAIRS = 1000
+
+
+def score_names(name1, name2):
+    """Deterministic match decision in the API response schema"""
+    features = score_pair(name1, name2)
+    if features is None:
+        return {'is_match': "no", 'confidence_score': 0.0, 'reason': "No letters to compare"}
+    confidence = 1.0 if features['exact'] else round(features['score'], 4)
+    is_match = "yes" if confidence >= MATCH_THRESHOLD else "no"
+    return {
+        'is_match': is_match,
+        'confidence_score': confidence,
+        'reason': (
+            f"Token overlap {features['jaccard']:.2f}, "
+            f"Jaro-Winkler {features['jaro_winkler']:.2f}"
+        ),
+    }
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at ``rate`` tokens per second"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst if burst else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        """Take a token if available, otherwise return the seconds until one is"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The stdlib default backlog of 5 drops connection bursts from load tests
+    request_queue_size = 128
+
+    def __init__(self, server_address, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0,
+                 rate_limit=None, burst=None, seed=None):
+        super().__init__(server_address, MockRequestHandler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limiter = TokenBucket(rate_limit, burst) if rate_limit else None
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {'requests': 0, 'pairs': 0, 'injected_errors': 0, 'rate_limited': 0}
+
+    def configure(self, latency_ms=None, jitter_ms=None, error_rate=None, rate_limit=None, burst=None):
+        """Change fault injection on a running server; ``rate_limit=0`` disables limiting"""
+        if latency_ms is not None:
+            self.latency_ms = latency_ms
+        if jitter_ms is not None:
+            self.jitter_ms = jitter_ms
+        if error_rate is not None:
+            self.error_rate = error_rate
+        if rate_limit is not None:
+            limiter = self.rate_limiter
+            if not rate_limit:
+                self.rate_limiter = None
+            elif limiter is None or limiter.rate != rate_limit or (burst and limiter.capacity != burst):
+                self.rate_limiter = TokenBucket(rate_limit, burst)
+
+    def count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def draw(self):
+        """Random draws for (latency seconds, inject error)"""
+        with self._random_lock:
+            jitter = self._random.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0
+            fail = self._random.random() < self.error_rate if self.error_rate else False
+        return (self.latency_ms + jitter) / 1000, fail
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Send headers and body in one segment; otherwise Nagle plus delayed ACK
+    # adds ~40 ms to every keep-alive response
+    disable_nagle_algorithm = True
+    wbufsize = -1
+
+    def log_message(self, format, *args):
+        # Keep benchmark output clean
+        pass
+
+    def _send_json(self, status_code, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _admit(self):
+        """Apply rate limiting, latency and error injection; False if already answered"""
+        server = self.server
+        server.count('requests')
+        if server.rate_limiter is not None:
+            wait = server.rate_limiter.try_acquire()
+            if wait:
+                server.count('rate_limited')
+                self._send_json(429, {'detail': "Rate limit exceeded"}, {"Retry-After": f"{wait:.3f}"})
+                return False
+
+        delay, fail = server.draw()
+        if delay:
+            time.sleep(delay)
+        if fail:
+            server.count('injected_errors')
+            self._send_json(503, {'detail': "Injected failure"})
+            return False
+        return True
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/health":
+            self._send_json(200, {'status': "healthy"})
+        elif url.path == API_PATH:
+            query = parse_qs(url.query)
+            name1 = query.get('name1', [''])[0]
+            name2 = query.get('name2', [''])[0]
+            if not name1 or not name2:
+                self._send_json(422, {'detail': "name1 and name2 are required"})
+            elif self._admit():
+                self.server.count('pairs')
+                self._send_json(200, score_names(name1, name2))
+        else:
+            self._send_json(404, {'detail': "Not Found"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        if url.path != f"{API_PATH}{BULK_SUFFIX}":
+            self._send_json(404, {'detail': "Not Found"})
+            return
+
+        try:
+            pairs = json.loads(body)['pairs']
+            names = [(str(pair['name1']), str(pair['name2'])) for pair in pairs]
+        except (ValueError, KeyError, TypeError):
+            self._send_json(422, {'detail': "Body must be {\"pairs\": [{\"name1\": ..., \"name2\": ...}]}"})
+            return
+        if len(names) > MAX_BULK_PAIRS:
+            self._send_json(413, {'detail': f"At most {MAX_BULK_PAIRS} pairs per request"})
+            return
+
+        if self._admit():
+            self.server.count('pairs', len(names))
+            self._send_json(200, {'results': [score_names(name1, name2) for name1, name2 in names]})
+
+
+def start_server(host=DEFAULT_HOST, port=0, **options):
+    """Start the stand-in server on a background thread and return it.
+
+    ``port=0`` picks a free port; the bound base URL is ``server.base_url``.
+    ``options`` are passed to ``MockServer`` (latency, errors, rate limit).
+    Call ``server.shutdown()`` to stop it.
+    """
+    server = MockServer((host, port), **options)
+    server.base_url = f"http://{host}:{server.server_port}"
+    thread = threading.Thread(target=server.serve_forever, name="mock-server", daemon=True)
+    thread.start()
+    return server
+
+
+def add_server_arguments(parser, prefix=""):
+    """Register the fault-injection options on an argparse parser"""
+    parser.add_argument(f"--{prefix}latency-ms", type=float, default=0.0, help="Fixed latency per request")
+    parser.add_argument(f"--{prefix}jitter-ms", type=float, default=0.0, help="Extra uniform random latency")
+    parser.add_argument(f"--{prefix}error-rate", type=float, default=0.0, help="Fraction of requests answered 503")
+    parser.add_argument(f"--{prefix}rate-limit", type=float, help="Requests per second before answering 429")
+    parser.add_argument(f"--{prefix}burst", type=float, help="Rate limiter burst size (default: one second)")
+    parser.add_argument(f"--{prefix}seed", type=int, help="Seed for latency/error injection")
+
+
+def server_options(args, prefix=""):
+    """Collect ``MockServer`` keyword options from parsed arguments"""
+    attr = prefix.replace("-", "_")
+    return {
+        'latency_ms': getattr(args, f"{attr}latency_ms"),
+        'jitter_ms': getattr(args, f"{attr}jitter_ms"),
+        'error_rate': getattr(args, f"{attr}error_rate"),
+        'rate_limit': getattr(args, f"{attr}rate_limit"),
+        'burst': getattr(args, f"{attr}burst"),
+        'seed': getattr(args, f"{attr}seed"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the name matching API")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockServer((args.host, args.port), **server_options(args))
+    print(f"Mock name matching API listening on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.stats))
+
+
+if __name__ == "__main__":
+    main()
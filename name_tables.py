@@ -0,0 +1,286 @@
+"""Compiled lookup tables for name canonicalization.
+
+The source lists in ``lookup_tables/`` (nicknames, aliases, titles,
+suffixes, transliterations) are compiled into one open-addressing hash
+table, ``lookup_tables/name_tables.bin``, which is memory-mapped once per
+process. A lookup hashes the key with CRC-32 and probes fixed-width slots,
+so it costs O(1) and the pages are shared by every process on the host
+(app, benchmark, local engine workers).
+
+    python name_tables.py build    # regenerate after editing the lists
+    python name_tables.py check    # exit 1 if the compiled file is stale
+"""
+import argparse
+import functools
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import unicodedata
+import zlib
+from collections import defaultdict
+
+SOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lookup_tables")
+COMPILED_PATH = os.path.join(SOURCE_DIR, "name_tables.bin")
+NAME_FILES = ("nicknames.txt", "aliases.txt")
+TITLES_FILE = "titles.txt"
+SUFFIXES_FILE = "suffixes.txt"
+TRANSLITERATIONS_FILE = "transliterations.txt"
+SOURCE_FILES = NAME_FILES + (TITLES_FILE, SUFFIXES_FILE, TRANSLITERATIONS_FILE)
+
+# Key prefixes of the entry kinds sharing the table
+KIND_NAME = "n"
+KIND_TITLE = "t"
+KIND_SUFFIX = "s"
+KIND_TRANSLITERATION = "x"
+
+MAGIC = b"NMTB"
+FORMAT_VERSION = 1
+# magic, version, slot count, entry count, SHA-1 of the sources
+_HEADER = struct.Struct("<4sHxxII20s")
+# key hash, key offset, value offset, key length, value length
+_SLOT = struct.Struct("<IIIHH")
+_EMPTY = 0xFFFFFFFF
+FORM_SEPARATOR = "|"
+
+
+def _source_lines(path):
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.split("#", 1)[0].rstrip("\n")
+            if line.strip():
+                yield number, line
+
+
+def _token(value, path, number):
+    token = value.strip().casefold()
+    if not token or " " in token:
+        raise ValueError(f"{os.path.basename(path)}:{number}: expected a single token, got {value!r}")
+    return token
+
+
+def source_digest(source_dir=SOURCE_DIR):
+    """SHA-1 over the source lists, stored in the compiled file to detect staleness"""
+    digest = hashlib.sha1()
+    for filename in SOURCE_FILES:
+        digest.update(filename.encode('utf-8') + b"\0")
+        with open(os.path.join(source_dir, filename), 'rb') as f:
+            digest.update(f.read())
+    return digest.digest()
+
+
+def read_sources(source_dir=SOURCE_DIR):
+    """Parse the source lists into ``{kind + ":" + key: value}`` entries"""
+    forms = defaultdict(set)
+    for filename in NAME_FILES:
+        path = os.path.join(source_dir, filename)
+        for number, line in _source_lines(path):
+            canonical, separator, variants = line.partition(":")
+            if not separator:
+                raise ValueError(f"{filename}:{number}: expected 'canonical: variant, ...'")
+            canonical = _token(canonical, path, number)
+            forms[canonical].add(canonical)
+            for variant in filter(str.strip, variants.split(",")):
+                forms[_token(variant, path, number)].add(canonical)
+
+    entries = {
+        f"{KIND_NAME}:{token}": FORM_SEPARATOR.join(sorted(canonicals))
+        for token, canonicals in forms.items()
+        # A canonical name nobody else maps to needs no entry
+        if canonicals != {token}
+    }
+    for filename, kind in ((TITLES_FILE, KIND_TITLE), (SUFFIXES_FILE, KIND_SUFFIX)):
+        path = os.path.join(source_dir, filename)
+        for number, line in _source_lines(path):
+            entries[f"{kind}:{_token(line, path, number)}"] = ""
+    path = os.path.join(source_dir, TRANSLITERATIONS_FILE)
+    for number, line in _source_lines(path):
+        character, _, replacement = line.strip().partition(" ")
+        if len(character) != 1:
+            raise ValueError(f"{TRANSLITERATIONS_FILE}:{number}: expected 'character replacement'")
+        entries[f"{KIND_TRANSLITERATION}:{character}"] = replacement.strip()
+    return entries
+
+
+def compile_tables(entries, digest=b"\0" * 20):
+    """Serialize entries into the hash table format and return the bytes"""
+    slot_count = 1
+    while slot_count < len(entries) * 2:
+        slot_count *= 2
+    slots = [None] * slot_count
+    blob = bytearray()
+    for key, value in sorted(entries.items()):
+        key_bytes, value_bytes = key.encode('utf-8'), value.encode('utf-8')
+        key_hash = zlib.crc32(key_bytes)
+        key_offset = len(blob)
+        blob += key_bytes
+        value_offset = len(blob)
+        blob += value_bytes
+        position = key_hash & (slot_count - 1)
+        while slots[position] is not None:
+            position = (position + 1) & (slot_count - 1)
+        slots[position] = (key_hash, key_offset, value_offset, len(key_bytes), len(value_bytes))
+
+    output = bytearray(_HEADER.pack(MAGIC, FORMAT_VERSION, slot_count, len(entries), digest))
+    for slot in slots:
+        output += _SLOT.pack(*slot) if slot is not None else _SLOT.pack(0, _EMPTY, 0, 0, 0)
+    output += blob
+    return bytes(output)
+
+
+def build(source_dir=SOURCE_DIR, output_path=COMPILED_PATH):
+    """Compile the source lists to ``output_path`` atomically; returns the entry count"""
+    entries = read_sources(source_dir)
+    data = compile_tables(entries, source_digest(source_dir))
+    temp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, output_path)
+    return len(entries)
+
+
+class NameTables:
+    """Read-only view of a compiled table held in a buffer (bytes or mmap)"""
+
+    def __init__(self, buffer):
+        magic, version, self.slot_count, self.entry_count, self.digest = _HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Not a compiled name table (rebuild with `python name_tables.py build`)")
+        self._buffer = buffer
+        self._mask = self.slot_count - 1
+        self._blob_offset = _HEADER.size + self.slot_count * _SLOT.size
+
+    @classmethod
+    def open(cls, path=COMPILED_PATH):
+        with open(path, 'rb') as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @classmethod
+    def from_sources(cls, source_dir=SOURCE_DIR):
+        return cls(compile_tables(read_sources(source_dir), source_digest(source_dir)))
+
+    def __len__(self):
+        return self.entry_count
+
+    def get(self, kind, key):
+        """Value stored for ``key`` of ``kind``, or None"""
+        key_bytes = f"{kind}:{key}".encode('utf-8')
+        key_hash = zlib.crc32(key_bytes)
+        buffer = self._buffer
+        position = key_hash & self._mask
+        while True:
+            slot_hash, key_offset, value_offset, key_length, value_length = _SLOT.unpack_from(
+                buffer, _HEADER.size + position * _SLOT.size
+            )
+            if key_offset == _EMPTY:
+                return None
+            if slot_hash == key_hash and key_length == len(key_bytes):
+                start = self._blob_offset + key_offset
+                if buffer[start:start + key_length] == key_bytes:
+                    start = self._blob_offset + value_offset
+                    return bytes(buffer[start:start + value_length]).decode('utf-8')
+            position = (position + 1) & self._mask
+
+
+_tables = None
+_tables_lock = threading.Lock()
+
+
+def get_tables():
+    """Process-wide tables; compiled in memory if the compiled file is missing"""
+    global _tables
+    if _tables is None:
+        with _tables_lock:
+            if _tables is None:
+                _tables = NameTables.open() if os.path.exists(COMPILED_PATH) else NameTables.from_sources()
+    return _tables
+
+
+@functools.lru_cache(maxsize=4096)
+def _transliterate_char(character):
+    replacement = get_tables().get(KIND_TRANSLITERATION, character)
+    return character if replacement is None else replacement
+
+
+def transliterate(text):
+    """Replace characters that have a table entry (e.g. Cyrillic, Greek, ``ø``)"""
+    return "".join(_transliterate_char(character) for character in text)
+
+
+def fold_text(text):
+    """Case-fold, transliterate to Latin and strip diacritics"""
+    text = str(text).casefold()
+    if text.isascii():
+        return text
+    decomposed = unicodedata.normalize("NFKD", transliterate(text))
+    text = "".join(character for character in decomposed if not unicodedata.combining(character))
+    # Letters that only became table entries once their accents were removed
+    return text if text.isascii() else transliterate(text)
+
+
+@functools.lru_cache(maxsize=4096)
+def is_title(token):
+    return get_tables().get(KIND_TITLE, token) is not None
+
+
+@functools.lru_cache(maxsize=4096)
+def is_suffix(token):
+    return get_tables().get(KIND_SUFFIX, token) is not None
+
+
+def strip_honorifics(tokens):
+    """Drop leading titles and trailing credentials from folded tokens, keeping at least one.
+
+    Generational suffixes (jr, sr, iii) are not in the table and are kept.
+    """
+    start, end = 0, len(tokens)
+    while end - start > 1 and is_title(tokens[start].strip(".,")):
+        start += 1
+    while end - start > 1 and is_suffix(tokens[end - 1].strip(".,")):
+        end -= 1
+    return tokens[start:end]
+
+
+@functools.lru_cache(maxsize=65536)
+def canonical_forms(token):
+    """Canonical names a folded token can stand for, e.g. ``mike`` -> ``('michael',)``.
+
+    Ambiguous nicknames have several (``alex`` -> alexander, alexandra);
+    unknown tokens stand for themselves.
+    """
+    value = get_tables().get(KIND_NAME, token)
+    return tuple(value.split(FORM_SEPARATOR)) if value else (token,)
+
+
+def canonical_token(token):
+    """Single deterministic canonical name for a token (the first of its forms)"""
+    return canonical_forms(token)[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile the name canonicalization tables")
+    parser.add_argument("command", choices=["build", "check"])
+    parser.add_argument("--sources", default=SOURCE_DIR, help="Directory with the source lists")
+    parser.add_argument("--output", default=COMPILED_PATH, help="Compiled table path")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        count = build(args.sources, args.output)
+        print(f"Compiled {count} entries to {args.output}")
+        return 0
+
+    if not os.path.exists(args.output):
+        print(f"{args.output} is missing; run `python name_tables.py build`")
+        return 1
+    with open(args.output, 'rb') as f:
+        compiled = NameTables(f.read())
+    if compiled.digest != source_digest(args.sources):
+        print(f"{args.output} is out of date with {args.sources}; run `python name_tables.py build`")
+        return 1
+    print(f"{args.output} is up to date ({len(compiled)} entries)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
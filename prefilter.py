@@ -0,0 +1,263 @@
+import re
+import threading
+
+from name_tables import canonical_forms, canonical_token, fold_text, strip_honorifics
+
+DEFAULT_MATCH_THRESHOLD = 0.97
+DEFAULT_NON_MATCH_THRESHOLD = 0.3
+# Confidence given to pairs that only differ by known nicknames, aliases or titles
+EQUIVALENT_NAME_CONFIDENCE = 0.95
+# Used only when the API cannot be reached and a local verdict is better than none
+FALLBACK_MATCH_THRESHOLD = 0.8
+
+_NON_LETTERS = re.compile(r"[^\w\s]|[\d_]")
+_DIGITS = re.compile(r"\d+")
+
+
+def normalize_for_matching(name):
+    """Fold case, accents and non-Latin scripts, drop digits/punctuation and collapse whitespace"""
+    return " ".join(_NON_LETTERS.sub(" ", fold_text(name)).split())
+
+
+def canonical_tokens(name, nicknames=True):
+    """Normalized tokens without titles/credentials, with nicknames and aliases mapped to one canonical name"""
+    tokens = strip_honorifics(normalize_for_matching(name).split())
+    return [canonical_token(token) for token in tokens] if nicknames else tokens
+
+
+def same_person_tokens(token1, token2):
+    """Whether two tokens are the same given name by the lookup tables.
+
+    Either one is a canonical form of the other (``mike``/``michael``), or
+    both are variants of one and the same canonical name (``bill``/``will``).
+    An ambiguous nickname never matches through just one of its forms, so
+    ``al`` (albert, alfred) is not ``fred`` (alfred, frederick).
+    """
+    if token1 == token2:
+        return True
+    forms1, forms2 = canonical_forms(token1), canonical_forms(token2)
+    if token2 in forms1 or token1 in forms2:
+        return True
+    return len(forms1) == 1 and forms1 == forms2
+
+
+def equivalent_tokens(name1, name2):
+    """Pair up the tokens of two names that are the same person by the lookup tables.
+
+    Titles and credentials are ignored and tokens may be in any order; each
+    pair must be identical or the same name by ``same_person_tokens``.
+    Returns the ``(token1, token2)`` pairs, or None if the names differ.
+    """
+    tokens1 = strip_honorifics(normalize_for_matching(name1).split())
+    remaining = strip_honorifics(normalize_for_matching(name2).split())
+    if not tokens1 or len(tokens1) != len(remaining):
+        return None
+    pairs = []
+    for token in tokens1:
+        if token in remaining:
+            match = token
+        else:
+            match = next((other for other in remaining if same_person_tokens(token, other)), None)
+            if match is None:
+                return None
+        remaining.remove(match)
+        pairs.append((token, match))
+    return pairs
+
+
+def jaccard_similarity(tokens1, tokens2):
+    """Jaccard similarity of two token sets (0.0 if either is empty)"""
+    set1, set2 = set(tokens1), set(tokens2)
+    if not set1 or not set2:
+        return 0.0
+    return len(set1 & set2) / len(set1 | set2)
+
+
+def jaro_similarity(s1, s2):
+    """Jaro similarity of two strings"""
+    if s1 == s2:
+        return 1.0
+    len1, len2 = len(s1), len(s2)
+    if not len1 or not len2:
+        return 0.0
+
+    window = max(0, max(len1, len2) // 2 - 1)
+    matched1 = [False] * len1
+    matched2 = [False] * len2
+    matches = 0
+    for i, ch in enumerate(s1):
+        for j in range(max(0, i - window), min(len2, i + window + 1)):
+            if not matched2[j] and s2[j] == ch:
+                matched1[i] = matched2[j] = True
+                matches += 1
+                break
+    if not matches:
+        return 0.0
+
+    transpositions = 0
+    j = 0
+    for i in range(len1):
+        if matched1[i]:
+            while not matched2[j]:
+                j += 1
+            if s1[i] != s2[j]:
+                transpositions += 1
+            j += 1
+
+    return (matches / len1 + matches / len2 + (matches - transpositions / 2) / matches) / 3
+
+
+def jaro_winkler_similarity(s1, s2, prefix_weight=0.1):
+    """Jaro-Winkler similarity, boosting strings that share a prefix of up to 4 chars"""
+    jaro = jaro_similarity(s1, s2)
+    prefix = 0
+    for ch1, ch2 in zip(s1[:4], s2[:4]):
+        if ch1 != ch2:
+            break
+        prefix += 1
+    return jaro + prefix * prefix_weight * (1 - jaro)
+
+
+def score_pair(name1, name2):
+    """Compute the local similarity features for a name pair.
+
+    Returns None if either name has no letters left after normalization
+    (e.g. ``'123'``): there is nothing to compare locally. Digits are not
+    compared as letters, but names whose numbers differ (``John Smith 1`` /
+    ``John Smith 2``) are never ``exact`` and have ``same_digits`` False.
+    """
+    normalized1 = normalize_for_matching(name1)
+    normalized2 = normalize_for_matching(name2)
+    tokens1, tokens2 = normalized1.split(), normalized2.split()
+    compact1, compact2 = normalized1.replace(" ", ""), normalized2.replace(" ", "")
+    if not compact1 or not compact2:
+        return None
+
+    same_digits = _DIGITS.findall(fold_text(name1)) == _DIGITS.findall(fold_text(name2))
+    jaccard = jaccard_similarity(tokens1, tokens2)
+    jaro_winkler = jaro_winkler_similarity(compact1, compact2)
+    return {
+        'exact': compact1 == compact2 and same_digits,
+        'same_digits': same_digits,
+        'jaccard': jaccard,
+        'jaro_winkler': jaro_winkler,
+        'shared_tokens': bool(set(tokens1) & set(tokens2)),
+        'shared_initials': bool({t[0] for t in tokens1} & {t[0] for t in tokens2}),
+        'score': (jaccard + jaro_winkler) / 2,
+    }
+
+
+def fallback_result(name1, name2, threshold=FALLBACK_MATCH_THRESHOLD):
+    """Best-effort local verdict in the API schema, flagged with ``fallback: True``"""
+    features = score_pair(name1, name2)
+    if features is None:
+        return {
+            'is_match': "no",
+            'confidence_score': 0.0,
+            'reason': "Local fallback (API unavailable): no letters to compare",
+            'fallback': True,
+        }
+    confidence = 1.0 if features['exact'] else features['score']
+    return {
+        'is_match': "yes" if confidence >= threshold else "no",
+        'confidence_score': round(confidence, 4),
+        'reason': (
+            f"Local fallback (API unavailable): Jaro-Winkler {features['jaro_winkler']:.2f}, "
+            f"token overlap {features['jaccard']:.2f}"
+        ),
+        'fallback': True,
+    }
+
+
+class PreFilter:
+    """Decides trivially easy pairs locally so only the ambiguous band reaches the API.
+
+    Returns results in the API schema (``is_match``, ``confidence_score``,
+    ``reason``). Counters are shared across threads.
+    """
+
+    def __init__(self, match_threshold=DEFAULT_MATCH_THRESHOLD,
+                 non_match_threshold=DEFAULT_NON_MATCH_THRESHOLD, enabled=True):
+        self._lock = threading.Lock()
+        self.enabled = enabled
+        self.match_threshold = match_threshold
+        self.non_match_threshold = non_match_threshold
+        self.evaluated = 0
+        self.matches = 0
+        self.non_matches = 0
+
+    def configure(self, enabled=None, match_threshold=None, non_match_threshold=None):
+        """Update settings in place"""
+        with self._lock:
+            if enabled is not None:
+                self.enabled = enabled
+            if match_threshold is not None:
+                self.match_threshold = match_threshold
+            if non_match_threshold is not None:
+                self.non_match_threshold = non_match_threshold
+
+    def evaluate(self, name1, name2):
+        """Return a local result for an obvious pair, or None to defer to the API"""
+        if not self.enabled:
+            return None
+
+        features = score_pair(name1, name2)
+        equivalent = None if features is None or features['exact'] else equivalent_tokens(name1, name2)
+        result = None
+        if features is None or not features['same_digits']:
+            # Names with no letters, or whose numbers differ, are left to the API
+            pass
+        elif features['exact']:
+            result = self._result("yes", 1.0, "Exact match after normalization")
+        elif equivalent is not None:
+            variants = [f"{token1} ≈ {token2}" for token1, token2 in equivalent if token1 != token2]
+            result = self._result(
+                "yes", max(features['score'], EQUIVALENT_NAME_CONFIDENCE),
+                f"Known nickname/alias ({', '.join(variants)})" if variants
+                else "Same name tokens once titles and credentials are removed"
+            )
+        elif features['score'] >= self.match_threshold:
+            result = self._result(
+                "yes", features['score'],
+                f"Near-identical names (Jaro-Winkler {features['jaro_winkler']:.2f}, token overlap {features['jaccard']:.2f})"
+            )
+        elif (features['score'] <= self.non_match_threshold
+              and not features['shared_tokens'] and not features['shared_initials']):
+            result = self._result(
+                "no", features['score'],
+                f"No shared tokens or initials (Jaro-Winkler {features['jaro_winkler']:.2f})"
+            )
+
+        with self._lock:
+            self.evaluated += 1
+            if result is not None:
+                if result['is_match'] == "yes":
+                    self.matches += 1
+                else:
+                    self.non_matches += 1
+        return result
+
+    def reset_stats(self):
+        with self._lock:
+            self.evaluated = self.matches = self.non_matches = 0
+
+    def stats(self):
+        """Return a snapshot of the short-circuit counters"""
+        with self._lock:
+            decided = self.matches + self.non_matches
+            return {
+                'evaluated': self.evaluated,
+                'matches': self.matches,
+                'non_matches': self.non_matches,
+                'forwarded': self.evaluated - decided,
+                'short_circuit_rate': decided / self.evaluated if self.evaluated else 0.0,
+            }
+
+    @staticmethod
+    def _result(is_match, confidence, reason):
+        return {
+            'is_match': is_match,
+            'confidence_score': round(confidence, 4),
+            'reason': f"Local pre-filter: {reason}",
+            'prefiltered': True,
+        }
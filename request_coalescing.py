@@ -0,0 +1,191 @@
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+DEFAULT_BATCH_WINDOW_MS = 5
+DEFAULT_MAX_BATCH_SIZE = 50
+DEFAULT_FALLBACK_WORKERS = 16
+
+
+class BulkNotSupportedError(Exception):
+    """Raised when the backend has no bulk match endpoint"""
+
+
+def _copy_outcome(outcome):
+    # Callers annotate result dicts (timestamps, history), so never share one
+    result, error = outcome
+    return (dict(result) if result is not None else None), error
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait for and share its ``(result, error)`` outcome.
+    """
+
+    def __init__(self, enabled=True):
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.enabled = enabled
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args):
+        """Run ``fn(*args)`` once per in-flight ``key`` and return its outcome"""
+        if not self.enabled:
+            return fn(*args)
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return _copy_outcome(future.result())
+
+        try:
+            outcome = fn(*args)
+            future.set_result(outcome)
+            return outcome
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'executions': self.executions,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._in_flight),
+            }
+
+
+class MicroBatcher:
+    """Groups pairs submitted within a short window into one bulk request.
+
+    ``send_single(name1, name2, endpoint)`` returns ``(result, error)``;
+    ``send_bulk(pairs, endpoint)`` returns ``(results, error)`` or raises
+    ``BulkNotSupportedError``, after which that endpoint is served by
+    parallel single calls.
+    """
+
+    def __init__(self, send_single, send_bulk, window_ms=DEFAULT_BATCH_WINDOW_MS,
+                 max_batch_size=DEFAULT_MAX_BATCH_SIZE, fallback_workers=DEFAULT_FALLBACK_WORKERS,
+                 enabled=False):
+        self._send_single = send_single
+        self._send_bulk = send_bulk
+        self.window_ms = window_ms
+        self.max_batch_size = max_batch_size
+        self.enabled = enabled
+        self._cond = threading.Condition()
+        self._pending = []
+        self._dispatcher = None
+        self._executor = ThreadPoolExecutor(max_workers=fallback_workers, thread_name_prefix="micro-batch")
+        self._unsupported_endpoints = set()
+        self.batches_sent = 0
+        self.pairs_batched = 0
+        self.fallback_pairs = 0
+
+    def configure(self, enabled=None, window_ms=None, max_batch_size=None):
+        """Update settings in place"""
+        with self._cond:
+            if enabled is not None:
+                self.enabled = enabled
+            if window_ms is not None:
+                self.window_ms = max(0, window_ms)
+            if max_batch_size is not None:
+                self.max_batch_size = max(1, int(max_batch_size))
+
+    def match(self, name1, name2, endpoint):
+        """Queue a pair for the next batch and block until its outcome is ready"""
+        if not self.enabled:
+            return self._send_single(name1, name2, endpoint)
+        return self.submit(name1, name2, endpoint).result()
+
+    def submit(self, name1, name2, endpoint):
+        """Queue a pair for the next batch and return a Future of ``(result, error)``"""
+        future = Future()
+        with self._cond:
+            self._pending.append((name1, name2, endpoint, future))
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._run, name="micro-batch-dispatcher", daemon=True)
+                self._dispatcher.start()
+            self._cond.notify()
+        return future
+
+    def stats(self):
+        with self._cond:
+            return {
+                'enabled': self.enabled,
+                'batches_sent': self.batches_sent,
+                'pairs_batched': self.pairs_batched,
+                'fallback_pairs': self.fallback_pairs,
+                'average_batch_size': self.pairs_batched / self.batches_sent if self.batches_sent else 0.0,
+                'bulk_unsupported': sorted(self._unsupported_endpoints),
+            }
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                # Hold the first pair for up to one window to let others join it
+                deadline = time.monotonic() + self.window_ms / 1000
+                while len(self._pending) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self.max_batch_size]
+                del self._pending[:self.max_batch_size]
+
+            by_endpoint = defaultdict(list)
+            for name1, name2, endpoint, future in batch:
+                by_endpoint[endpoint].append((name1, name2, future))
+            for endpoint, items in by_endpoint.items():
+                self._executor.submit(self._send_batch, endpoint, items)
+
+    def _send_batch(self, endpoint, items):
+        if len(items) > 1 and endpoint not in self._unsupported_endpoints:
+            try:
+                results, error = self._send_bulk([(name1, name2) for name1, name2, _ in items], endpoint)
+            except BulkNotSupportedError:
+                with self._cond:
+                    self._unsupported_endpoints.add(endpoint)
+            except Exception as e:
+                for _, _, future in items:
+                    future.set_result((None, f"Error: {str(e)}"))
+                return
+            else:
+                with self._cond:
+                    self.batches_sent += 1
+                    self.pairs_batched += len(items)
+                for index, (_, _, future) in enumerate(items):
+                    if error:
+                        future.set_result((None, error))
+                    else:
+                        future.set_result((results[index], None))
+                return
+
+        # Parallel single calls when batching is pointless or unsupported
+        with self._cond:
+            self.fallback_pairs += len(items)
+        for name1, name2, future in items:
+            self._executor.submit(self._resolve_single, future, name1, name2, endpoint)
+
+    def _resolve_single(self, future, name1, name2, endpoint):
+        try:
+            future.set_result(self._send_single(name1, name2, endpoint))
+        except Exception as e:
+            future.set_result((None, f"Error: {str(e)}"))
@@ -0,0 +1,215 @@
+"""Save, reload and diff full result sets as Parquet or Arrow IPC files.
+
+Names, reasons and errors are dictionary-encoded, so a run where the same
+names and reasons repeat stores each distinct string once. Arrow IPC files
+are read through a memory map: the numeric columns are used in place and
+each distinct string is decoded once, so a multi-million-row run opens in
+the viewer without parsing. Parquet is smaller on disk and is the better
+choice for archiving or sharing.
+
+    python result_archive.py diff baseline.arrow latest.arrow
+    python result_archive.py info latest.parquet
+"""
+import argparse
+import io
+import os
+
+from results_table import SOURCE_API, ColumnarResults
+
+ARCHIVE_FORMATS = ['arrow', 'parquet']
+ARCHIVE_EXTENSIONS = {'arrow': '.arrow', 'parquet': '.parquet'}
+# Arrow IPC buffers compressed with lz4 are still memory-mapped, but decoded on read
+DEFAULT_COMPRESSION = {'arrow': None, 'parquet': 'zstd'}
+DEFAULT_CONFIDENCE_TOLERANCE = 0.01
+CHANGE_KINDS = ['added', 'removed', 'verdict', 'confidence']
+_PARQUET_MAGIC = b"PAR1"
+
+
+def archive_format(path):
+    """Format implied by a file name, defaulting to Arrow IPC"""
+    return 'parquet' if str(path).lower().endswith(('.parquet', '.pq')) else 'arrow'
+
+
+def save_results(results, destination, fmt=None, compression='default'):
+    """Write a ColumnarResults (or its Arrow table) to a path or binary file object"""
+    import pyarrow as pa
+
+    fmt = fmt or archive_format(destination)
+    if fmt not in ARCHIVE_FORMATS:
+        raise ValueError(f"Unknown archive format {fmt!r}; expected one of {ARCHIVE_FORMATS}")
+    if compression == 'default':
+        compression = DEFAULT_COMPRESSION[fmt]
+    table = results.to_arrow() if isinstance(results, ColumnarResults) else results
+
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+
+        pq.write_table(table, destination, compression=compression or 'none', use_dictionary=True)
+        return
+
+    # One dictionary per column, shared by every record batch in the file
+    table = table.unify_dictionaries().combine_chunks()
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    sink = pa.OSFile(destination, 'wb') if isinstance(destination, (str, os.PathLike)) else destination
+    try:
+        with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+            writer.write_table(table)
+    finally:
+        if sink is not destination:
+            sink.close()
+
+
+def results_to_bytes(results, fmt):
+    """Serialized archive bytes, for download buttons"""
+    buffer = io.BytesIO()
+    save_results(results, buffer, fmt)
+    return buffer.getvalue()
+
+
+def read_arrow(source):
+    """Arrow table from a path (memory-mapped) or from bytes / a file object"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            is_parquet = f.read(4) == _PARQUET_MAGIC
+        if is_parquet:
+            return pq.read_table(source, memory_map=True)
+        with pa.memory_map(str(source), 'r') as mapped:
+            return pa.ipc.open_file(mapped).read_all()
+
+    data = source if isinstance(source, (bytes, bytearray, memoryview)) else source.read()
+    if bytes(data[:4]) == _PARQUET_MAGIC:
+        return pq.read_table(pa.BufferReader(data))
+    return pa.ipc.open_file(pa.BufferReader(data)).read_all()
+
+
+def load_results(source):
+    """Reload a saved run into a ColumnarResults"""
+    return ColumnarResults.from_arrow(read_arrow(source))
+
+
+def _pair_verdicts(results):
+    import pyarrow as pa
+
+    table = results.to_arrow() if isinstance(results, ColumnarResults) else results
+    table = table.select(['name1', 'name2', 'is_match', 'confidence_score', 'reason'])
+    table = pa.table({
+        name: table.column(name).cast(pa.string()) if name != 'confidence_score' else table.column(name)
+        for name in table.column_names
+    })
+    # Reruns of the same pair within one run: the last verdict wins
+    table = table.append_column('position', pa.array(range(table.num_rows), type=pa.int64()))
+    latest = table.group_by(['name1', 'name2'], use_threads=False).aggregate([('position', 'max')])
+    return table.take(latest.column('position_max')).drop_columns(['position'])
+
+
+def diff_results(old, new, confidence_tolerance=DEFAULT_CONFIDENCE_TOLERANCE):
+    """Join two runs on (name1, name2) and classify every pair.
+
+    Returns ``(summary, changes)``: per-kind counts (plus ``unchanged``) and
+    an Arrow table of the pairs that were added, removed, flipped verdict
+    or moved confidence by more than ``confidence_tolerance``.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    old_pairs = _pair_verdicts(old)
+    new_pairs = _pair_verdicts(new)
+    old_pairs = old_pairs.append_column('in_old', pa.array([True] * old_pairs.num_rows, type=pa.bool_()))
+    new_pairs = new_pairs.append_column('in_new', pa.array([True] * new_pairs.num_rows, type=pa.bool_()))
+    joined = old_pairs.join(
+        new_pairs, keys=['name1', 'name2'], join_type='full outer',
+        left_suffix='_old', right_suffix='_new', use_threads=False
+    )
+
+    in_old = pc.fill_null(joined.column('in_old'), False)
+    in_new = pc.fill_null(joined.column('in_new'), False)
+    both = pc.and_(in_old, in_new)
+    # Failed rows have no verdict; an error in both runs is not a change
+    verdict_changed = pc.and_(both, pc.not_equal(
+        pc.fill_null(joined.column('is_match_old'), ''), pc.fill_null(joined.column('is_match_new'), '')
+    ))
+    delta = pc.subtract(joined.column('confidence_score_new'), joined.column('confidence_score_old'))
+    confidence_changed = pc.and_(
+        pc.and_(both, pc.invert(verdict_changed)),
+        pc.fill_null(pc.greater(pc.abs(delta), confidence_tolerance), False)
+    )
+    kind = pc.case_when(
+        pc.make_struct(pc.invert(in_old), pc.invert(in_new), verdict_changed, confidence_changed),
+        *[pa.scalar(name) for name in CHANGE_KINDS],
+        pa.scalar('unchanged')
+    )
+    joined = joined.append_column('change', kind).append_column('confidence_delta', delta)
+
+    counts = {item['values']: item['counts'] for item in joined.column('change').value_counts().to_pylist()}
+    summary = {name: counts.get(name, 0) for name in CHANGE_KINDS + ['unchanged']}
+    summary['old_pairs'] = old_pairs.num_rows
+    summary['new_pairs'] = new_pairs.num_rows
+
+    changes = joined.filter(pc.not_equal(joined.column('change'), 'unchanged')).select([
+        'change', 'name1', 'name2', 'is_match_old', 'is_match_new',
+        'confidence_score_old', 'confidence_score_new', 'confidence_delta', 'reason_old', 'reason_new',
+    ])
+    return summary, changes
+
+
+def prewarm_cache(results, cache, limit=None):
+    """Load a run's API verdicts into a ResultCache; returns how many entries were stored.
+
+    Only the latest ``limit`` verdicts are used (default: the cache size),
+    keyed by the endpoint that produced them. Runs scored by the local
+    engine, and runs whose endpoint is unknown, are skipped so they never
+    stand in for another API's answers.
+    """
+    if results.source != SOURCE_API or not results.endpoint:
+        return 0
+    limit = cache.max_size if limit is None else min(limit, cache.max_size)
+    return cache.put_many(results.cacheable_results(limit), results.endpoint)
+
+
+def format_diff_summary(summary):
+    changed = sum(summary[name] for name in CHANGE_KINDS)
+    return (
+        f"{summary['old_pairs']} -> {summary['new_pairs']} pairs, {changed} changed: "
+        + ", ".join(f"{summary[name]} {name}" for name in CHANGE_KINDS)
+        + f", {summary['unchanged']} unchanged"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and diff saved match runs")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    info = subparsers.add_parser("info", help="Summarize a saved run")
+    info.add_argument("path")
+    diff = subparsers.add_parser("diff", help="Pairs whose verdict or confidence changed between two runs")
+    diff.add_argument("old")
+    diff.add_argument("new")
+    diff.add_argument("--tolerance", type=float, default=DEFAULT_CONFIDENCE_TOLERANCE,
+                      help="Ignore confidence changes up to this size")
+    diff.add_argument("--output", help="Write the changed pairs to this .csv, .parquet or .arrow file")
+    args = parser.parse_args(argv)
+
+    if args.command == "info":
+        results = load_results(args.path)
+        stats = results.stats()
+        print(f"{args.path}: {stats['rows']} rows ({results.source}), {stats['matches']} matches, "
+              f"{stats['errors']} errors, mean confidence {stats['mean_confidence']:.3f}")
+        return 0
+
+    summary, changes = diff_results(read_arrow(args.old), read_arrow(args.new), args.tolerance)
+    print(format_diff_summary(summary))
+    if args.output:
+        if args.output.lower().endswith('.csv'):
+            import pyarrow.csv
+
+            pyarrow.csv.write_csv(changes, args.output)
+        else:
+            save_results(changes, args.output)
+        print(f"Changes written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,136 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from name_tables import fold_text
+
+DEFAULT_CACHE_MAX_SIZE = 10000
+DEFAULT_CACHE_TTL_SECONDS = 3600
+
+
+def normalize_name(name):
+    """Fold case, accents and scripts and collapse whitespace.
+
+    Titles, suffixes and nicknames are deliberately kept: the API may score
+    ``Mike``/``Michael`` or ``John Smith Jr``/``John Smith Sr`` differently
+    from an identical pair, so they keep separate cache entries.
+    """
+    return " ".join(fold_text(name).split())
+
+
+def pair_key(name1, name2):
+    """Build an order-insensitive cache key for a name pair"""
+    return tuple(sorted((normalize_name(name1), normalize_name(name2))))
+
+
+def cache_key(name1, name2, endpoint=None):
+    """Key for a pair's verdict from one endpoint; other APIs and stand-in servers get their own entries"""
+    return (endpoint,) + pair_key(name1, name2)
+
+
+def pair_hash(name1, name2, endpoint=None):
+    """Stable hex digest of the endpoint and normalized pair, for persistent storage keys"""
+    parts = pair_key(name1, name2) if endpoint is None else cache_key(name1, name2, endpoint)
+    return hashlib.sha1("\x1f".join(parts).encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """Thread-safe LRU cache of API results with a per-entry TTL.
+
+    A single instance is shared by every Streamlit session and batch worker,
+    so all access goes through one lock.
+    """
+
+    def __init__(self, max_size=DEFAULT_CACHE_MAX_SIZE, ttl_seconds=DEFAULT_CACHE_TTL_SECONDS):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def configure(self, max_size=None, ttl_seconds=None):
+        """Update limits in place, evicting entries if the cache shrank"""
+        with self._lock:
+            if max_size is not None:
+                self.max_size = max(1, int(max_size))
+            if ttl_seconds is not None:
+                self.ttl_seconds = max(0, ttl_seconds)
+            self._evict_overflow()
+
+    def get(self, name1, name2, endpoint=None):
+        """Return a copy of the cached result for a pair from ``endpoint``, or None"""
+        key = cache_key(name1, name2, endpoint)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            stored_at, result = entry
+            if self.ttl_seconds and now - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(result)
+
+    def put(self, name1, name2, result, endpoint=None, age_seconds=0.0):
+        """Store a result for a pair, evicting the least recently used entries.
+
+        ``age_seconds`` backdates an entry that is already that old (e.g. read
+        back from the persistent store), so it expires on the original schedule.
+        """
+        key = cache_key(name1, name2, endpoint)
+        with self._lock:
+            self._entries[key] = (time.monotonic() - age_seconds, dict(result))
+            self._entries.move_to_end(key)
+            self._evict_overflow()
+
+    def put_many(self, entries, endpoint=None):
+        """Store ``(name1, name2, result)`` entries from ``endpoint`` under one lock; returns how many were stored"""
+        now = time.monotonic()
+        keyed = [(cache_key(name1, name2, endpoint), dict(result)) for name1, name2, result in entries]
+        with self._lock:
+            for key, result in keyed:
+                self._entries[key] = (now, result)
+                self._entries.move_to_end(key)
+            self._evict_overflow()
+        return len(keyed)
+
+    def clear(self):
+        """Drop all entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def stats(self):
+        """Return a snapshot of the cache counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _evict_overflow(self):
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
@@ -0,0 +1,375 @@
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from api_client import get_sheet_routing
+from result_cache import DEFAULT_CACHE_TTL_SECONDS, pair_hash
+
+# Set NAME_MATCH_STORE_PATH to keep results somewhere other than data/
+RESULT_STORE_PATH = os.environ.get("NAME_MATCH_STORE_PATH", os.path.join("data", "results.db"))
+DEFAULT_WRITE_BATCH_SIZE = 200
+DEFAULT_FLUSH_INTERVAL = 0.5  # seconds
+# Failed commits are retried with the next batch this many times before the rows are dropped
+MAX_WRITE_RETRIES = 3
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Whitelisted ORDER BY clauses for history queries; each is backed by an index
+SORT_ORDERS = {
+    'recent': "last_seen_at DESC, pair_hash",
+    'oldest': "last_seen_at ASC, pair_hash",
+    'confidence_desc': "confidence_score DESC, pair_hash",
+    'confidence_asc': "confidence_score ASC, pair_hash",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    pair_hash TEXT PRIMARY KEY,
+    name1 TEXT NOT NULL,
+    name2 TEXT NOT NULL,
+    is_match TEXT NOT NULL,
+    confidence_score REAL NOT NULL,
+    reason TEXT,
+    sheet_name TEXT NOT NULL,
+    response_time_ms REAL,
+    source TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    last_seen_at TEXT NOT NULL,
+    seen_count INTEGER NOT NULL DEFAULT 1,
+    verified_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_results_last_seen ON results (last_seen_at);
+CREATE INDEX IF NOT EXISTS idx_results_match ON results (is_match, last_seen_at);
+CREATE INDEX IF NOT EXISTS idx_results_sheet ON results (sheet_name, last_seen_at);
+CREATE INDEX IF NOT EXISTS idx_results_confidence ON results (confidence_score);
+"""
+
+_UPSERT = """
+INSERT INTO results (
+    pair_hash, name1, name2, is_match, confidence_score, reason, sheet_name,
+    response_time_ms, source, created_at, last_seen_at, verified_at
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (pair_hash) DO UPDATE SET
+    name1 = excluded.name1,
+    name2 = excluded.name2,
+    is_match = excluded.is_match,
+    confidence_score = excluded.confidence_score,
+    reason = excluded.reason,
+    sheet_name = excluded.sheet_name,
+    response_time_ms = COALESCE(excluded.response_time_ms, results.response_time_ms),
+    source = CASE WHEN excluded.source = 'cache' THEN results.source ELSE excluded.source END,
+    last_seen_at = excluded.last_seen_at,
+    seen_count = results.seen_count + 1,
+    verified_at = COALESCE(excluded.verified_at, results.verified_at)
+"""
+
+_COLUMNS = [
+    'pair_hash', 'name1', 'name2', 'is_match', 'confidence_score', 'reason', 'sheet_name',
+    'response_time_ms', 'source', 'created_at', 'last_seen_at', 'seen_count', 'verified_at'
+]
+# Order of the values in a queued row, as bound to _UPSERT
+_ROW_COLUMNS = [column for column in _COLUMNS if column != 'seen_count']
+# Only verdicts that came from the API are served back; the rest is history
+_SERVABLE_SOURCE = 'api'
+
+logger = logging.getLogger(__name__)
+
+
+def _result_source(result):
+    # 'cache' means the verdict was reused, so an existing row keeps its origin
+    if result.get('cached'):
+        return 'cache'
+    if result.get('fallback'):
+        return 'fallback'
+    if result.get('prefiltered'):
+        return 'prefilter'
+    return 'api'
+
+
+class ResultStore:
+    """Persistent SQLite store of match results keyed by normalized pair hash.
+
+    Every verdict is kept for the history, but ``get`` only returns API
+    answers verified within ``ttl_seconds``: pre-filtered and fallback
+    verdicts are never served as cached API results.
+
+    Reads are synchronous point lookups on the primary key. Writes are queued
+    and flushed in batches by a background thread, so recording a result
+    never blocks the Streamlit script thread on disk I/O. The database runs
+    in WAL mode so readers are not blocked by the writer.
+    """
+
+    def __init__(self, path=RESULT_STORE_PATH, batch_size=DEFAULT_WRITE_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, ttl_seconds=DEFAULT_CACHE_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._local = threading.local()
+        connection = self._connect()
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+            columns = {record['name'] for record in connection.execute("PRAGMA table_info(results)")}
+            if 'verified_at' not in columns:
+                # Stores created before verdicts expired; their rows count as unverified
+                connection.execute("ALTER TABLE results ADD COLUMN verified_at TEXT")
+                connection.commit()
+        finally:
+            connection.close()
+
+        # Rows queued but not yet committed, so reads see their own writes
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._closed = False
+        self.writes = 0
+        self.batches = 0
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.failed_batches = 0
+        self.dropped = 0
+        self.last_error = None
+        self._writer = threading.Thread(target=self._write_loop, name="result-store-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def _reader(self):
+        # One read connection per thread; WAL readers never block each other
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    def configure(self, ttl_seconds=None):
+        if ttl_seconds is not None:
+            self.ttl_seconds = max(0, ttl_seconds)
+
+    def get(self, name1, name2, endpoint=None):
+        """Return the stored result for a pair from ``endpoint`` as an API-style dict, or None.
+
+        The result carries ``age_seconds`` since the API last returned it.
+        """
+        key = pair_hash(name1, name2, endpoint)
+        with self._pending_lock:
+            row = self._pending.get(key)
+        if row is not None:
+            row = dict(zip(_ROW_COLUMNS, row))
+            if row['verified_at'] is None and row['source'] == 'cache':
+                # A reused verdict keeps the origin already committed for the pair
+                row = None
+        if row is None:
+            record = self._reader().execute(
+                "SELECT * FROM results WHERE pair_hash = ?", (key,)
+            ).fetchone()
+            row = dict(record) if record else None
+
+        expired = False
+        if row is not None and (row['source'] != _SERVABLE_SOURCE or not row['verified_at']):
+            row = None
+        elif row is not None:
+            age = (datetime.now() - datetime.strptime(row['verified_at'], TIMESTAMP_FORMAT)).total_seconds()
+            expired = bool(self.ttl_seconds) and age > self.ttl_seconds
+
+        with self._pending_lock:
+            if row is None or expired:
+                self.misses += 1
+                self.expirations += expired
+                return None
+            self.hits += 1
+        return {
+            'is_match': row['is_match'],
+            'confidence_score': row['confidence_score'],
+            'reason': row['reason'],
+            'stored_at': row['created_at'],
+            'age_seconds': max(0.0, age),
+        }
+
+    def put(self, name1, name2, result, endpoint=None):
+        """Queue a result for the next batched write.
+
+        Writing an existing pair refreshes its position in the history.
+        """
+        now = datetime.now().strftime(TIMESTAMP_FORMAT)
+        response_time = None if result.get('cached') else result.get('response_time_ms')
+        source = _result_source(result)
+        row = (
+            pair_hash(name1, name2, endpoint),
+            name1,
+            name2,
+            result.get('is_match', 'no'),
+            float(result.get('confidence_score', 0.0)),
+            result.get('reason', ''),
+            get_sheet_routing(result)[0],
+            response_time,
+            source,
+            now,
+            now,
+            now if source == _SERVABLE_SOURCE else None,
+        )
+        with self._pending_lock:
+            self._pending[row[0]] = row
+        self._queue.put(row)
+
+    def flush(self, timeout=5.0):
+        """Block until everything queued so far has been committed"""
+        marker = threading.Event()
+        self._queue.put(marker)
+        marker.wait(timeout)
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._writer.join(timeout=5)
+
+    def _write_loop(self):
+        connection = self._connect()
+        batch, markers = [], []
+        deadline = None
+        attempts = 0
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False
+
+            if isinstance(item, tuple):
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            elif isinstance(item, threading.Event):
+                markers.append(item)
+
+            # A batch waiting for a retry is only written again once its interval is up
+            full = len(batch) >= self.batch_size and not attempts
+            if batch and (full or item is False or item is None or markers):
+                committed = self._commit(connection, batch)
+                if committed or attempts >= MAX_WRITE_RETRIES or item is None:
+                    if not committed:
+                        self._drop(batch)
+                    batch, deadline, attempts = [], None, 0
+                else:
+                    # Locked or full disk: try again after the next interval, with whatever arrives meanwhile
+                    attempts += 1
+                    deadline = time.monotonic() + self.flush_interval
+            elif not batch:
+                deadline = None
+            for marker in markers:
+                marker.set()
+            markers = []
+            if item is None:
+                connection.close()
+                return
+
+    def _commit(self, connection, batch):
+        """Write one batch; returns False (and records the error) if SQLite refused it"""
+        try:
+            with connection:
+                connection.executemany(_UPSERT, batch)
+        except sqlite3.Error as e:
+            # Keep the writer alive; the caller retries the rows or drops them
+            logger.warning("Result store write of %d rows to %s failed: %s", len(batch), self.path, e)
+            with self._pending_lock:
+                self.failed_batches += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+            return False
+        self.writes += len(batch)
+        self.batches += 1
+        self._forget_pending(batch)
+        return True
+
+    def _drop(self, batch):
+        logger.error("Result store gave up on %d rows after %d retries", len(batch), MAX_WRITE_RETRIES)
+        with self._pending_lock:
+            self.dropped += len(batch)
+        self._forget_pending(batch)
+
+    def _forget_pending(self, batch):
+        with self._pending_lock:
+            for row in batch:
+                if self._pending.get(row[0]) is row:
+                    del self._pending[row[0]]
+
+    def _where(self, start=None, end=None, is_match=None, min_confidence=None,
+               max_confidence=None, sheet_name=None, search=None):
+        clauses, params = [], []
+        if start:
+            clauses.append("last_seen_at >= ?")
+            params.append(start)
+        if end:
+            clauses.append("last_seen_at <= ?")
+            params.append(end)
+        if is_match:
+            clauses.append("is_match = ?")
+            params.append(is_match)
+        if min_confidence is not None:
+            clauses.append("confidence_score >= ?")
+            params.append(min_confidence)
+        if max_confidence is not None:
+            clauses.append("confidence_score <= ?")
+            params.append(max_confidence)
+        if sheet_name:
+            clauses.append("sheet_name = ?")
+            params.append(sheet_name)
+        if search:
+            clauses.append("(name1 LIKE ? OR name2 LIKE ?)")
+            params += [f"%{search}%", f"%{search}%"]
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def query(self, limit=50, offset=0, sort='recent', **filters):
+        """Return one page of results, ordered by one of ``SORT_ORDERS``.
+
+        Filters: ``start``/``end`` timestamps (``YYYY-MM-DD HH:MM:SS``),
+        ``is_match`` ("yes"/"no"), ``min_confidence``/``max_confidence``,
+        ``sheet_name`` and a ``search`` substring over both names.
+        """
+        where, params = self._where(**filters)
+        cursor = self._reader().execute(
+            f"SELECT * FROM results{where} ORDER BY {SORT_ORDERS[sort]} LIMIT ? OFFSET ?",
+            params + [int(limit), int(offset)]
+        )
+        return [dict(record) for record in cursor]
+
+    def count(self, **filters):
+        """Number of results matching the filters"""
+        where, params = self._where(**filters)
+        return self._reader().execute(f"SELECT COUNT(*) FROM results{where}", params).fetchone()[0]
+
+    def clear(self):
+        """Delete every stored result"""
+        self.flush()
+        with self._pending_lock:
+            self._pending.clear()
+        connection = self._reader()
+        with connection:
+            connection.execute("DELETE FROM results")
+
+    def stats(self):
+        with self._pending_lock:
+            return {
+                'path': self.path,
+                'hits': self.hits,
+                'misses': self.misses,
+                'expirations': self.expirations,
+                'ttl_seconds': self.ttl_seconds,
+                'writes': self.writes,
+                'batches': self.batches,
+                'pending': len(self._pending),
+                'failed_batches': self.failed_batches,
+                'dropped': self.dropped,
+                'last_error': self.last_error,
+            }
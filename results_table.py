@@ -0,0 +1,414 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from api_client import DEFAULT_DATA_SHEET, FALSE_DATA_SHEET, TRUE_DATA_SHEET
+from batch_matching import RESULT_COLUMNS, results_to_csv, results_to_excel
+from metrics import LatencyHistogram
+
+# Categorical codes; -1 marks rows that failed before a verdict was reached
+MATCH_CATEGORIES = ["no", "yes"]
+SHEET_CATEGORIES = [TRUE_DATA_SHEET, FALSE_DATA_SHEET, DEFAULT_DATA_SHEET]
+CONFIDENCE_BINS = 20
+INITIAL_CAPACITY = 1024
+
+SORTABLE_COLUMNS = ['row', 'confidence_score', 'response_time_ms', 'name1', 'name2']
+
+# Where a table's verdicts came from; saved with exported runs
+SOURCE_API = "api"
+SOURCE_LOCAL_ENGINE = "local"
+ARROW_FORMAT_VERSION = "1"
+
+_NUMERIC_COLUMNS = {
+    'row': np.int64,
+    'match_code': np.int8,
+    'sheet_code': np.int8,
+    'confidence_score': np.float32,
+    'response_time_ms': np.float32,
+    'connect_time_ms': np.float32,
+    'server_time_ms': np.float32,
+    'cached': np.bool_,
+    'prefiltered': np.bool_,
+    'fallback': np.bool_,
+}
+_OBJECT_COLUMNS = ['name1', 'name2', 'reason', 'error']
+
+
+class ColumnarResults:
+    """Append-only, column-oriented store for match results.
+
+    Each field lives in a NumPy array that grows geometrically, match status
+    and routing sheet are stored as int8 category codes, and aggregate stats
+    (match rate, confidence histogram, latency percentiles) are updated as
+    rows arrive. Views sort, filter and slice with vectorized operations and
+    only materialize the requested page as a DataFrame.
+    """
+
+    def __init__(self, capacity=INITIAL_CAPACITY, source=SOURCE_API, endpoint=None):
+        self.source = source
+        # API endpoint the verdicts came from, if known
+        self.endpoint = endpoint
+        self._lock = threading.Lock()
+        self._size = 0
+        self._capacity = capacity
+        self._columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype in _NUMERIC_COLUMNS.items()}
+        self._columns.update({name: np.empty(capacity, dtype=object) for name in _OBJECT_COLUMNS})
+        self.version = 0
+        self._order_cache = {}
+        self._mask_cache = {}
+        self._export_cache = {}
+
+        # Incremental aggregates
+        self.match_count = 0
+        self.error_count = 0
+        self.cached_count = 0
+        self.prefiltered_count = 0
+        self.confidence_sum = 0.0
+        self.confidence_histogram = np.zeros(CONFIDENCE_BINS, dtype=np.int64)
+        self.sheet_counts = np.zeros(len(SHEET_CATEGORIES), dtype=np.int64)
+        self.latency = LatencyHistogram()
+
+    def __len__(self):
+        return self._size
+
+    def _grow(self, needed):
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        if capacity == self._capacity:
+            return
+        for name, column in self._columns.items():
+            grown = np.zeros(capacity, dtype=column.dtype) if column.dtype != object else np.empty(capacity, dtype=object)
+            grown[:self._size] = column[:self._size]
+            self._columns[name] = grown
+        self._capacity = capacity
+
+    def append(self, row):
+        self.extend([row])
+
+    def extend(self, rows):
+        """Append result rows (dicts as produced by ``batch_matching.match_row``)"""
+        rows = list(rows)
+        if not rows:
+            return
+        with self._lock:
+            self._grow(self._size + len(rows))
+            columns = self._columns
+            for offset, row in enumerate(rows):
+                index = self._size + offset
+                error = row.get('error')
+                confidence = float(row.get('confidence_score') or 0.0)
+                columns['row'][index] = row.get('row', index + 1)
+                columns['name1'][index] = row.get('name1', '')
+                columns['name2'][index] = row.get('name2', '')
+                columns['reason'][index] = row.get('reason', '')
+                columns['error'][index] = error or ''
+                columns['confidence_score'][index] = confidence
+                columns['response_time_ms'][index] = float(row.get('response_time_ms') or 0.0)
+                columns['connect_time_ms'][index] = float(row.get('connect_time_ms') or 0.0)
+                columns['server_time_ms'][index] = float(row.get('server_time_ms') or 0.0)
+                columns['cached'][index] = bool(row.get('cached'))
+                columns['prefiltered'][index] = bool(row.get('prefiltered'))
+                columns['fallback'][index] = bool(row.get('fallback'))
+
+                if error:
+                    # NaN keeps failed rows blank in exports and last when sorted
+                    for name in ('confidence_score', 'response_time_ms', 'connect_time_ms', 'server_time_ms'):
+                        columns[name][index] = np.nan
+                    columns['match_code'][index] = -1
+                    columns['sheet_code'][index] = -1
+                    self.error_count += 1
+                    continue
+
+                is_match = row.get('is_match') == 'yes'
+                sheet_code = SHEET_CATEGORIES.index(row['sheet_name']) if row.get('sheet_name') in SHEET_CATEGORIES else -1
+                columns['match_code'][index] = int(is_match)
+                columns['sheet_code'][index] = sheet_code
+                self.match_count += is_match
+                self.cached_count += bool(row.get('cached'))
+                self.prefiltered_count += bool(row.get('prefiltered'))
+                self.confidence_sum += confidence
+                self.confidence_histogram[min(CONFIDENCE_BINS - 1, max(0, int(confidence * CONFIDENCE_BINS)))] += 1
+                if sheet_code >= 0:
+                    self.sheet_counts[sheet_code] += 1
+                if not row.get('cached') and not row.get('prefiltered') and not row.get('fallback'):
+                    self.latency.record(float(row.get('response_time_ms') or 0.0))
+
+            self._size += len(rows)
+            self.version += 1
+            self._order_cache.clear()
+            self._mask_cache.clear()
+            self._export_cache.clear()
+
+    @classmethod
+    def from_rows(cls, rows, source=SOURCE_API, endpoint=None):
+        rows = list(rows)
+        table = cls(capacity=max(INITIAL_CAPACITY, len(rows)), source=source, endpoint=endpoint)
+        table.extend(rows)
+        return table
+
+    def _recompute_aggregates(self):
+        # Vectorized equivalent of the per-row bookkeeping in extend()
+        size = self._size
+        columns = {name: column[:size] for name, column in self._columns.items()}
+        completed = columns['match_code'] >= 0
+        confidence = columns['confidence_score'][completed]
+        sheets = columns['sheet_code'][completed]
+        self.error_count = int(size - completed.sum())
+        self.match_count = int((columns['match_code'] == 1).sum())
+        self.cached_count = int((columns['cached'] & completed).sum())
+        self.prefiltered_count = int((columns['prefiltered'] & completed).sum())
+        self.confidence_sum = float(confidence.sum(dtype=np.float64))
+        # Binned in float32 so scores such as 0.35 land where extend() put them
+        bins = (confidence * np.float32(CONFIDENCE_BINS)).astype(np.int64)
+        self.confidence_histogram = np.bincount(np.clip(bins, 0, CONFIDENCE_BINS - 1), minlength=CONFIDENCE_BINS)
+        self.sheet_counts = np.bincount(sheets[sheets >= 0], minlength=len(SHEET_CATEGORIES))
+        live = completed & ~columns['cached'] & ~columns['prefiltered'] & ~columns['fallback']
+        self.latency = LatencyHistogram()
+        self.latency.record_many(columns['response_time_ms'][live])
+
+    def to_arrow(self):
+        """All rows as an Arrow table.
+
+        Names, reasons, errors and the two categorical columns are
+        dictionary-encoded; failed rows have null ``is_match``/``sheet_name``.
+        """
+        import pyarrow as pa
+
+        with self._lock:
+            size = self._size
+            columns = {name: column[:size] for name, column in self._columns.items()}
+
+        def categorical(codes, categories):
+            return pa.DictionaryArray.from_arrays(pa.array(codes, mask=codes < 0), pa.array(categories))
+
+        arrays = {
+            'row': pa.array(columns['row']),
+            'name1': pa.array(columns['name1'], type=pa.string()).dictionary_encode(),
+            'name2': pa.array(columns['name2'], type=pa.string()).dictionary_encode(),
+            'is_match': categorical(columns['match_code'], MATCH_CATEGORIES),
+            'confidence_score': pa.array(columns['confidence_score']),
+            'reason': pa.array(columns['reason'], type=pa.string()).dictionary_encode(),
+            'sheet_name': categorical(columns['sheet_code'], SHEET_CATEGORIES),
+            'response_time_ms': pa.array(columns['response_time_ms']),
+            'connect_time_ms': pa.array(columns['connect_time_ms']),
+            'server_time_ms': pa.array(columns['server_time_ms']),
+            'cached': pa.array(columns['cached']),
+            'prefiltered': pa.array(columns['prefiltered']),
+            'fallback': pa.array(columns['fallback']),
+            'error': pa.array(columns['error'], type=pa.string()).dictionary_encode(),
+        }
+        metadata = {'namematch.format': ARROW_FORMAT_VERSION, 'namematch.source': self.source}
+        if self.endpoint:
+            metadata['namematch.endpoint'] = self.endpoint
+        return pa.table(arrays, metadata=metadata)
+
+    @classmethod
+    def from_arrow(cls, table):
+        """Build a table from ``to_arrow`` output (e.g. a memory-mapped file) without per-row work.
+
+        Numeric columns of an uncompressed, single-chunk table are used
+        in place; they are copied on the first append.
+        """
+        metadata = table.schema.metadata or {}
+        source = metadata.get(b'namematch.source', SOURCE_API.encode()).decode()
+        endpoint = metadata[b'namematch.endpoint'].decode() if b'namematch.endpoint' in metadata else None
+        size = table.num_rows
+        if not size:
+            return cls(source=source, endpoint=endpoint)
+
+        result = cls(capacity=1, source=source, endpoint=endpoint)
+        columns = {}
+        for name, dtype in _NUMERIC_COLUMNS.items():
+            if name in ('match_code', 'sheet_code'):
+                continue
+            columns[name] = _arrow_to_numpy(table.column(name)).astype(dtype, copy=False)
+        columns['match_code'] = _arrow_codes(table.column('is_match'), MATCH_CATEGORIES)
+        columns['sheet_code'] = _arrow_codes(table.column('sheet_name'), SHEET_CATEGORIES)
+        for name in _OBJECT_COLUMNS:
+            columns[name] = _arrow_strings(table.column(name))
+        result._columns = columns
+        result._capacity = result._size = size
+        result._recompute_aggregates()
+        result.version += 1
+        return result
+
+    def cacheable_results(self, limit=None):
+        """``(name1, name2, result)`` for the latest ``limit`` API verdicts, oldest first.
+
+        Errors, fallback and pre-filtered rows are skipped, and so is every
+        row of a table scored by the local engine.
+        """
+        if self.source != SOURCE_API:
+            return
+        with self._lock:
+            size = self._size
+            columns = self._columns
+            eligible = np.flatnonzero(
+                (columns['match_code'][:size] >= 0) & ~columns['fallback'][:size] & ~columns['prefiltered'][:size]
+            )
+        if limit is not None:
+            eligible = eligible[-limit:]
+        for index in eligible.tolist():
+            yield columns['name1'][index], columns['name2'][index], {
+                'is_match': MATCH_CATEGORIES[columns['match_code'][index]],
+                'confidence_score': round(float(columns['confidence_score'][index]), 4),
+                'reason': columns['reason'][index],
+            }
+
+    def stats(self):
+        """Aggregate stats, computed incrementally as rows were appended"""
+        completed = self._size - self.error_count
+        return {
+            'rows': self._size,
+            'matches': self.match_count,
+            'errors': self.error_count,
+            'match_rate': self.match_count / completed if completed else 0.0,
+            'mean_confidence': self.confidence_sum / completed if completed else 0.0,
+            'cached': self.cached_count,
+            'prefiltered': self.prefiltered_count,
+            'sheet_counts': dict(zip(SHEET_CATEGORIES, self.sheet_counts.tolist())),
+            'latency_samples': self.latency.count,
+            'latency_ms': self.latency.summary(),
+        }
+
+    def confidence_histogram_frame(self):
+        edges = np.linspace(0, 1, CONFIDENCE_BINS + 1)[:-1]
+        return pd.DataFrame({'Rows': self.confidence_histogram}, index=[f"{edge:.2f}" for edge in edges])
+
+    def _filtered(self, **filters):
+        # Count and view of the same filters share one mask per table version
+        key = tuple(sorted(filters.items()))
+        mask = self._mask_cache.get(key)
+        if mask is None:
+            self._mask_cache.clear()
+            mask = self._mask_cache[key] = self._mask(**filters)
+        return mask
+
+    def _mask(self, is_match=None, sheet_name=None, errors_only=False, search=None,
+              min_confidence=None, max_confidence=None):
+        size = self._size
+        columns = self._columns
+        mask = np.ones(size, dtype=bool)
+        if errors_only:
+            mask &= columns['match_code'][:size] == -1
+        if is_match is not None:
+            mask &= columns['match_code'][:size] == MATCH_CATEGORIES.index(is_match)
+        if sheet_name is not None:
+            mask &= columns['sheet_code'][:size] == SHEET_CATEGORIES.index(sheet_name)
+        if min_confidence is not None:
+            mask &= columns['confidence_score'][:size] >= min_confidence
+        if max_confidence is not None:
+            mask &= columns['confidence_score'][:size] <= max_confidence
+        if search:
+            needle = search.casefold()
+            candidates = np.flatnonzero(mask)
+            hits = [
+                index for index in candidates
+                if needle in columns['name1'][index].casefold() or needle in columns['name2'][index].casefold()
+            ]
+            mask = np.zeros(size, dtype=bool)
+            mask[hits] = True
+        return mask
+
+    def _order(self, sort_by, descending):
+        # Sorting is the expensive step, so reuse it until new rows arrive
+        key = (sort_by, descending)
+        order = self._order_cache.get(key)
+        if order is None:
+            values = self._columns[sort_by][:self._size]
+            if values.dtype == object:
+                # Rank the folded names so either direction is a numeric sort
+                _, values = np.unique([value.casefold() for value in values], return_inverse=True)
+            # Negating keeps ties in row order and failed rows (NaN) last in both directions
+            order = np.argsort(-values if descending else values, kind='stable')
+            self._order_cache[key] = order
+        return order
+
+    def count(self, **filters):
+        """Number of rows matching the filters"""
+        with self._lock:
+            return int(self._filtered(**filters).sum())
+
+    def view(self, page=1, page_size=50, sort_by='row', descending=False, **filters):
+        """Return ``(page_frame, total_matching_rows)`` for one sorted, filtered page"""
+        with self._lock:
+            mask = self._filtered(**filters)
+            order = self._order(sort_by, descending)
+            selected = order[mask[order]]
+            total = len(selected)
+            start = (max(1, page) - 1) * page_size
+            indices = selected[start:start + page_size]
+            frame = self._frame(indices)
+            frame.insert(0, 'row', self._columns['row'][indices])
+            return frame, total
+
+    def _frame(self, indices):
+        columns = self._columns
+        # Unknown codes (-1) come out as missing values
+        return pd.DataFrame({
+            'name1': columns['name1'][indices],
+            'name2': columns['name2'][indices],
+            'is_match': pd.Categorical.from_codes(columns['match_code'][indices], MATCH_CATEGORIES),
+            'confidence_score': columns['confidence_score'][indices].astype(float).round(4),
+            'reason': columns['reason'][indices],
+            'sheet_name': pd.Categorical.from_codes(columns['sheet_code'][indices], SHEET_CATEGORIES),
+            'response_time_ms': columns['response_time_ms'][indices].astype(float).round(2),
+            'connect_time_ms': columns['connect_time_ms'][indices].astype(float).round(2),
+            'server_time_ms': columns['server_time_ms'][indices].astype(float).round(2),
+            'cached': columns['cached'][indices],
+            'prefiltered': columns['prefiltered'][indices],
+            'fallback': columns['fallback'][indices],
+            'error': columns['error'][indices],
+        }, columns=RESULT_COLUMNS)
+
+    def to_dataframe(self):
+        """All rows in input order, with the same columns as ``results_to_dataframe``"""
+        with self._lock:
+            return self._frame(np.arange(self._size))
+
+    def has_export(self, fmt):
+        return fmt in self._export_cache
+
+    def export(self, fmt):
+        """Serialized CSV, XLSX, Parquet or Arrow IPC bytes, cached until the table changes"""
+        cached = self._export_cache.get(fmt)
+        if cached is None:
+            if fmt in ('parquet', 'arrow'):
+                from result_archive import results_to_bytes
+
+                cached = results_to_bytes(self, fmt)
+            else:
+                frame = self.to_dataframe()
+                cached = results_to_csv(frame) if fmt == 'csv' else results_to_excel(frame)
+            self._export_cache[fmt] = cached
+        return cached
+
+
+def _arrow_to_numpy(column):
+    if column.num_chunks == 1:
+        return column.chunk(0).to_numpy(zero_copy_only=False)
+    return column.to_numpy()
+
+
+def _arrow_codes(column, categories):
+    """Category codes for a dictionary column, -1 for nulls and unknown values"""
+    column = column.combine_chunks()
+    mapping = np.array(
+        [categories.index(value) if value in categories else -1 for value in column.dictionary.to_pylist()] + [-1],
+        dtype=np.int8
+    )
+    # Nulls point at the trailing -1
+    indices = column.indices.fill_null(len(mapping) - 1).to_numpy(zero_copy_only=False)
+    return mapping[indices]
+
+
+def _arrow_strings(column):
+    """Object array of str for a (dictionary-encoded) string column, '' for nulls"""
+    column = column.combine_chunks()
+    if hasattr(column, 'dictionary'):
+        values = np.append(column.dictionary.to_numpy(zero_copy_only=False), '')
+        # Each distinct string is converted once and the rows share it
+        return values[column.indices.fill_null(len(values) - 1).to_numpy(zero_copy_only=False)]
+    return column.fill_null('').to_numpy(zero_copy_only=False)
@@ -0,0 +1,496 @@
+import csv
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from array import array
+from datetime import datetime, timezone
+
+from api_client import DEFAULT_DATA_SHEET, FALSE_DATA_SHEET, TRUE_DATA_SHEET
+from batch_matching import RESULT_COLUMNS
+
+SHEET_OUTPUT_DIR = os.path.join("outputs", "sheets")
+SHEET_NAMES = [TRUE_DATA_SHEET, FALSE_DATA_SHEET, DEFAULT_DATA_SHEET]
+# Failed rows have no target sheet, so the error column is never written
+SHEET_COLUMNS = [column for column in RESULT_COLUMNS if column != 'error'] + ['written_at']
+SHEET_FORMATS = ['csv', 'xlsx', 'parquet', 'spreadsheet']
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 2.0  # seconds a row may sit in a buffer
+DEFAULT_BLOOM_CAPACITY = 1_000_000
+DEFAULT_BLOOM_ERROR_RATE = 0.001
+DEDUP_STATE_NAME = "written_keys"
+
+# The spreadsheet stand-in charges what a hosted sheet API roughly does:
+# a round trip per append call and a per-minute write quota
+DEFAULT_STANDIN_CALL_LATENCY = 0.2  # seconds
+DEFAULT_STANDIN_CALLS_PER_MINUTE = 60
+
+_FLOAT_COLUMNS = {'confidence_score', 'response_time_ms', 'connect_time_ms', 'server_time_ms'}
+_BOOL_COLUMNS = {'cached', 'prefiltered', 'fallback'}
+
+
+def row_digest(name1, name2):
+    """64-bit digest of the order-insensitive pair as entered, only trimmed and case-folded.
+
+    Names that merely normalize alike (accents, suffixes such as Jr/Sr) are
+    different rows and are all written.
+    """
+    data = "\x1f".join(sorted(str(name).strip().casefold() for name in (name1, name2))).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+def sheet_slug(sheet_name):
+    """File-system friendly name of a routing sheet, e.g. ``name_match_api_true_data``"""
+    return re.sub(r"[^a-z0-9]+", "_", sheet_name.lower()).strip("_")
+
+
+def row_values(row):
+    """A row as a list of cell values in ``SHEET_COLUMNS`` order"""
+    return [row.get(column, '') for column in SHEET_COLUMNS]
+
+
+class DigestSet:
+    """Exact duplicate filter over 64-bit pair digests.
+
+    State is an append-only file of digests, so saving after a flush only
+    writes the new keys.
+    """
+
+    kind = "hash set"
+    suffix = ".keys"
+
+    def __init__(self):
+        self._digests = set()
+
+    def __contains__(self, digest):
+        return digest in self._digests
+
+    def __len__(self):
+        return len(self._digests)
+
+    def add(self, digest):
+        self._digests.add(digest)
+
+    def load(self, path):
+        if os.path.exists(path):
+            digests = array('Q')
+            with open(path, 'rb') as f:
+                data = f.read()
+            # Ignore a torn trailing record from an interrupted append
+            digests.frombytes(data[:len(data) - len(data) % digests.itemsize])
+            self._digests.update(digests)
+        return self
+
+    def save(self, path, new_digests):
+        with open(path, 'ab') as f:
+            f.write(array('Q', new_digests).tobytes())
+
+    def stats(self):
+        return {'kind': self.kind, 'keys': len(self._digests)}
+
+
+class BloomFilter:
+    """Fixed-memory duplicate filter.
+
+    Sized for ``capacity`` keys at ``error_rate`` false positives, i.e. a new
+    pair wrongly treated as already written and dropped; it never lets a
+    written pair through again. Bit positions come from the two halves of
+    the pair digest (double hashing). The whole bit array is rewritten on
+    save.
+    """
+
+    kind = "bloom filter"
+    suffix = ".bloom"
+
+    def __init__(self, capacity=DEFAULT_BLOOM_CAPACITY, error_rate=DEFAULT_BLOOM_ERROR_RATE):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.capacity = capacity
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, digest):
+        first = digest & 0xFFFFFFFF
+        step = (digest >> 32) | 1
+        return [(first + i * step) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, digest):
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(digest))
+
+    def __len__(self):
+        return self.count
+
+    def add(self, digest):
+        for position in self._positions(digest):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def load(self, path):
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                header = array('Q')
+                header.frombytes(f.read(header.itemsize * 3))
+                bits = f.read()
+            size, hashes, count = header
+            if len(bits) == (size + 7) // 8:
+                self.size, self.hashes, self.count = size, hashes, count
+                self._bits = bytearray(bits)
+        return self
+
+    def save(self, path, new_digests):
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(array('Q', [self.size, self.hashes, self.count]).tobytes())
+            f.write(self._bits)
+        os.replace(temp_path, path)
+
+    def estimated_error_rate(self):
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+    def stats(self):
+        return {
+            'kind': self.kind,
+            'keys': self.count,
+            'memory_bytes': len(self._bits),
+            'error_rate': self.estimated_error_rate(),
+        }
+
+
+class SheetSink:
+    """Destination for routed rows; ``append_rows`` receives one batch for one sheet.
+
+    To target a hosted spreadsheet, subclass this and send
+    ``[row_values(row) for row in rows]`` in a single append request.
+    """
+
+    location = ""
+
+    def append_rows(self, sheet_name, rows):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class CSVSheetSink(SheetSink):
+    """One CSV file per routing sheet, appended to on every flush"""
+
+    def __init__(self, directory=SHEET_OUTPUT_DIR):
+        self.location = directory
+
+    def path(self, sheet_name):
+        return os.path.join(self.location, f"{sheet_slug(sheet_name)}.csv")
+
+    def append_rows(self, sheet_name, rows):
+        os.makedirs(self.location, exist_ok=True)
+        path = self.path(sheet_name)
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        with open(path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=SHEET_COLUMNS, extrasaction='ignore', lineterminator='\n')
+            if new_file:
+                writer.writeheader()
+            writer.writerows(rows)
+
+
+class ExcelSheetSink(SheetSink):
+    """One workbook with a worksheet per routing sheet.
+
+    XLSX cannot be appended to in place, so each flush loads and rewrites
+    the workbook; larger batches pay that cost less often.
+    """
+
+    def __init__(self, directory=SHEET_OUTPUT_DIR, filename="routed_results.xlsx"):
+        self.location = os.path.join(directory, filename)
+
+    def append_rows(self, sheet_name, rows):
+        from openpyxl import Workbook, load_workbook
+
+        if os.path.exists(self.location):
+            workbook = load_workbook(self.location)
+        else:
+            os.makedirs(os.path.dirname(self.location) or ".", exist_ok=True)
+            workbook = Workbook()
+            workbook.remove(workbook.active)
+        if sheet_name in workbook.sheetnames:
+            worksheet = workbook[sheet_name]
+        else:
+            worksheet = workbook.create_sheet(sheet_name)
+            worksheet.append(SHEET_COLUMNS)
+        for row in rows:
+            worksheet.append(row_values(row))
+        temp_path = f"{self.location}.tmp"
+        workbook.save(temp_path)
+        os.replace(temp_path, self.location)
+
+
+class ParquetSheetSink(SheetSink):
+    """A directory of Parquet part files per routing sheet, one part per flush.
+
+    Read a sheet back as a dataset, e.g. ``pandas.read_parquet(sink.path(sheet))``.
+    """
+
+    def __init__(self, directory=SHEET_OUTPUT_DIR):
+        self.location = directory
+        self._parts = 0
+
+    def path(self, sheet_name):
+        return os.path.join(self.location, sheet_slug(sheet_name))
+
+    def _schema(self):
+        import pyarrow as pa
+
+        return pa.schema([
+            (column, pa.float64() if column in _FLOAT_COLUMNS else pa.bool_() if column in _BOOL_COLUMNS else pa.string())
+            for column in SHEET_COLUMNS
+        ])
+
+    def append_rows(self, sheet_name, rows):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        directory = self.path(sheet_name)
+        os.makedirs(directory, exist_ok=True)
+        schema = self._schema()
+        columns = {
+            column: [_coerce(row.get(column), schema.field(column).type) for row in rows]
+            for column in SHEET_COLUMNS
+        }
+        self._parts += 1
+        filename = f"part-{time.time_ns()}-{os.getpid()}-{self._parts:05d}.parquet"
+        temp_path = os.path.join(directory, f".{filename}.tmp")
+        pq.write_table(pa.table(columns, schema=schema), temp_path)
+        os.replace(temp_path, os.path.join(directory, filename))
+
+
+def _coerce(value, arrow_type):
+    import pyarrow as pa
+
+    if value is None or value == '':
+        return None
+    if pa.types.is_floating(arrow_type):
+        return float(value)
+    if pa.types.is_boolean(arrow_type):
+        return bool(value)
+    return str(value)
+
+
+class SpreadsheetStandIn(SheetSink):
+    """Local stand-in for a hosted spreadsheet such as Google Sheets.
+
+    Behaves like a ``values.append`` call: each call costs ``call_latency``
+    seconds and calls beyond ``calls_per_minute`` wait for quota, so the
+    effect of batching is visible without credentials. Values are kept as
+    one NDJSON line per row under ``directory``.
+    """
+
+    def __init__(self, directory=SHEET_OUTPUT_DIR, call_latency=DEFAULT_STANDIN_CALL_LATENCY,
+                 calls_per_minute=DEFAULT_STANDIN_CALLS_PER_MINUTE):
+        self.location = os.path.join(directory, "spreadsheet")
+        self.call_latency = call_latency
+        self.calls_per_minute = calls_per_minute
+        self._lock = threading.Lock()
+        self._call_times = []
+        self.api_calls = 0
+        self.throttled_seconds = 0.0
+
+    def path(self, sheet_name):
+        return os.path.join(self.location, f"{sheet_slug(sheet_name)}.ndjson")
+
+    def append_rows(self, sheet_name, rows):
+        with self._lock:
+            now = time.monotonic()
+            self._call_times = [started for started in self._call_times if now - started < 60]
+            if self.calls_per_minute and len(self._call_times) >= self.calls_per_minute:
+                wait = 60 - (now - self._call_times[0])
+                self.throttled_seconds += wait
+                time.sleep(wait)
+            self._call_times.append(time.monotonic())
+            self.api_calls += 1
+            time.sleep(self.call_latency)
+
+            os.makedirs(self.location, exist_ok=True)
+            with open(self.path(sheet_name), 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(row_values(row), ensure_ascii=False) + '\n' for row in rows)
+
+
+def open_sheet_sink(fmt, directory=SHEET_OUTPUT_DIR):
+    """Pick a sink implementation from a ``SHEET_FORMATS`` name"""
+    if fmt == 'csv':
+        return CSVSheetSink(directory)
+    if fmt == 'xlsx':
+        return ExcelSheetSink(directory)
+    if fmt == 'parquet':
+        return ParquetSheetSink(directory)
+    if fmt == 'spreadsheet':
+        return SpreadsheetStandIn(directory)
+    raise ValueError(f"Unknown sheet format {fmt!r}; expected one of {', '.join(SHEET_FORMATS)}")
+
+
+class RoutedSheetWriter:
+    """Buffers routed result rows per target sheet and writes them in bulk.
+
+    A sheet's buffer is written when it holds ``batch_size`` rows, and a
+    background thread flushes every buffer each ``flush_interval`` seconds
+    so a trickle of single comparisons still lands promptly. Pairs that were
+    already written (or are waiting in a buffer) are dropped using ``dedup``
+    instead of reading the existing output; its state is saved to
+    ``state_path`` after every flush so it survives restarts.
+    """
+
+    def __init__(self, sink, batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 dedup=None, state_path=None):
+        self.sink = sink
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        self.dedup = dedup if dedup is not None else DigestSet()
+        self.state_path = state_path
+        if state_path:
+            self.dedup.load(state_path)
+        self._lock = threading.Lock()
+        # Sink calls are serialized so rows reach a sheet in the order they were flushed
+        self._flush_lock = threading.Lock()
+        self._buffers = {name: [] for name in SHEET_NAMES}
+        self._pending = set()
+        self._stop = threading.Event()
+        self._thread = None
+        self.received = 0
+        self.duplicates = 0
+        self.unrouted = 0
+        self.written = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.flush_seconds = 0.0
+        self.written_per_sheet = dict.fromkeys(SHEET_NAMES, 0)
+        self.last_error = None
+
+    def configure(self, batch_size=None, flush_interval=None):
+        """Update settings in place"""
+        with self._lock:
+            if batch_size is not None:
+                self.batch_size = max(1, int(batch_size))
+            if flush_interval is not None:
+                self.flush_interval = max(0.1, flush_interval)
+
+    def start(self):
+        """Start the background flush thread (idempotent)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._flush_periodically, name="sheet-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def _flush_periodically(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                # Already recorded in last_error; the rows stay buffered for the next attempt
+                pass
+
+    def add(self, row):
+        """Queue a result row for its sheet; returns False for duplicates and failed rows"""
+        sheet_name = row.get('sheet_name')
+        if row.get('error') or not sheet_name:
+            with self._lock:
+                self.unrouted += 1
+            return False
+        digest = row_digest(row.get('name1', ''), row.get('name2', ''))
+        with self._lock:
+            self.received += 1
+            if digest in self._pending or digest in self.dedup:
+                self.duplicates += 1
+                return False
+            self._pending.add(digest)
+            buffer = self._buffers.setdefault(sheet_name, [])
+            buffer.append((digest, dict(row, written_at=datetime.now(timezone.utc).isoformat(timespec='seconds'))))
+            full = len(buffer) >= self.batch_size
+        if full:
+            self.flush(sheet_name)
+        return True
+
+    def add_many(self, rows):
+        """Queue several rows; returns how many were new"""
+        return sum(self.add(row) for row in rows)
+
+    def flush(self, sheet_name=None):
+        """Write the buffered rows of one sheet (or all sheets); returns rows written.
+
+        If the sink fails, the unwritten rows go back to the front of their
+        buffers and the error is re-raised.
+        """
+        with self._flush_lock:
+            with self._lock:
+                names = [sheet_name] if sheet_name is not None else list(self._buffers)
+                batches = [(name, self._buffers[name]) for name in names if self._buffers.get(name)]
+                for name, _ in batches:
+                    self._buffers[name] = []
+
+            written = 0
+            for position, (name, batch) in enumerate(batches):
+                start = time.perf_counter()
+                try:
+                    self.sink.append_rows(name, [row for _, row in batch])
+                except Exception as e:
+                    with self._lock:
+                        for failed_name, failed_batch in batches[position:]:
+                            self._buffers[failed_name] = failed_batch + self._buffers[failed_name]
+                        self.failed_flushes += 1
+                        self.last_error = str(e)
+                    raise
+                digests = [digest for digest, _ in batch]
+                with self._lock:
+                    for digest in digests:
+                        self.dedup.add(digest)
+                    self._pending.difference_update(digests)
+                    self.written += len(batch)
+                    self.written_per_sheet[name] = self.written_per_sheet.get(name, 0) + len(batch)
+                    self.flushes += 1
+                    self.flush_seconds += time.perf_counter() - start
+                if self.state_path:
+                    self.dedup.save(self.state_path, digests)
+                written += len(batch)
+            return written
+
+    def close(self):
+        """Stop the flush thread, write everything still buffered and close the sink"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        self.sink.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'received': self.received,
+                'buffered': sum(len(buffer) for buffer in self._buffers.values()),
+                'written': self.written,
+                'duplicates': self.duplicates,
+                'unrouted': self.unrouted,
+                'flushes': self.flushes,
+                'failed_flushes': self.failed_flushes,
+                'rows_per_flush': self.written / self.flushes if self.flushes else 0.0,
+                'mean_flush_ms': self.flush_seconds / self.flushes * 1000 if self.flushes else 0.0,
+                'written_per_sheet': dict(self.written_per_sheet),
+                'dedup': self.dedup.stats(),
+                'last_error': self.last_error,
+            }
+
+
+def open_sheet_writer(fmt, directory=SHEET_OUTPUT_DIR, bloom=False, **options):
+    """Writer for ``fmt`` output under ``directory`` with its dedup state kept alongside"""
+    dedup = BloomFilter() if bloom else DigestSet()
+    state_path = os.path.join(directory, f"{DEDUP_STATE_NAME}_{fmt}{dedup.suffix}")
+    os.makedirs(directory, exist_ok=True)
+    return RoutedSheetWriter(open_sheet_sink(fmt, directory), dedup=dedup, state_path=state_path, **options)
@@ -0,0 +1,289 @@
+import asyncio
+import csv
+import io
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from api_client import API_ENDPOINT, MatchClient
+from batch_matching import DEFAULT_MAX_WORKERS, MAX_WORKERS_LIMIT, RESULT_COLUMNS, match_row
+
+OUTPUT_DIR = "outputs"
+SINK_COLUMNS = ['row'] + RESULT_COLUMNS
+
+
+def iter_pairs(source, filename=None):
+    """Lazily yield (name1, name2) from a CSV or Excel path or file object.
+
+    Rows are read one at a time so the input is never fully materialized.
+    """
+    filename = (filename or getattr(source, 'name', None) or str(source)).lower()
+    if filename.endswith('.xlsx'):
+        yield from _iter_excel_pairs(source)
+    else:
+        yield from _iter_csv_pairs(source)
+
+
+def _find_name_columns(header):
+    columns = {str(column).strip().lower(): position for position, column in enumerate(header)}
+    if 'name1' not in columns or 'name2' not in columns:
+        raise ValueError("File must contain 'name1' and 'name2' columns")
+    return columns['name1'], columns['name2']
+
+
+def _cell(row, position):
+    value = row[position] if position < len(row) else None
+    return '' if value is None else str(value).strip()
+
+
+def _iter_csv_pairs(source):
+    if isinstance(source, (str, os.PathLike)):
+        stream = open(source, newline='', encoding='utf-8-sig')
+    else:
+        source.seek(0)
+        stream = io.TextIOWrapper(source, encoding='utf-8-sig', newline='')
+    try:
+        reader = csv.reader(stream)
+        header = next(reader, None)
+        if header is None:
+            return
+        name1_column, name2_column = _find_name_columns(header)
+        for row in reader:
+            if row:
+                yield _cell(row, name1_column), _cell(row, name2_column)
+    finally:
+        if isinstance(source, (str, os.PathLike)):
+            stream.close()
+        else:
+            # Leave the caller's file object open
+            stream.detach()
+
+
+def _iter_excel_pairs(source):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        name1_column, name2_column = _find_name_columns(header)
+        for row in rows:
+            yield _cell(row, name1_column), _cell(row, name2_column)
+    finally:
+        workbook.close()
+
+
+class CompletedRows:
+    """Set of finished input row indices with memory bounded by the in-flight window.
+
+    Everything below ``watermark`` is done; only rows completed out of order
+    above it are kept individually.
+    """
+
+    def __init__(self):
+        self.watermark = 0
+        self._done_above = set()
+
+    def add(self, index):
+        if index < self.watermark:
+            return
+        self._done_above.add(index)
+        while self.watermark in self._done_above:
+            self._done_above.remove(self.watermark)
+            self.watermark += 1
+
+    def __contains__(self, index):
+        return index < self.watermark or index in self._done_above
+
+    def __len__(self):
+        return self.watermark + len(self._done_above)
+
+
+class _FileSink:
+    """Append-only result file that can be resumed after a crash"""
+
+    def __init__(self, path, resume=True):
+        self.path = path
+        self.resume = resume
+        self._file = None
+
+    def completed_rows(self):
+        """Scan an existing sink and return the rows it already holds a verdict for.
+
+        Failed rows (timeouts, 5xx, an open circuit breaker) do not count, so
+        a resumed run asks for them again and appends the new outcome; the
+        last line for a row is its current result.
+        """
+        completed = CompletedRows()
+        if self.resume and os.path.exists(self.path):
+            for index in self._iter_written_rows():
+                completed.add(index)
+        return completed
+
+    def open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        appending = self.resume and os.path.exists(self.path) and os.path.getsize(self.path) > 0
+        if appending:
+            self._terminate_partial_line()
+        # Line buffered so every finished row reaches the OS immediately
+        self._file = open(self.path, 'a' if appending else 'w', newline='', encoding='utf-8', buffering=1)
+        self._after_open(appending)
+        return self
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _terminate_partial_line(self):
+        # A crash mid-write can leave a truncated last line; start on a fresh one
+        with open(self.path, 'rb+') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+
+    def _after_open(self, appending):
+        pass
+
+    def _iter_written_rows(self):
+        raise NotImplementedError
+
+    def write(self, row):
+        raise NotImplementedError
+
+
+class NDJSONSink(_FileSink):
+    """One JSON object per line"""
+
+    def _iter_written_rows(self):
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    if not record.get('error'):
+                        yield int(record['row'])
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    continue
+
+    def write(self, row):
+        self._file.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+
+class CSVSink(_FileSink):
+    """CSV with a fixed column order"""
+
+    def _iter_written_rows(self):
+        with open(self.path, newline='', encoding='utf-8') as f:
+            for record in csv.DictReader(f):
+                try:
+                    if not record.get('error'):
+                        yield int(record['row'])
+                except (ValueError, KeyError, TypeError):
+                    continue
+
+    def _after_open(self, appending):
+        self._writer = csv.DictWriter(self._file, fieldnames=SINK_COLUMNS, extrasaction='ignore', lineterminator='\n')
+        if not appending:
+            self._writer.writeheader()
+
+    def write(self, row):
+        self._writer.writerow(row)
+
+
+def open_sink(path, resume=True):
+    """Pick a sink implementation from the file extension"""
+    if path.lower().endswith('.csv'):
+        return CSVSink(path, resume=resume)
+    return NDJSONSink(path, resume=resume)
+
+
+async def stream_matches(pairs, sink, client=None, endpoint=API_ENDPOINT,
+                         concurrency=DEFAULT_MAX_WORKERS, on_result=None):
+    """Match ``pairs`` with bounded in-flight requests, appending rows to ``sink``.
+
+    ``pairs`` may be any iterable (typically ``iter_pairs``); it is consumed
+    lazily and bounded queues apply backpressure, so memory use does not
+    depend on input size. Rows a resumed sink already holds a verdict for
+    are skipped; failed rows are retried. ``on_result(row, stats)`` runs on
+    the event loop thread after each row is written.
+    """
+    concurrency = max(1, min(int(concurrency), MAX_WORKERS_LIMIT))
+    client = client if client is not None else MatchClient()
+    completed = sink.completed_rows()
+    stats = {'processed': 0, 'skipped': 0, 'errors': 0, 'matches': 0, 'elapsed': 0.0, 'throughput': 0.0}
+    start_time = time.perf_counter()
+
+    loop = asyncio.get_running_loop()
+    pending = asyncio.Queue(maxsize=concurrency * 2)
+    finished = asyncio.Queue(maxsize=concurrency * 2)
+
+    async def produce():
+        for index, (name1, name2) in enumerate(pairs):
+            if index in completed:
+                stats['skipped'] += 1
+                continue
+            await pending.put((index, name1, name2))
+        for _ in range(concurrency):
+            await pending.put(None)
+
+    async def work(executor):
+        while True:
+            item = await pending.get()
+            if item is None:
+                await finished.put(None)
+                return
+            index, name1, name2 = item
+            try:
+                row = await loop.run_in_executor(executor, match_row, name1, name2, endpoint, client)
+            except Exception as e:
+                row = {'name1': name1, 'name2': name2, 'error': f"Error: {str(e)}"}
+            row['row'] = index
+            await finished.put(row)
+
+    async def write():
+        remaining_workers = concurrency
+        while remaining_workers:
+            row = await finished.get()
+            if row is None:
+                remaining_workers -= 1
+                continue
+            sink.write(row)
+            stats['processed'] += 1
+            if row.get('error'):
+                stats['errors'] += 1
+            elif row.get('is_match') == 'yes':
+                stats['matches'] += 1
+            stats['elapsed'] = time.perf_counter() - start_time
+            stats['throughput'] = stats['processed'] / stats['elapsed'] if stats['elapsed'] > 0 else 0.0
+            if on_result:
+                on_result(row, stats)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="stream-match") as executor:
+        with sink:
+            tasks = [asyncio.create_task(produce()), asyncio.create_task(write())]
+            tasks += [asyncio.create_task(work(executor)) for _ in range(concurrency)]
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    stats['elapsed'] = time.perf_counter() - start_time
+    return stats
+
+
+def run_streaming_batch(pairs, sink, client=None, endpoint=API_ENDPOINT,
+                        concurrency=DEFAULT_MAX_WORKERS, on_result=None):
+    """Blocking wrapper around ``stream_matches`` for synchronous callers"""
+    return asyncio.run(stream_matches(pairs, sink, client, endpoint, concurrency, on_result))
@@ -1,9 +1,74 @@
 import streamlit as st
 import requests
 import json
-import pandas as pd
-from datetime import datetime
 import time
+import os
+import io
+from collections import deque
+
+from api_client import (
+    API_BASE_URL,
+    DEFAULT_DATA_SHEET,
+    FALSE_DATA_SHEET,
+    TRUE_DATA_SHEET,
+    MatchClient,
+    build_endpoint,
+    get_sheet_routing,
+)
+from batch_matching import (
+    DEFAULT_MAX_WORKERS,
+    MAX_WORKERS_LIMIT,
+    UPLOAD_TYPES,
+    load_pairs,
+    match_row,
+    result_to_row,
+    results_to_dataframe,
+    run_batch,
+)
+from benchmark import (
+    DEFAULT_BENCH_CONCURRENCY,
+    DEFAULT_BENCH_REQUESTS,
+    DEFAULT_CORPUS_SIZE,
+    DEFAULT_REPEAT_RATIO,
+    build_benchmark_client,
+    compare_reports,
+    format_report,
+    generate_corpus,
+    run_benchmark,
+)
+from candidate_search import (
+    DEFAULT_TOP_K,
+    BlockingIndex,
+    cluster_duplicates,
+    evaluate_blocking,
+    load_labeled_pairs,
+    load_names,
+    reduction_ratio,
+)
+from flow_control import BREAKER_OPEN
+from http_transport import (
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_POOL_SIZE,
+    DEFAULT_READ_TIMEOUT,
+    create_session,
+)
+from job_queue import CANCELLED, DONE, FAILED, JobQueue
+from metrics import METRICS_FILE, METRICS_PORT, REGISTRY, profile_call, span, start_metrics_server, timed
+from mock_server import start_server
+from prefilter import DEFAULT_MATCH_THRESHOLD, DEFAULT_NON_MATCH_THRESHOLD, PreFilter
+from result_cache import DEFAULT_CACHE_MAX_SIZE, DEFAULT_CACHE_TTL_SECONDS, ResultCache
+from result_store import RESULT_STORE_PATH, ResultStore
+from sheet_writer import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_FLUSH_INTERVAL,
+    SHEET_FORMATS,
+    SHEET_OUTPUT_DIR,
+    open_sheet_writer,
+)
+
+# pandas/NumPy (results_table) and asyncio (streaming_pipeline) dominate cold
+# start, so they are imported inside the functions that first need them
 
 # Configure Streamlit page
 st.set_page_config(
@@ -14,40 +79,127 @@ st.set_page_config(
 )
 
 # API Configuration
-API_BASE_URL= "https://namematchbk-c2ecaaaqcjhccsbz.australiaeast-01.azurewebsites.net"
-# API_BASE_URL = "http://127.0.0.1:8000"  # Adjust this to your API URL
-API_ENDPOINT = f"{API_BASE_URL}/api/v1/utility/util"
+API_ENDPOINT = build_endpoint(API_BASE_URL)
+
+# Streaming batch display
+STREAM_PREVIEW_ROWS = 20
+JOB_POLL_INTERVAL = 2  # seconds
+STREAM_RENDER_INTERVAL = 0.25  # seconds
+EXCEL_EAGER_ROWS = 10000
+# The cache and history are shared by every visitor, so only an admin deployment may wipe them
+ADMIN_MODE = os.environ.get("NAME_MATCH_ADMIN", "").lower() in ("1", "true", "yes")
+# Saved runs live here; visitors only ever type a file name, never a path
+RUNS_DIR = os.path.join("outputs", "runs")
+
+# History sort orders offered in the UI (keys of result_store.SORT_ORDERS)
+HISTORY_SORT_LABELS = {
+    'recent': "Most recent",
+    'oldest': "Oldest",
+    'confidence_desc': "Highest confidence",
+    'confidence_asc': "Lowest confidence",
+}
+
+SHEET_FORMAT_LABELS = {
+    'csv': "CSV files",
+    'xlsx': "Excel workbook",
+    'parquet': "Parquet files",
+    'spreadsheet': "Spreadsheet (local stand-in)",
+}
+
+@st.cache_resource
+def get_result_cache():
+    """Process-wide result cache shared by all sessions"""
+    return ResultCache(DEFAULT_CACHE_MAX_SIZE, DEFAULT_CACHE_TTL_SECONDS)
+
+@st.cache_resource
+def get_result_store():
+    """Process-wide persistent result store"""
+    return ResultStore(RESULT_STORE_PATH)
+
+@st.cache_resource
+def get_prefilter():
+    """Process-wide local pre-filter shared by all sessions"""
+    return PreFilter(DEFAULT_MATCH_THRESHOLD, DEFAULT_NON_MATCH_THRESHOLD)
+
+@st.cache_resource
+def get_http_session(pool_size):
+    """Process-wide keep-alive HTTP session, one per pool size"""
+    return create_session(pool_size)
+
+@st.cache_resource
+def get_match_client(pool_size, connect_timeout, read_timeout, max_retries):
+    """Shared API client for the given transport settings"""
+    return MatchClient(
+        session=get_http_session(pool_size),
+        cache=get_result_cache(),
+        prefilter=get_prefilter(),
+        store=get_result_store(),
+        connect_timeout=connect_timeout,
+        read_timeout=read_timeout,
+        max_retries=max_retries
+    )
+
+@st.cache_resource
+def get_local_engine(workers):
+    """Local scoring engine; its worker processes are started once and reused"""
+    from local_engine import LocalEngine
+    
+    return LocalEngine(workers=workers)
+
+@st.cache_resource
+def get_sheet_writer(fmt, directory, bloom):
+    """Shared routed-sheet writer with its background flush thread"""
+    return open_sheet_writer(fmt, directory, bloom=bloom).start()
+
+def match_job_pair(name1, name2, params):
+    """Background job handler: match one pair with the submitting session's transport settings"""
+    client = get_match_client(*params['client'])
+    return match_row(name1, name2, params['endpoint'], client)
 
-def call_name_matching_api(name1, name2):
+@st.cache_resource
+def get_job_queue():
+    """Process-wide background job queue; its workers are shared by every session"""
+    return JobQueue({'batch': match_job_pair})
+
+def get_job_owner():
+    """Owner ID for background jobs, never taken from anything the browser sends.
+    
+    Signed-in users own their jobs across sessions; anonymous visitors get a
+    random ID that lasts for this session only.
+    """
+    if st.user.get("is_logged_in"):
+        return f"user:{st.user.get('sub') or st.user.get('email')}"
+    if 'job_owner' not in st.session_state:
+        import uuid
+        
+        st.session_state.job_owner = uuid.uuid4().hex[:12]
+    return st.session_state.job_owner
+
+def server_file_path(directory, file_name):
+    """Path of a bare file name inside ``directory``; raises ValueError for anything else.
+    
+    Names typed into the UI must never reach files outside the app's own folders.
+    """
+    file_name = file_name.strip()
+    if file_name in ("", ".", "..") or "/" in file_name or "\\" in file_name or os.path.isabs(file_name):
+        raise ValueError(f"Enter a name without folders, not {file_name!r}")
+    return os.path.join(directory, file_name)
+
+def queue_for_sheet(sheet_writer, row):
+    """Hand a result row to the sheet writer and say where it went"""
+    if sheet_writer is None:
+        return
+    if sheet_writer.add(row):
+        st.caption(f"📤 Queued for **{row['sheet_name']}**")
+    else:
+        st.caption("♻️ Already written to a sheet, skipped")
+
+@timed("call_name_matching_api")
+def call_name_matching_api(name1, name2, client):
     """Call the name matching API and return the response"""
-    try:
-        params = {
-            "name1": name1,
-            "name2": name2
-        }
-        
-        headers = {
-            "accept": "application/json"
-        }
-        
-        # Show loading spinner
-        with st.spinner(f"Comparing '{name1}' vs '{name2}'..."):
-            start_time = time.time()
-            response = requests.get(API_ENDPOINT, params=params, headers=headers)
-            end_time = time.time()
-            response_time = round((end_time - start_time) * 1000, 2)  # Convert to milliseconds
-        
-        if response.status_code == 200:
-            result = response.json()
-            result['response_time_ms'] = response_time
-            return result, None
-        else:
-            return None, f"API Error: {response.status_code} - {response.text}"
-            
-    except requests.exceptions.ConnectionError:
-        return None, f"Connection Error: Could not connect to API at {API_BASE_URL}. Make sure your API server is running."
-    except Exception as e:
-        return None, f"Error: {str(e)}"
+    # Show loading spinner
+    with st.spinner(f"Comparing '{name1}' vs '{name2}'..."):
+        return client.match(name1, name2, API_ENDPOINT)
 
 def format_confidence_score(score):
     """Format confidence score with color coding"""
@@ -65,6 +217,7 @@ def format_match_result(is_match):
     else:
         return f"<span style='color: red; font-weight: bold; font-size: 18px'>❌ NO</span>"
 
+@timed("display_result")
 def display_result(result):
     """Display the API result in a formatted way"""
     col1, col2, col3 = st.columns([2, 2, 1])
@@ -82,6 +235,21 @@ def display_result(result):
     with col3:
         st.markdown("### ⏱️ Response Time")
         st.markdown(f"**{result.get('response_time_ms', 0)} ms**")
+        if result.get('cached'):
+            st.caption("⚡ Served from cache")
+            if result.get('cache_tier') == 'disk':
+                st.caption(f"💾 Stored {result.get('stored_at', '')}")
+        elif result.get('prefiltered'):
+            st.caption("⚡ Decided locally by pre-filter")
+        elif result.get('fallback'):
+            st.caption("⚠️ API unavailable; local fallback verdict")
+        else:
+            st.caption(
+                f"Connect {result.get('connect_time_ms', 0)} ms • "
+                f"Server {result.get('server_time_ms', 0)} ms"
+            )
+            if result.get('attempts', 1) > 1:
+                st.caption(f"🔁 {result['attempts']} attempts")
     
     # Reason section
     st.markdown("### 💭 Reasoning")
@@ -90,21 +258,7 @@ def display_result(result):
     
     # Routing information
     st.markdown("### 📋 Sheet Routing Info")
-    is_match = result.get('is_match') == 'yes'
-    confidence = result.get('confidence_score', 0.0)
-    
-    if is_match and confidence >= 0.8:
-        sheet_name = "Name Match API True Data"
-        sheet_color = "green"
-        sheet_icon = "✅"
-    elif not is_match and confidence < 0.8:
-        sheet_name = "Name Match API False Data"
-        sheet_color = "red"
-        sheet_icon = "❌"
-    else:
-        sheet_name = "Name Match API Data"
-        sheet_color = "orange"
-        sheet_icon = "📊"
+    sheet_name, sheet_color, sheet_icon = get_sheet_routing(result)
     
     st.markdown(f"""
     <div style='padding: 10px; border-left: 4px solid {sheet_color}; background-color: #f0f0f0;'>
@@ -112,56 +266,621 @@ def display_result(result):
     </div>
     """, unsafe_allow_html=True)
 
-def main():
-    # Header
-    st.title("🔍 Name Matching API Demo")
-    st.markdown("Test the intelligent name matching system with caching and conditional routing")
+def render_streaming_batch(source, client, batch_workers, sheet_writer=None):
+    """Stream a batch file through the async pipeline into an append-only sink"""
+    from streaming_pipeline import OUTPUT_DIR, iter_pairs, open_sink, run_streaming_batch
     
-    # Sidebar configuration
-    with st.sidebar:
-        st.header("⚙️ Configuration")
-        
-        # API URL configuration
-        st.subheader("API Settings")
-        api_url = st.text_input("API Base URL", value=API_BASE_URL)
-        
-        # Update global API endpoint if changed
-        global API_ENDPOINT
-        API_ENDPOINT = f"{api_url}/api/v1/utility/util"
-        
-        st.markdown("---")
+    source_name = getattr(source, 'name', source)
+    stem = os.path.splitext(os.path.basename(source_name))[0] or "batch"
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        output_name = st.text_input(
+            "💾 Output file", value=f"{stem}_results.ndjson",
+            help=f"File name in {OUTPUT_DIR}; .csv writes CSV, anything else NDJSON"
+        )
+    with col2:
+        resume = st.checkbox("Resume", value=True, help="Skip rows already present in the output file")
+    
+    if not st.button("🚀 Stream Batch", type="primary"):
+        return
+    try:
+        output_path = server_file_path(OUTPUT_DIR, output_name)
+    except ValueError as e:
+        st.error(f"❌ {str(e)}")
+        return
+    
+    status_placeholder = st.empty()
+    table_placeholder = st.empty()
+    recent_rows = deque(maxlen=STREAM_PREVIEW_ROWS)
+    last_render = [0.0]
+    
+    def render(stats):
+        status_placeholder.markdown(
+            f"**{stats['processed']}** written • {stats['skipped']} resumed • {stats['errors']} errors • "
+            f"**{stats['throughput']:.1f}** pairs/sec • {stats['elapsed']:.1f}s elapsed"
+        )
+        table_placeholder.dataframe(results_to_dataframe(list(recent_rows)), use_container_width=True)
+    
+    def on_result(row, stats):
+        recent_rows.appendleft(row)
+        if sheet_writer is not None:
+            sheet_writer.add(row)
+        # Throttle redraws so rendering never becomes the bottleneck
+        now = time.perf_counter()
+        if now - last_render[0] >= STREAM_RENDER_INTERVAL:
+            last_render[0] = now
+            render(stats)
+    
+    try:
+        stats = run_streaming_batch(
+            iter_pairs(source),
+            open_sink(output_path, resume=resume),
+            client=client,
+            endpoint=API_ENDPOINT,
+            concurrency=batch_workers,
+            on_result=on_result
+        )
+    except Exception as e:
+        st.error(f"❌ Streaming batch failed: {str(e)}")
+        return
+    
+    render(stats)
+    st.success(f"✅ Finished: {stats['processed']} new rows written to `{output_path}`")
+    if sheet_writer is not None:
+        sheet_writer.flush()
+    with open(output_path, 'rb') as f:
+        st.download_button(
+            "⬇️ Download Results",
+            data=f,
+            file_name=os.path.basename(output_path),
+            mime="text/csv" if output_path.lower().endswith('.csv') else "application/x-ndjson"
+        )
+
+@st.cache_resource
+def get_local_server():
+    """Local stand-in API server, started once per process"""
+    return start_server()
+
+@st.cache_resource(max_entries=2)
+def get_blocking_index(file_bytes, filename):
+    """Blocking index over an uploaded name list, built once per file"""
+    upload = io.BytesIO(file_bytes)
+    upload.name = filename
+    return BlockingIndex.build(load_names(upload))
+
+def render_search_tab(client, batch_workers):
+    """One-to-many search and deduplication over an uploaded name list"""
+    st.header("🔎 Candidate Search")
+    st.markdown(
+        "Upload a list of names (a `name` column, or the first column). A blocking index picks the "
+        "top-k likely candidates per query, and only those pairs are sent to the API."
+    )
+    
+    names_file = st.file_uploader("📁 Name list", type=UPLOAD_TYPES, key="search_names")
+    if names_file is None:
+        return
+    import pandas as pd
+    from results_table import ColumnarResults
+    
+    try:
+        with st.spinner("Building blocking index..."):
+            index = get_blocking_index(names_file.getvalue(), names_file.name)
+    except Exception as e:
+        st.error(f"❌ Could not read name list: {str(e)}")
+        return
+    if not len(index):
+        st.warning("⚠️ The file contains no names")
+        return
+    
+    index_stats = index.stats()
+    st.caption(
+        f"{index_stats['records']} names • {index_stats['blocking_keys']} blocking keys • "
+        f"{index_stats['ngrams']} n-grams ({index_stats['stop_ngrams']} too common to use)"
+    )
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        mode = st.radio("Mode", ["Find matches for a name", "Deduplicate list"], horizontal=True, key="search_mode")
+    with col2:
+        top_k = st.slider("Candidates per name (k)", min_value=1, max_value=50, value=DEFAULT_TOP_K, key="search_k")
+    
+    if mode == "Find matches for a name":
+        query = st.text_input("Name to look up", key="search_query").strip()
+        if st.button("🔎 Search", type="primary", disabled=not query):
+            candidates = index.candidates(query, k=top_k)
+            rows = run_batch([(query, name) for _, name, _ in candidates], API_ENDPOINT,
+                             max_workers=batch_workers, client=client)
+            for row, (_, _, block_score) in zip(rows, candidates):
+                row['block_score'] = block_score
+            st.session_state.search_results = rows
         
-        # Information about the system
-        st.subheader("📊 Sheet Routing Logic")
-        st.markdown("""
-        **True Data Sheet:**
-        - is_match = YES
-        - confidence ≥ 0.8
+        rows = st.session_state.get('search_results')
+        if rows is not None:
+            col1, col2, col3 = st.columns(3)
+            col1.metric("API Calls", len(rows))
+            col2.metric("Matches", sum(1 for row in rows if row.get('is_match') == 'yes'))
+            col3.metric("Reduction Ratio", f"{reduction_ratio(len(rows), 1, len(index)):.4%}")
+            st.dataframe(
+                pd.DataFrame(rows, columns=['name2', 'block_score', 'is_match', 'confidence_score', 'sheet_name', 'error'])
+                .rename(columns={'name2': 'candidate'}),
+                use_container_width=True,
+                hide_index=True
+            )
+    else:
+        st.caption("Every name is queried against the index, so large lists take a while to block.")
+        if st.button("🧹 Find Duplicates", type="primary"):
+            progress_bar = st.progress(0.0, text="Blocking...")
+            pair_ids = index.candidate_pairs(
+                k=top_k, progress_callback=lambda done, total: progress_bar.progress(done / total, text="Blocking...")
+            )
+            last_render = [0.0]
+            
+            def update_progress(done, total, elapsed):
+                if done < total and elapsed - last_render[0] < STREAM_RENDER_INTERVAL:
+                    return
+                last_render[0] = elapsed
+                progress_bar.progress(done / total, text=f"Matching {done} / {total} candidate pairs...")
+            
+            rows = run_batch([(index.names[id1], index.names[id2]) for id1, id2 in pair_ids], API_ENDPOINT,
+                             max_workers=batch_workers, progress_callback=update_progress, client=client)
+            matched = [ids for ids, row in zip(pair_ids, rows) if row.get('is_match') == 'yes']
+            st.session_state.dedup_results = {
+                'pairs': len(pair_ids),
+                'table': ColumnarResults.from_rows(rows),
+                'clusters': cluster_duplicates(matched),
+            }
         
-        **False Data Sheet:**
-        - is_match = NO  
-        - confidence < 0.8
+        dedup = st.session_state.get('dedup_results')
+        if dedup is not None:
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Candidate Pairs", dedup['pairs'])
+            col2.metric("Reduction Ratio", f"{reduction_ratio(dedup['pairs'], len(index), len(index), dedup=True):.4%}")
+            col3.metric("Duplicate Groups", len(dedup['clusters']))
+            
+            if dedup['clusters']:
+                st.dataframe(pd.DataFrame(
+                    [{'group': group, 'name': index.names[record_id]}
+                     for group, members in enumerate(dedup['clusters'], start=1) for record_id in members]
+                ), use_container_width=True, hide_index=True)
+            render_results_table(dedup['table'], key="dedup_table")
+    
+    with st.expander("🧪 Blocking Quality"):
+        st.markdown("Upload a labeled sample with `name1`, `name2` and `is_match` columns to measure recall at k.")
+        labeled_file = st.file_uploader("Labeled sample", type=UPLOAD_TYPES, key="search_labeled")
+        with_distractors = st.checkbox(
+            "Mix sample into the uploaded list", value=True, key="search_distractors",
+            help="Index the sample alongside every uploaded name so candidates compete as they would in production"
+        )
+        if labeled_file is not None and st.button("📏 Evaluate"):
+            try:
+                labeled = load_labeled_pairs(labeled_file)
+            except Exception as e:
+                st.error(f"❌ Could not read sample: {str(e)}")
+            else:
+                # Evaluate on a copy so the cached index is left untouched
+                base = BlockingIndex.build(index.names) if with_distractors else None
+                evaluation = evaluate_blocking(labeled, k=top_k, index=base)
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Recall@k", f"{evaluation['recall']:.1%}")
+                col2.metric("True Matches Found", f"{evaluation['found']} / {evaluation['positives']}")
+                col3.metric("Reduction Ratio", f"{evaluation['reduction_ratio']:.4%}")
+
+def render_benchmark_tab(api_url, client):
+    """Replay a pair corpus against the API and report latency percentiles"""
+    st.header("⏱️ Latency Benchmark")
+    st.markdown("Replay a corpus of name pairs and measure latency percentiles, throughput and error rate.")
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        target = st.radio("Target", ["Configured API", "Local stand-in server"], key="bench_target")
+        corpus_file = st.file_uploader("Corpus (name1,name2)", type=UPLOAD_TYPES, key="bench_corpus")
+        corpus_size = st.number_input("Synthetic corpus size", min_value=10, value=DEFAULT_CORPUS_SIZE, step=50)
+    with col2:
+        total_requests = st.number_input("Requests", min_value=1, value=DEFAULT_BENCH_REQUESTS, step=100)
+        concurrency = st.slider("Concurrency", min_value=1, max_value=MAX_WORKERS_LIMIT, value=DEFAULT_BENCH_CONCURRENCY)
+        target_qps = st.number_input("Target QPS (0 = closed loop)", min_value=0.0, value=0.0, step=10.0)
+    with col3:
+        repeat_ratio = st.slider("Repeat ratio", min_value=0.0, max_value=1.0, value=DEFAULT_REPEAT_RATIO)
+        use_cache = st.checkbox("Client cache", value=False, key="bench_cache")
+        use_prefilter = st.checkbox("Local pre-filter", value=False, key="bench_prefilter")
+        use_adaptive = st.checkbox("Adaptive concurrency", value=False, key="bench_adaptive")
+    
+    if st.button("▶️ Run Benchmark", type="primary"):
+        base_url = get_local_server().base_url if target == "Local stand-in server" else api_url
+        try:
+            corpus = load_pairs(corpus_file) if corpus_file is not None else generate_corpus(int(corpus_size))
+        except Exception as e:
+            st.error(f"❌ Could not read corpus: {str(e)}")
+            return
         
-        **Default Data Sheet:**
-        - All other combinations
-        """)
+        bench_client = build_benchmark_client(
+            session=client.session, use_cache=use_cache, use_prefilter=use_prefilter, adaptive=use_adaptive
+        )
+        with st.spinner(f"Running {int(total_requests)} requests against {base_url}..."):
+            report = run_benchmark(
+                bench_client,
+                build_endpoint(base_url),
+                corpus,
+                total_requests=int(total_requests),
+                concurrency=concurrency,
+                qps=target_qps or None,
+                repeat_ratio=repeat_ratio
+            )
+        st.session_state.bench_previous = st.session_state.get('bench_report')
+        st.session_state.bench_report = report
+    
+    report = st.session_state.get('bench_report')
+    if not report:
+        return
+    
+    latency = report['latency_ms']
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Throughput", f"{report['throughput_rps']} req/s")
+    col2.metric("p50", f"{latency['p50']} ms")
+    col3.metric("p99", f"{latency['p99']} ms")
+    col4.metric("Error Rate", f"{report['error_rate']:.2%}")
+    st.code(format_report(report), language=None)
+    
+    buckets = report['histogram']['buckets_us']
+    if buckets:
+        import pandas as pd
+        st.bar_chart(pd.DataFrame(
+            {'Requests': [count for _, count in buckets]},
+            index=[round(lower / 1000, 2) for lower, _ in buckets]
+        ), x_label="Latency (ms)")
+    
+    previous = st.session_state.get('bench_previous')
+    if previous:
+        st.markdown("**Change vs previous run**")
+        st.json(compare_reports(previous, report))
+    
+    st.download_button(
+        "⬇️ Download Report (JSON)",
+        data=json.dumps(report, indent=2),
+        file_name=f"benchmark_{report['timestamp'].replace(':', '')}.json",
+        mime="application/json"
+    )
+
+def render_engine_benchmark():
+    """Throughput of the pure-Python scorer vs. the vectorized local engine"""
+    st.markdown("---")
+    st.subheader("⚡ Local Engine Throughput")
+    st.markdown("Score a synthetic corpus with the pure-Python scorer and with the vectorized engine.")
+    col1, col2 = st.columns(2)
+    with col1:
+        engine_pairs = st.number_input("Pairs", min_value=1000, value=100000, step=10000, key="engine_bench_pairs")
+    with col2:
+        # Same default as local_engine, which is only imported (with NumPy) when the benchmark runs
+        engine_workers = st.number_input("Processes", min_value=1, max_value=64, value=min(os.cpu_count() or 1, 64), key="engine_bench_workers")
+    
+    if st.button("▶️ Run Engine Benchmark"):
+        from local_engine import benchmark_engine
         
-        st.markdown("---")
+        with st.spinner(f"Scoring {int(engine_pairs)} pairs..."):
+            st.session_state.engine_report = benchmark_engine(generate_corpus(int(engine_pairs)), workers=int(engine_workers))
+    
+    report = st.session_state.get('engine_report')
+    if report:
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Pure Python", f"{report['python']:,.0f} pairs/s")
+        col2.metric("Vectorized", f"{report['vectorized']:,.0f} pairs/s", f"{report['vectorized'] / report['python']:.1f}x")
+        if 'parallel' in report:
+            col3.metric(
+                f"{report['workers']} Processes", f"{report['parallel']:,.0f} pairs/s",
+                f"{report['parallel'] / report['python']:.1f}x"
+            )
+
+def render_results_table(table, key):
+    """Paginated view over a columnar results table.
+
+    Sorting and filtering run on the NumPy columns and only the visible page
+    is turned into a DataFrame, so reruns stay cheap for very large tables.
+    """
+    from results_table import SHEET_CATEGORIES, SORTABLE_COLUMNS
+    
+    stats = table.stats()
+    latency = stats['latency_ms']
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Match Rate", f"{stats['match_rate']:.1%}")
+    col2.metric("Mean Confidence", f"{stats['mean_confidence']:.2f}")
+    col3.metric("Latency p50", f"{latency['p50']:.0f} ms" if stats['latency_samples'] else "-")
+    col4.metric("Latency p99", f"{latency['p99']:.0f} ms" if stats['latency_samples'] else "-")
+    
+    with st.expander("📊 Confidence Distribution"):
+        st.bar_chart(table.confidence_histogram_frame())
+        st.caption(" • ".join(f"{sheet}: {count}" for sheet, count in stats['sheet_counts'].items()))
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        match_filter = st.selectbox("Match", ["All", "Yes", "No", "Errors"], key=f"{key}_match")
+    with col2:
+        sheet_filter = st.selectbox(
+            "Routing sheet", ["All"] + SHEET_CATEGORIES, key=f"{key}_sheet"
+        )
+    with col3:
+        sort_by = st.selectbox("Sort by", SORTABLE_COLUMNS, key=f"{key}_sort")
+        descending = st.checkbox("Descending", key=f"{key}_descending")
+    with col4:
+        search = st.text_input("Name contains", key=f"{key}_search").strip()
+        page_size = st.selectbox("Rows per page", [25, 50, 100, 250], key=f"{key}_page_size")
+    
+    filters = {
+        'search': search or None,
+        'errors_only': match_filter == "Errors",
+        'is_match': match_filter.lower() if match_filter in ("Yes", "No") else None,
+        'sheet_name': None if sheet_filter == "All" else sheet_filter,
+    }
+    total = table.count(**filters)
+    page_count = max(1, -(-total // page_size))
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        page = st.number_input("Page", min_value=1, max_value=page_count, value=1, key=f"{key}_page")
+    with col2:
+        st.caption(f"{total} of {len(table)} rows • page {page} of {page_count}")
+    
+    with span("results_table_view"):
+        frame, _ = table.view(page=page, page_size=page_size, sort_by=sort_by, descending=descending, **filters)
+    st.dataframe(frame, use_container_width=True, hide_index=True)
+
+def render_run_archive(batch_results):
+    """Save the current run, load a saved one, diff against a baseline and pre-warm the cache"""
+    with st.expander("🗄️ Save / Load Runs"):
+        st.caption(
+            "Arrow files are memory-mapped on load, so multi-million-row runs open without parsing; "
+            "Parquet is smaller on disk"
+        )
+        col1, col2 = st.columns(2)
+        with col1:
+            archive_upload = st.file_uploader("Saved run", type=["arrow", "parquet"], key="archive_upload")
+            archive_name = st.text_input(
+                "…or saved run", placeholder="latest.arrow", key="archive_path",
+                help=f"Name of a run saved on the server, in {RUNS_DIR}"
+            ).strip()
+            load_as = st.radio("Load as", ["Current run", "Diff baseline"], horizontal=True, key="archive_load_as")
+            if (archive_upload is not None or archive_name) and st.button("📂 Load Run"):
+                from result_archive import load_results
+                
+                try:
+                    with span("load_run"):
+                        loaded = load_results(
+                            archive_upload.getvalue() if archive_upload is not None
+                            else server_file_path(RUNS_DIR, archive_name)
+                        )
+                except Exception as e:
+                    st.error(f"❌ Could not load run: {str(e)}")
+                else:
+                    if load_as == "Current run":
+                        st.session_state.batch_results = loaded
+                        st.session_state.batch_elapsed = 0.0
+                        st.session_state.batch_pairs = None
+                    else:
+                        st.session_state.diff_baseline = loaded
+                    st.success(f"✅ Loaded {len(loaded):,} rows")
+        with col2:
+            save_name = st.text_input(
+                "Save current run as", placeholder="latest.arrow", key="archive_save_path",
+                help=f"File name in {RUNS_DIR}; .parquet saves Parquet, anything else Arrow"
+            ).strip()
+            if batch_results is not None and save_name and st.button("💾 Save Run"):
+                from result_archive import save_results
+                
+                try:
+                    save_path = server_file_path(RUNS_DIR, save_name)
+                    os.makedirs(RUNS_DIR, exist_ok=True)
+                    save_results(batch_results, save_path)
+                    st.success(f"✅ Saved {len(batch_results):,} rows to {save_path}")
+                except Exception as e:
+                    st.error(f"❌ Could not save run: {str(e)}")
+            if batch_results is not None and st.button("🔥 Pre-warm Cache"):
+                from result_archive import prewarm_cache
+                
+                stored = prewarm_cache(batch_results, get_result_cache())
+                if stored:
+                    st.success(f"✅ {stored:,} verdicts loaded into the result cache")
+                else:
+                    st.info("ℹ️ Nothing to load: local engine runs, runs from an unknown API and pre-filtered rows are never cached")
         
-        # Test scenarios
-        st.subheader("🧪 Quick Test Scenarios")
-        if st.button("Load Similar Names"):
-            st.session_state.name1 = "John Smith"
-            st.session_state.name2 = "JOHNSMITH123"
+        baseline = st.session_state.get('diff_baseline')
+        if baseline is not None and batch_results is not None:
+            from result_archive import CHANGE_KINDS, diff_results
             
-        if st.button("Load Different Names"):
-            st.session_state.name1 = "Alice Johnson"
-            st.session_state.name2 = "Bob Wilson"
+            tolerance = st.number_input(
+                "Confidence tolerance", min_value=0.0, max_value=1.0, value=0.01, step=0.01, key="diff_tolerance"
+            )
+            with span("diff_runs"):
+                summary, changes = diff_results(baseline, batch_results, tolerance)
+            st.markdown(f"**Changes vs baseline** ({summary['old_pairs']:,} → {summary['new_pairs']:,} pairs)")
+            for column, kind in zip(st.columns(len(CHANGE_KINDS) + 1), CHANGE_KINDS + ['unchanged']):
+                column.metric(kind.capitalize(), f"{summary[kind]:,}")
+            if changes.num_rows:
+                st.dataframe(changes.slice(0, STREAM_PREVIEW_ROWS * 5).to_pandas(), use_container_width=True, hide_index=True)
+                st.download_button(
+                    "⬇️ Download Changes",
+                    data=changes.to_pandas().to_csv(index=False).encode('utf-8'),
+                    file_name="name_match_changes.csv",
+                    mime="text/csv"
+                )
+
+def render_jobs_panel(owner):
+    """Background jobs: progress, cancel/resume and paged partial results.
+    
+    While this user has jobs queued or running, the panel re-runs on its own
+    every few seconds, so progress updates without rerunning the rest of the
+    page; once they have all stopped it stays still until the next rerun.
+    """
+    polling = get_job_queue().has_active(owner)
+    st.fragment(render_jobs, run_every=JOB_POLL_INTERVAL if polling else None)(owner, polling)
+
+def render_jobs(owner, polling):
+    job_queue = get_job_queue()
+    if polling and not job_queue.has_active(owner):
+        # The last job stopped: a full rerun redraws the panel without the timer
+        st.rerun()
+    
+    st.markdown("---")
+    st.header("🧵 Background Jobs")
+    queue_stats = job_queue.stats()
+    jobs = job_queue.list_jobs(owner)
+    st.caption(
+        f"{queue_stats['busy_workers']} of {queue_stats['workers']} workers busy • "
+        f"{queue_stats['active_jobs']} active jobs from {queue_stats['owners']} users"
+    )
+    if not jobs:
+        st.info("No background jobs yet. Tick **Run in background** before running a batch.")
+        return
+    
+    import pandas as pd
+    
+    st.dataframe(
+        pd.DataFrame([{
+            'Job': job['job_id'],
+            'Label': job['label'],
+            'Status': job['status'],
+            'Progress': job['completed'] / job['total'] if job['total'] else 1.0,
+            'Pairs': f"{job['completed']} / {job['total']}",
+            'Matches': job['matches'],
+            'Errors': job['errors'],
+            'Created': job['created_at'],
+        } for job in jobs]),
+        column_config={'Progress': st.column_config.ProgressColumn("Progress", min_value=0.0, max_value=1.0)},
+        use_container_width=True,
+        hide_index=True
+    )
+    
+    job_id = st.selectbox(
+        "Job", [job['job_id'] for job in jobs],
+        format_func=lambda job_id: next(f"{job['job_id']} • {job['label'] or job['kind']} ({job['status']})"
+                                        for job in jobs if job['job_id'] == job_id),
+        key="jobs_selected"
+    )
+    job = job_queue.get(job_id)
+    # Jobs and their results are only ever shown to, and changed by, their owner
+    if job is None or job['owner'] != owner:
+        return
+    if job['message']:
+        st.error(f"❌ {job['message']}")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        if job['status'] not in (DONE, CANCELLED, FAILED) and st.button("⏹️ Cancel", key="job_cancel"):
+            job_queue.cancel(job_id)
+            st.rerun()
+    with col2:
+        if job['status'] in (CANCELLED, FAILED) and st.button("▶️ Resume", key="job_resume"):
+            job_queue.resume(job_id)
+            st.rerun()
+    with col3:
+        if job['completed'] and st.button("📂 Open in Viewer", key="job_open"):
+            from results_table import ColumnarResults
             
-        if st.button("Load Nickname Test"):
-            st.session_state.name1 = "Michael Johnson"
-            st.session_state.name2 = "Mike Johnson"
+            st.session_state.batch_results = ColumnarResults.from_rows(
+                job_queue.all_results(job_id), endpoint=job['params'].get('endpoint')
+            )
+            st.session_state.batch_elapsed = 0.0
+            st.session_state.batch_pairs = None
+            st.rerun()
+    with col4:
+        if job['status'] in (DONE, CANCELLED, FAILED) and st.button("🗑️ Delete", key="job_delete"):
+            job_queue.delete(job_id)
+            st.rerun()
+    
+    # Partial results are readable while the job is still running
+    page_size = 50
+    page_count = max(1, -(-job['completed'] // page_size))
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        page = st.number_input("Results page", min_value=1, max_value=page_count, value=1, key="job_page")
+    with col2:
+        st.caption(f"{job['completed']} of {job['total']} pairs matched • page {page} of {page_count}")
+    rows = job_queue.results(job_id, limit=page_size, offset=(page - 1) * page_size)
+    if rows:
+        st.dataframe(results_to_dataframe(rows), use_container_width=True, hide_index=True)
+
+def render_history(store):
+    """Filterable, paginated history backed by the persistent result store"""
+    # Make this session's just-queued writes visible before querying
+    if store.stats()['pending']:
+        store.flush()
+    if not store.count():
+        return
+    
+    st.markdown("---")
+    st.header("📚 Recent Comparisons")
+    
+    with st.expander("🔎 Filter History"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            date_range = st.date_input("Date range", value=(), key="history_dates")
+            search = st.text_input("Name contains", key="history_search").strip()
+        with col2:
+            match_filter = st.selectbox("Match", ["All", "Yes", "No"], key="history_match")
+            sheet_filter = st.selectbox(
+                "Routing sheet", ["All", TRUE_DATA_SHEET, FALSE_DATA_SHEET, DEFAULT_DATA_SHEET], key="history_sheet"
+            )
+        with col3:
+            confidence_range = st.slider("Confidence", 0.0, 1.0, (0.0, 1.0), step=0.05, key="history_confidence")
+            sort = st.selectbox(
+                "Sort by", list(HISTORY_SORT_LABELS), format_func=HISTORY_SORT_LABELS.get, key="history_sort"
+            )
+            page_size = st.selectbox("Rows per page", [10, 25, 50, 100], key="history_page_size")
+    
+    filters = {
+        'search': search or None,
+        'is_match': None if match_filter == "All" else match_filter.lower(),
+        'sheet_name': None if sheet_filter == "All" else sheet_filter,
+        'min_confidence': confidence_range[0] if confidence_range[0] > 0 else None,
+        'max_confidence': confidence_range[1] if confidence_range[1] < 1 else None,
+    }
+    if len(date_range) == 2:
+        filters['start'] = f"{date_range[0]} 00:00:00"
+        filters['end'] = f"{date_range[1]} 23:59:59"
+    
+    with span("history_query"):
+        total = store.count(**filters)
+    page_count = max(1, -(-total // page_size))
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        page = st.number_input("Page", min_value=1, max_value=page_count, value=1, key="history_page")
+    with col2:
+        st.caption(f"{total} results • page {page} of {page_count}")
+    
+    with span("history_query"):
+        rows = store.query(limit=page_size, offset=(page - 1) * page_size, sort=sort, **filters)
+    with span("history_dataframe"):
+        df = build_history_frame(rows)
+    st.dataframe(df, use_container_width=True)
+    
+    # Clearing wipes every session's history and cached verdicts
+    if ADMIN_MODE and st.button("🗑️ Clear History"):
+        store.clear()
+        get_result_cache().clear()
+        st.rerun()
+
+def build_history_frame(rows):
+    """One page of stored results as a display DataFrame"""
+    import pandas as pd
+    
+    history_data = []
+    for item in rows:
+        history_data.append({
+            'Timestamp': item['last_seen_at'],
+            'Name 1': item['name1'],
+            'Name 2': item['name2'],
+            'Match': '✅ YES' if item['is_match'] == 'yes' else '❌ NO',
+            'Confidence': f"{item['confidence_score']:.2f}",
+            'Sheet': item['sheet_name'],
+            'Source': item['source'],
+            'Seen': item['seen_count'],
+            'Response Time (ms)': item['response_time_ms']
+        })
     
+    return pd.DataFrame(history_data)
+
+@st.fragment
+@timed("compare_fragment")
+def render_compare_section(client, sheet_writer=None):
+    """Inputs, result and history; a compare click reruns only this fragment"""
     # Main input section
     st.header("🎯 Name Comparison Test")
     
@@ -192,24 +911,18 @@ def main():
     with col2:
         if st.button("🚀 Compare Names", type="primary", use_container_width=True):
             if name1.strip() and name2.strip():
-                result, error = call_name_matching_api(name1.strip(), name2.strip())
+                result, error = call_name_matching_api(name1.strip(), name2.strip(), client)
                 
                 if result:
                     st.markdown("---")
                     st.header("📋 Results")
                     display_result(result)
+                    queue_for_sheet(sheet_writer, result_to_row(name1.strip(), name2.strip(), result))
                     
-                    # Store result in session state for history
-                    if 'history' not in st.session_state:
-                        st.session_state.history = []
-                    
-                    result['timestamp'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    result['input_name1'] = name1.strip()
-                    result['input_name2'] = name2.strip()
-                    st.session_state.history.insert(0, result)
-                    
-                    # Keep only last 10 results
-                    st.session_state.history = st.session_state.history[:10]
+                    # API results are persisted by the client; reused and pre-filtered
+                    # verdicts are recorded for the history only and never served back
+                    if result.get('cached') or result.get('prefiltered'):
+                        get_result_store().put(name1.strip(), name2.strip(), result, API_ENDPOINT)
                     
                 elif error:
                     st.error(error)
@@ -217,30 +930,11 @@ def main():
                 st.warning("⚠️ Please enter both names to compare")
     
     # History section
-    if 'history' in st.session_state and st.session_state.history:
-        st.markdown("---")
-        st.header("📚 Recent Comparisons")
-        
-        # Create DataFrame from history
-        history_data = []
-        for item in st.session_state.history:
-            history_data.append({
-                'Timestamp': item.get('timestamp', ''),
-                'Name 1': item.get('input_name1', ''),
-                'Name 2': item.get('input_name2', ''),
-                'Match': '✅ YES' if item.get('is_match') == 'yes' else '❌ NO',
-                'Confidence': f"{item.get('confidence_score', 0):.2f}",
-                'Response Time (ms)': item.get('response_time_ms', 0)
-            })
-        
-        df = pd.DataFrame(history_data)
-        st.dataframe(df, use_container_width=True)
-        
-        # Clear history button
-        if st.button("🗑️ Clear History"):
-            st.session_state.history = []
-            st.rerun()
-    
+    render_history(get_result_store())
+
+@st.fragment
+def render_health_check(client, api_url):
+    """On-demand /health probe of the configured API"""
     # API Health Check
     st.markdown("---")
     st.header("🏥 API Health Check")
@@ -249,18 +943,584 @@ def main():
     with col1:
         if st.button("Check API Status"):
             try:
-                health_response = requests.get(f"{api_url}/health", timeout=5)
+                health_response = client.check_health(api_url)
                 if health_response.status_code == 200:
                     st.success("✅ API is healthy and accessible")
                 else:
                     st.error(f"❌ API returned status code: {health_response.status_code}")
             except requests.exceptions.ConnectionError:
                 st.error(f"❌ Cannot connect to API at {api_url}")
+            except requests.exceptions.Timeout:
+                st.error(f"❌ API at {api_url} did not respond in time")
             except Exception as e:
                 st.error(f"❌ Health check failed: {str(e)}")
     
     with col2:
         st.info(f"📡 **Current API Endpoint:** {API_ENDPOINT}")
+
+@st.cache_resource
+def get_metrics_server(port):
+    """Prometheus /metrics endpoint, started once per process"""
+    return start_metrics_server(port)
+
+def render_performance_panel():
+    """Span timings and match-source counters recorded by the metrics registry"""
+    st.subheader("⏱️ Performance")
+    spans = REGISTRY.snapshot("span_seconds")
+    if spans:
+        # A markdown table keeps pandas out of the rerun path
+        rows = [
+            f"| {dict(labels)['span']} | {summary['count']} | {summary['mean'] * 1000:.1f} | "
+            f"{summary['p50'] * 1000:.1f} | {summary['p95'] * 1000:.1f} |"
+            for labels, summary in sorted(spans.items())
+        ]
+        st.markdown("\n".join(["| Span | Calls | Mean ms | p50 ms | p95 ms |", "|---|---:|---:|---:|---:|"] + rows))
+    sources = REGISTRY.counters("match_results_total")
+    if sources:
+        st.caption(" • ".join(f"{dict(labels)['source']}: {int(count)}" for labels, count in sorted(sources.items())))
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("🔬 Profile Rerun", help="Run the next rerun under cProfile and show the hottest functions"):
+            st.session_state.profile_next_rerun = True
+            st.rerun()
+    with col2:
+        st.download_button(
+            "⬇️ Metrics",
+            data=REGISTRY.render_prometheus(),
+            file_name="namematch_metrics.prom",
+            mime="text/plain"
+        )
+    if st.session_state.get('last_profile'):
+        with st.expander("Last rerun profile"):
+            st.code(st.session_state.last_profile, language=None)
+    if METRICS_PORT:
+        st.caption(f"Prometheus endpoint on port {get_metrics_server(METRICS_PORT).server_port}/metrics")
+
+def run_app():
+    """Run one instrumented rerun, under cProfile if one was requested"""
+    if st.session_state.pop('profile_next_rerun', False):
+        with span("rerun"):
+            _, st.session_state.last_profile = profile_call(main)
+        st.rerun()
+    with span("rerun"):
+        main()
+    if METRICS_FILE:
+        REGISTRY.write_prometheus(METRICS_FILE)
+
+def main():
+    # Header
+    st.title("🔍 Name Matching API Demo")
+    st.markdown("Test the intelligent name matching system with caching and conditional routing")
+    
+    # Sidebar configuration
+    with st.sidebar:
+        st.header("⚙️ Configuration")
+        
+        # API URL configuration
+        st.subheader("API Settings")
+        api_url = st.text_input("API Base URL", value=API_BASE_URL)
+        use_local_server = st.checkbox(
+            "Use local stand-in server",
+            help="Run against an in-process mock of the API for offline development and profiling"
+        )
+        if use_local_server:
+            local_server = get_local_server()
+            api_url = local_server.base_url
+            with st.expander("🧪 Stand-in Fault Injection"):
+                local_server.configure(
+                    latency_ms=st.number_input("Latency (ms)", min_value=0.0, value=float(local_server.latency_ms), step=10.0),
+                    jitter_ms=st.number_input("Jitter (ms)", min_value=0.0, value=float(local_server.jitter_ms), step=10.0),
+                    error_rate=st.slider("Error Rate", min_value=0.0, max_value=1.0, value=float(local_server.error_rate)),
+                    rate_limit=st.number_input(
+                        "Rate Limit (req/s, 0 = off)",
+                        min_value=0.0,
+                        value=float(local_server.rate_limiter.rate if local_server.rate_limiter else 0.0),
+                        step=10.0
+                    )
+                )
+                st.caption(" • ".join(f"{key.replace('_', ' ')}: {value}" for key, value in local_server.stats.items()))
+            st.caption(f"Stand-in server at {api_url}")
+        
+        # Update global API endpoint if changed
+        global API_ENDPOINT
+        API_ENDPOINT = build_endpoint(api_url)
+        
+        # Batch concurrency
+        batch_workers = st.slider(
+            "Batch Concurrency",
+            min_value=1,
+            max_value=MAX_WORKERS_LIMIT,
+            value=DEFAULT_MAX_WORKERS,
+            help="Maximum number of concurrent API calls in batch mode"
+        )
+        
+        # Connection settings
+        with st.expander("🌐 Connection Settings"):
+            pool_size = st.number_input(
+                "Connection Pool Size",
+                min_value=1,
+                max_value=256,
+                value=DEFAULT_POOL_SIZE,
+                help="Keep-alive connections kept open to the API; should be at least the batch concurrency"
+            )
+            connect_timeout = st.number_input(
+                "Connect Timeout (s)", min_value=0.1, value=DEFAULT_CONNECT_TIMEOUT, step=0.5
+            )
+            read_timeout = st.number_input(
+                "Read Timeout (s)", min_value=0.5, value=DEFAULT_READ_TIMEOUT, step=5.0
+            )
+            max_retries = st.number_input(
+                "Max Retries (429/5xx)", min_value=0, max_value=10, value=DEFAULT_MAX_RETRIES
+            )
+        client_settings = (int(pool_size), float(connect_timeout), float(read_timeout), int(max_retries))
+        client = get_match_client(*client_settings)
+        
+        st.markdown("---")
+        
+        # Result cache
+        st.subheader("🧠 Result Cache")
+        result_cache = get_result_cache()
+        cache_ttl = st.number_input(
+            "Cache TTL (seconds)",
+            min_value=0,
+            value=int(result_cache.ttl_seconds),
+            step=60,
+            help="Applies to the memory cache and the disk store; 0 keeps entries until they are evicted"
+        )
+        cache_max_size = st.number_input(
+            "Cache Max Size",
+            min_value=1,
+            value=int(result_cache.max_size),
+            step=1000
+        )
+        result_cache.configure(max_size=cache_max_size, ttl_seconds=cache_ttl)
+        get_result_store().configure(ttl_seconds=cache_ttl)
+        
+        cache_stats = result_cache.stats()
+        col1, col2 = st.columns(2)
+        col1.metric("Hits", cache_stats['hits'])
+        col2.metric("Misses", cache_stats['misses'])
+        st.caption(
+            f"Hit rate {cache_stats['hit_rate']:.0%} • {cache_stats['size']} / {cache_stats['max_size']} entries • "
+            f"{cache_stats['evictions']} evicted • {cache_stats['expirations']} expired"
+        )
+        store_stats = get_result_store().stats()
+        st.caption(
+            f"💾 Disk store: {store_stats['hits']} hits • {store_stats['writes']} rows written "
+            f"in {store_stats['batches']} batches • {store_stats['pending']} pending"
+        )
+        if store_stats['last_error']:
+            st.caption(
+                f"⚠️ {store_stats['failed_batches']} failed writes, {store_stats['dropped']} rows dropped • "
+                f"last: {store_stats['last_error']}"
+            )
+        if ADMIN_MODE and st.button("🧹 Clear Cache"):
+            result_cache.clear()
+            st.rerun()
+        
+        st.markdown("---")
+        
+        # Local pre-filter
+        st.subheader("⚡ Local Pre-filter")
+        prefilter = get_prefilter()
+        prefilter_enabled = st.checkbox(
+            "Decide obvious pairs locally",
+            value=prefilter.enabled,
+            help="Exact matches after normalization, known nicknames/aliases (Mike ≈ Michael) and pairs with no shared tokens or initials skip the API"
+        )
+        non_match_threshold, match_threshold = st.slider(
+            "Ambiguous Band (sent to API)",
+            min_value=0.0,
+            max_value=1.0,
+            value=(float(prefilter.non_match_threshold), float(prefilter.match_threshold)),
+            step=0.01,
+            help="Local scores at or below the lower bound are non-matches, at or above the upper bound are matches"
+        )
+        prefilter.configure(
+            enabled=prefilter_enabled,
+            match_threshold=match_threshold,
+            non_match_threshold=non_match_threshold
+        )
+        
+        prefilter_stats = prefilter.stats()
+        col1, col2 = st.columns(2)
+        col1.metric("Short-circuited", prefilter_stats['matches'] + prefilter_stats['non_matches'])
+        col2.metric("Sent to API", prefilter_stats['forwarded'])
+        st.caption(
+            f"Short-circuit rate {prefilter_stats['short_circuit_rate']:.0%} • "
+            f"{prefilter_stats['matches']} matches • {prefilter_stats['non_matches']} non-matches"
+        )
+        
+        st.markdown("---")
+        
+        # Request coalescing
+        st.subheader("🔗 Request Coalescing")
+        client.single_flight.enabled = st.checkbox(
+            "Share identical in-flight requests",
+            value=client.single_flight.enabled,
+            help="Concurrent compares of the same normalized pair wait for one HTTP call"
+        )
+        micro_batch_enabled = st.checkbox(
+            "Micro-batch requests",
+            value=client.micro_batcher.enabled,
+            help="Collect pairs for a few milliseconds and send them as one bulk request; "
+                 "falls back to parallel single calls if the backend has no bulk endpoint"
+        )
+        batch_window_ms = st.slider(
+            "Batch Window (ms)", min_value=1, max_value=50, value=int(client.micro_batcher.window_ms)
+        )
+        max_batch_size = st.number_input(
+            "Max Batch Size", min_value=2, max_value=500, value=int(client.micro_batcher.max_batch_size)
+        )
+        client.micro_batcher.configure(
+            enabled=micro_batch_enabled,
+            window_ms=batch_window_ms,
+            max_batch_size=max_batch_size
+        )
+        
+        single_flight_stats = client.single_flight.stats()
+        micro_batch_stats = client.micro_batcher.stats()
+        col1, col2 = st.columns(2)
+        col1.metric("Coalesced", single_flight_stats['coalesced'])
+        col2.metric("Bulk Batches", micro_batch_stats['batches_sent'])
+        st.caption(
+            f"{single_flight_stats['executions']} HTTP fetches • "
+            f"avg batch {micro_batch_stats['average_batch_size']:.1f} pairs • "
+            f"{micro_batch_stats['fallback_pairs']} sent singly"
+        )
+        if micro_batch_stats['bulk_unsupported']:
+            st.caption("ℹ️ Bulk endpoint not available; using parallel single calls")
+        
+        st.markdown("---")
+        
+        # Adaptive concurrency limit and circuit breaker
+        st.subheader("🚦 Flow Control")
+        limiter_enabled = st.checkbox(
+            "Adaptive concurrency limit",
+            value=client.limiter.enabled,
+            help="Grow the number of concurrent API calls while latency stays flat; cut it on errors or slowdowns"
+        )
+        max_limit = st.slider(
+            "Max Concurrent Calls", min_value=1, max_value=MAX_WORKERS_LIMIT, value=int(client.limiter.max_limit)
+        )
+        client.limiter.configure(enabled=limiter_enabled, max_limit=max_limit)
+        breaker_enabled = st.checkbox(
+            "Circuit breaker",
+            value=client.breaker.enabled,
+            help="Stop calling the API for a while once too many recent calls failed"
+        )
+        failure_threshold = st.slider(
+            "Trip at Failure Rate", min_value=0.1, max_value=1.0, value=float(client.breaker.failure_rate_threshold), step=0.05
+        )
+        client.breaker.configure(enabled=breaker_enabled, failure_rate_threshold=failure_threshold)
+        client.local_fallback = st.checkbox(
+            "Local fallback when unavailable",
+            value=client.local_fallback,
+            help="Answer with a local similarity verdict instead of an error while the API is shed or the breaker is open"
+        )
+        
+        limiter_stats = client.limiter.stats()
+        breaker_stats = client.breaker.stats()
+        col1, col2 = st.columns(2)
+        col1.metric("Limit", limiter_stats['limit'] if limiter_stats['enabled'] else "off")
+        col2.metric("Breaker", breaker_stats['state'].title() if breaker_stats['enabled'] else "Off")
+        col1.metric("In Flight", limiter_stats['in_flight'])
+        col2.metric("Shed", limiter_stats['shed'] + breaker_stats['rejected'])
+        st.caption(
+            f"Baseline {limiter_stats['baseline_ms'] or 0:.0f} ms • "
+            f"{limiter_stats['increases']} increases / {limiter_stats['decreases']} cuts • "
+            f"failure rate {breaker_stats['failure_rate']:.0%} • {breaker_stats['trips']} trips"
+        )
+        if breaker_stats['state'] == BREAKER_OPEN:
+            st.caption(f"⛔ Retrying the API in {breaker_stats['retry_in_seconds']:.0f}s")
+        
+        st.markdown("---")
+        
+        # Routed sheet output, written in batches
+        st.subheader("📤 Sheet Output")
+        sheet_output = st.checkbox(
+            "Write routed results",
+            value=False,
+            help="Append every result to its target sheet, batched per sheet and skipping pairs already written"
+        )
+        sheet_writer = None
+        if sheet_output:
+            sheet_format = st.selectbox("Format", SHEET_FORMATS, format_func=SHEET_FORMAT_LABELS.get)
+            sheet_folder = st.text_input(
+                "Output folder", placeholder="default",
+                help=f"Optional subfolder name of {SHEET_OUTPUT_DIR}; leave empty to write there directly"
+            ).strip()
+            bloom = st.checkbox(
+                "Bloom filter dedup",
+                value=False,
+                help="Fixed memory for very large outputs at the cost of rare false duplicates; otherwise an exact hash set"
+            )
+            sheet_batch_size = st.number_input("Rows per Write", min_value=1, max_value=10000, value=DEFAULT_BATCH_SIZE, step=50)
+            flush_interval = st.slider(
+                "Flush Every (s)", min_value=0.5, max_value=30.0, value=DEFAULT_FLUSH_INTERVAL, step=0.5
+            )
+            try:
+                sheet_directory = server_file_path(SHEET_OUTPUT_DIR, sheet_folder) if sheet_folder else SHEET_OUTPUT_DIR
+            except ValueError as e:
+                st.error(f"❌ {str(e)}")
+                sheet_directory = None
+            if sheet_directory is not None:
+                sheet_writer = get_sheet_writer(sheet_format, sheet_directory, bloom)
+                sheet_writer.configure(batch_size=int(sheet_batch_size), flush_interval=flush_interval)
+                
+                if st.button("💾 Flush Now"):
+                    try:
+                        sheet_writer.flush()
+                    except Exception as e:
+                        st.error(f"❌ Flush failed: {str(e)}")
+                
+                writer_stats = sheet_writer.stats()
+                col1, col2 = st.columns(2)
+                col1.metric("Written", writer_stats['written'])
+                col2.metric("Buffered", writer_stats['buffered'])
+                col1.metric("Duplicates", writer_stats['duplicates'])
+                col2.metric("Writes", writer_stats['flushes'])
+                st.caption(
+                    f"{writer_stats['rows_per_flush']:.0f} rows/write • {writer_stats['mean_flush_ms']:.0f} ms/write • "
+                    f"{writer_stats['dedup']['keys']} keys in {writer_stats['dedup']['kind']}"
+                )
+                if writer_stats['last_error']:
+                    st.caption(f"⚠️ Last write failed: {writer_stats['last_error']}")
+        
+        st.markdown("---")
+        
+        render_performance_panel()
+        
+        st.markdown("---")
+        
+        # Information about the system
+        st.subheader("📊 Sheet Routing Logic")
+        st.markdown("""
+        **True Data Sheet:**
+        - is_match = YES
+        - confidence ≥ 0.8
+        
+        **False Data Sheet:**
+        - is_match = NO  
+        - confidence < 0.8
+        
+        **Default Data Sheet:**
+        - All other combinations
+        """)
+        
+        st.markdown("---")
+        
+        # Test scenarios
+        st.subheader("🧪 Quick Test Scenarios")
+        if st.button("Load Similar Names"):
+            st.session_state.name1 = "John Smith"
+            st.session_state.name2 = "JOHNSMITH123"
+            
+        if st.button("Load Different Names"):
+            st.session_state.name1 = "Alice Johnson"
+            st.session_state.name2 = "Bob Wilson"
+            
+        if st.button("Load Nickname Test"):
+            st.session_state.name1 = "Michael Johnson"
+            st.session_state.name2 = "Mike Johnson"
+    
+    tab_compare, tab_batch, tab_search, tab_benchmark = st.tabs(["🎯 Compare", "📦 Batch", "🔎 Search", "⏱️ Benchmark"])
+    
+    with tab_compare:
+        render_compare_section(client, sheet_writer)
+        render_health_check(client, api_url)
+        
+    with tab_batch:
+        # Batch matching section
+        st.header("📦 Batch Matching")
+        st.markdown("Upload a CSV or Excel file with `name1` and `name2` columns to match every row.")
+        
+        uploaded_file = st.file_uploader("📁 Name pairs file", type=UPLOAD_TYPES)
+        processing_mode = st.radio(
+            "Processing Mode",
+            ["In-memory", "Stream to disk"],
+            horizontal=True,
+            help="Stream to disk reads the file lazily and appends results to an NDJSON/CSV file as they arrive"
+        )
+        
+        if processing_mode == "Stream to disk":
+            from streaming_pipeline import OUTPUT_DIR
+            
+            input_name = st.text_input(
+                "…or server-side input file",
+                placeholder="pairs.csv",
+                help=f"Read a file already on the app server, in {OUTPUT_DIR}, instead of uploading it"
+            ).strip()
+            source = uploaded_file
+            if source is None and input_name:
+                try:
+                    source = server_file_path(OUTPUT_DIR, input_name)
+                except ValueError as e:
+                    st.error(f"❌ {str(e)}")
+            if source is not None:
+                render_streaming_batch(source, client, batch_workers, sheet_writer)
+        elif uploaded_file is not None:
+            try:
+                pairs = load_pairs(uploaded_file)
+            except Exception as e:
+                pairs = []
+                st.error(f"❌ Could not read file: {str(e)}")
+            
+            if pairs:
+                st.caption(f"{len(pairs)} pairs loaded")
+                engine = st.radio(
+                    "Engine",
+                    ["API", "Local engine"],
+                    horizontal=True,
+                    help="The local engine scores every pair in-process with vectorized Jaro-Winkler and token overlap"
+                )
+                if engine == "Local engine":
+                    from local_engine import DEFAULT_WORKERS
+                    
+                    engine_workers = st.number_input(
+                        "Engine processes", min_value=1, max_value=64, value=min(DEFAULT_WORKERS, 64),
+                        help="Large batches are split across this many worker processes"
+                    )
+                if engine == "Local engine" and st.button("🚀 Run Batch", type="primary"):
+                    from results_table import SOURCE_LOCAL_ENGINE, ColumnarResults
+                    
+                    batch_start = time.perf_counter()
+                    local_engine = get_local_engine(int(engine_workers))
+                    with st.spinner(f"Scoring {len(pairs)} pairs locally..."):
+                        rows = local_engine.rows(pairs, local_engine.score(pairs))
+                    st.session_state.batch_results = ColumnarResults.from_rows(rows, source=SOURCE_LOCAL_ENGINE)
+                    st.session_state.batch_elapsed = time.perf_counter() - batch_start
+                    st.session_state.batch_pairs = None
+                    st.session_state.setdefault('engine_throughput', {})[engine] = len(pairs) / st.session_state.batch_elapsed
+                    if sheet_writer is not None:
+                        queued = sheet_writer.add_many(rows)
+                        sheet_writer.flush()
+                        st.caption(f"📤 {queued} new rows written to routed sheets")
+                run_in_background = engine == "API" and st.checkbox(
+                    "Run in background",
+                    help="Queue the batch on the shared worker pool; it keeps running if you leave the page, "
+                         "but unless you are signed in you can only see it from this session"
+                )
+                if run_in_background and st.button("🚀 Run Batch", type="primary"):
+                    job_id = get_job_queue().submit(
+                        get_job_owner(), 'batch', pairs,
+                        params={'endpoint': API_ENDPOINT, 'client': client_settings},
+                        label=getattr(uploaded_file, 'name', None)
+                    )
+                    st.success(f"✅ Queued job **{job_id}** ({len(pairs)} pairs); follow it under Background Jobs")
+                elif engine == "API" and not run_in_background and st.button("🚀 Run Batch", type="primary"):
+                    progress_bar = st.progress(0.0)
+                    status_placeholder = st.empty()
+                    last_render = [0.0]
+                    
+                    def update_progress(done, total, elapsed):
+                        # Redraw a few times a second, as the streaming path does, not once per pair
+                        if done < total and elapsed - last_render[0] < STREAM_RENDER_INTERVAL:
+                            return
+                        last_render[0] = elapsed
+                        throughput = done / elapsed if elapsed > 0 else 0.0
+                        progress_bar.progress(done / total)
+                        status_placeholder.markdown(
+                            f"**{done} / {total}** pairs • **{throughput:.1f}** pairs/sec • {elapsed:.1f}s elapsed"
+                        )
+                    
+                    batch_start = time.perf_counter()
+                    from results_table import ColumnarResults
+                    
+                    rows = run_batch(
+                        pairs,
+                        API_ENDPOINT,
+                        max_workers=batch_workers,
+                        progress_callback=update_progress,
+                        client=client
+                    )
+                    st.session_state.batch_results = ColumnarResults.from_rows(rows, endpoint=API_ENDPOINT)
+                    st.session_state.batch_elapsed = time.perf_counter() - batch_start
+                    st.session_state.batch_pairs = (pairs, rows)
+                    st.session_state.setdefault('engine_throughput', {})[engine] = len(pairs) / st.session_state.batch_elapsed
+                    if sheet_writer is not None:
+                        queued = sheet_writer.add_many(rows)
+                        sheet_writer.flush()
+                        st.caption(f"📤 {queued} new rows written to routed sheets")
+        
+        if st.session_state.get('batch_results') is not None:
+            batch_results = st.session_state.batch_results
+            batch_elapsed = st.session_state.get('batch_elapsed', 0.0)
+            
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Pairs", len(batch_results))
+            col2.metric("Matches", batch_results.match_count)
+            col3.metric("Errors", batch_results.error_count)
+            col4.metric("Throughput", f"{len(batch_results) / batch_elapsed:.1f} pairs/sec" if batch_elapsed > 0 else "-")
+            
+            throughput = st.session_state.get('engine_throughput', {})
+            if len(throughput) == 2:
+                st.caption(
+                    f"⚡ Local engine {throughput['Local engine']:,.0f} pairs/sec vs API {throughput['API']:,.1f} pairs/sec "
+                    f"({throughput['Local engine'] / throughput['API']:,.0f}x)"
+                )
+            
+            # Cross-check the API's verdicts against the local engine
+            if st.session_state.get('batch_pairs') and st.button("🔬 Check Against Local Engine"):
+                from local_engine import validate_results
+                
+                api_pairs, api_rows = st.session_state.batch_pairs
+                local_engine = get_local_engine(1)
+                validation = validate_results(api_rows, local_engine.score(api_pairs))
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Verdict Agreement", f"{validation['agreement']:.1%}")
+                col2.metric("Mean |Δ Confidence|", f"{validation['mean_confidence_difference']:.3f}")
+                col3.metric("Disagreements", len(validation['disagreements']))
+                if validation['disagreements']:
+                    st.dataframe(
+                        results_to_dataframe([api_rows[index] for index in validation['disagreements'][:STREAM_PREVIEW_ROWS]]),
+                        use_container_width=True
+                    )
+            
+            render_results_table(batch_results, key="batch_table")
+            
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.download_button(
+                    "⬇️ Download CSV",
+                    data=batch_results.export('csv'),
+                    file_name="name_match_results.csv",
+                    mime="text/csv"
+                )
+            with col2:
+                # Writing XLSX is slow for big tables, so only do it when asked
+                if len(batch_results) <= EXCEL_EAGER_ROWS or batch_results.has_export('xlsx') or st.button("📄 Prepare Excel"):
+                    st.download_button(
+                        "⬇️ Download Excel",
+                        data=batch_results.export('xlsx'),
+                        file_name="name_match_results.xlsx",
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    )
+            with col3:
+                st.download_button(
+                    "⬇️ Download Parquet",
+                    data=batch_results.export('parquet'),
+                    file_name="name_match_results.parquet",
+                    mime="application/vnd.apache.parquet"
+                )
+            with col4:
+                st.download_button(
+                    "⬇️ Download Arrow",
+                    data=batch_results.export('arrow'),
+                    file_name="name_match_results.arrow",
+                    mime="application/vnd.apache.arrow.file"
+                )
+        
+        render_run_archive(st.session_state.get('batch_results'))
+        render_jobs_panel(get_job_owner())
+        
+    with tab_search:
+        render_search_tab(client, batch_workers)
+    
+    with tab_benchmark:
+        render_benchmark_tab(api_url, client)
+        render_engine_benchmark()
     
     # Footer
     st.markdown("---")
@@ -275,7 +1535,7 @@ def main():
     )
 
 if __name__ == "__main__":
-    main()
+    run_app()
 #past edpoint tests
 # import streamlit as st
 # import requests
@@ -0,0 +1,101 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from job_queue import CANCELLED, DONE, JobQueue
+
+PAIRS = [(f"Name {index}", f"Other {index}") for index in range(10)]
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class GatedHandler:
+    """Match handler that blocks until released, so tests control what is in flight"""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, name1, name2, params):
+        self.started.set()
+        self.release.wait(5)
+        return {'name1': name1, 'name2': name2, 'is_match': "yes"}
+
+
+@pytest.fixture
+def handler():
+    handler = GatedHandler()
+    yield handler
+    handler.release.set()
+
+
+@pytest.fixture
+def queue(tmp_path, handler):
+    queue = JobQueue({'match': handler}, path=str(tmp_path / "jobs.db"), workers=2, slice_size=3)
+    yield queue
+    queue.close()
+
+
+def test_job_runs_to_completion(queue, handler):
+    handler.release.set()
+    job_id = queue.submit("alice", 'match', PAIRS)
+    assert wait_for(lambda: queue.get(job_id)['status'] == DONE)
+    job = queue.get(job_id)
+    assert (job['completed'], job['matches']) == (len(PAIRS), len(PAIRS))
+    assert [row['row'] for row in queue.all_results(job_id)] == list(range(1, len(PAIRS) + 1))
+
+
+def test_cancel_then_resume_matches_every_pair_once(queue, handler):
+    job_id = queue.submit("alice", 'match', PAIRS)
+    assert handler.started.wait(5)
+    assert queue.cancel(job_id)
+    handler.release.set()
+    assert wait_for(lambda: queue.stats()['busy_workers'] == 0)
+    assert queue.get(job_id)['status'] == CANCELLED
+    assert queue.get(job_id)['completed'] < len(PAIRS)
+
+    assert queue.resume(job_id)
+    assert wait_for(lambda: queue.get(job_id)['status'] == DONE)
+    assert queue.get(job_id)['completed'] == len(PAIRS)
+    assert len(queue.all_results(job_id)) == len(PAIRS)
+    assert not queue.resume(job_id)
+
+
+def test_delete_during_a_slice_leaves_no_rows(queue, handler):
+    job_id = queue.submit("alice", 'match', PAIRS)
+    assert handler.started.wait(5)
+    queue.delete(job_id)
+    handler.release.set()
+    assert wait_for(lambda: queue.stats()['busy_workers'] == 0)
+
+    assert queue.get(job_id) is None
+    with sqlite3.connect(queue.path) as connection:
+        for table in ('jobs', 'job_items', 'job_results'):
+            assert connection.execute(f"SELECT COUNT(*) FROM {table} WHERE job_id = ?", (job_id,)).fetchone()[0] == 0
+
+
+def test_owner_share_is_forgotten_once_idle(queue, handler):
+    handler.release.set()
+    job_id = queue.submit("alice", 'match', PAIRS)
+    assert wait_for(lambda: queue.get(job_id)['status'] == DONE)
+    assert wait_for(lambda: queue.stats()['busy_workers'] == 0)
+    assert "alice" not in queue._owner_served
+    assert "alice" not in queue._owner_leases
+
+
+def test_has_active_is_per_owner(queue, handler):
+    job_id = queue.submit("alice", 'match', PAIRS)
+    assert queue.has_active("alice")
+    assert not queue.has_active("bob")
+    handler.release.set()
+    assert wait_for(lambda: queue.get(job_id)['status'] == DONE)
+    assert not queue.has_active("alice")
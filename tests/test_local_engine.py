@@ -0,0 +1,45 @@
+import pytest
+
+from local_engine import NO_LETTERS_ERROR, LocalEngine
+from prefilter import score_pair
+
+PAIRS = [
+    ("John Smith", "Jon Smith"),
+    ("María José García", "Maria Jose Garcia"),
+    ("Chukwuemeka Obi", "Emeka Obi"),
+    ("Ada Lovelace", "Grace Hopper"),
+    ("Li", "Lee"),
+]
+
+
+@pytest.fixture
+def engine():
+    with LocalEngine(workers=1) as engine:
+        yield engine
+
+
+def test_scores_match_the_prefilter(engine):
+    scores = engine.score(PAIRS)
+    for index, (name1, name2) in enumerate(PAIRS):
+        features = score_pair(name1, name2)
+        expected = 1.0 if features['exact'] else features['score']
+        assert scores['confidence_score'][index] == pytest.approx(expected, abs=1e-12)
+        assert scores['jaro_winkler'][index] == pytest.approx(features['jaro_winkler'], abs=1e-12)
+
+
+@pytest.mark.parametrize("name1, name2", [("123", "456"), ("123", "123"), ("...", "John"), ("John", "007")])
+def test_names_without_letters_score_zero(engine, name1, name2):
+    scores = engine.score([(name1, name2)])
+    for column in ('confidence_score', 'jaccard', 'jaro_winkler', 'levenshtein', 'ngram_jaccard'):
+        assert scores[column][0] == 0.0
+    assert not scores['exact'][0]
+    assert not scores['comparable'][0]
+
+
+def test_rows_report_names_without_letters_as_errors(engine):
+    pairs = [("123", "456"), ("", "John"), ("John Smith", "John Smith")]
+    rows = engine.rows(pairs, engine.score(pairs))
+    assert rows[0]['error'] == NO_LETTERS_ERROR
+    assert rows[1]['error'] == "Missing name"
+    assert rows[2]['is_match'] == "yes"
+    assert 'error' not in rows[2]
@@ -0,0 +1,67 @@
+import pytest
+
+from name_tables import SOURCE_DIR, NameTables, get_tables, main, source_digest, strip_honorifics
+from prefilter import PreFilter, equivalent_tokens
+from result_cache import normalize_name, pair_key
+
+
+def test_compiled_tables_are_up_to_date():
+    assert get_tables().digest == source_digest(SOURCE_DIR)
+    assert main(["check"]) == 0
+
+
+def test_compiled_file_matches_sources():
+    assert len(get_tables()) == len(NameTables.from_sources())
+
+
+@pytest.mark.parametrize("name1, name2", [
+    ("John Smith Jr", "John Smith Sr"),
+    ("John Smith II", "John Smith III"),
+    ("John Smith", "John Smith Jr"),
+])
+def test_generational_suffixes_distinguish_people(name1, name2):
+    assert equivalent_tokens(name1, name2) is None
+    assert PreFilter().evaluate(name1, name2) is None
+    assert pair_key(name1, name2) != pair_key(name1, name1)
+
+
+def test_generational_suffix_spellings_are_equivalent():
+    assert equivalent_tokens("John Smith Jr", "John Smith Jnr") is not None
+
+
+def test_titles_and_credentials_are_ignored():
+    result = PreFilter().evaluate("Dr. John Smith", "John Smith PhD")
+    assert result['is_match'] == "yes"
+
+
+@pytest.mark.parametrize("surname", ["con", "mon"])
+def test_real_surnames_are_not_stripped(surname):
+    assert strip_honorifics(["john", surname]) == ["john", surname]
+
+
+def test_cache_key_keeps_titles_and_suffixes():
+    assert normalize_name("Dr  José Smith Jr") == "dr jose smith jr"
+    assert pair_key("Mr John Smith", "John Smith") != pair_key("John Smith", "John Smith")
+
+
+@pytest.mark.parametrize("name1, name2", [
+    ("Al Smith", "Fred Smith"),
+    ("Charlie Brown", "Lottie Brown"),
+    ("Sandra Lee", "Alex Lee"),
+    ("Tina Smith", "Chris Smith"),
+    ("Kit Jones", "Topher Jones"),
+])
+def test_ambiguous_nicknames_do_not_match_through_one_shared_form(name1, name2):
+    assert equivalent_tokens(name1, name2) is None
+    result = PreFilter().evaluate(name1, name2)
+    assert result is None or result['is_match'] == "no"
+
+
+@pytest.mark.parametrize("name1, name2", [
+    ("Mike Smith", "Michael Smith"),
+    ("Bill Smith", "Will Smith"),
+    ("Fred Smith", "Alfred Smith"),
+    ("Chris Jones", "Christopher Jones"),
+])
+def test_nicknames_match_their_canonical_name(name1, name2):
+    assert PreFilter().evaluate(name1, name2)['is_match'] == "yes"
@@ -0,0 +1,44 @@
+import pytest
+
+from prefilter import PreFilter, fallback_result, jaccard_similarity, score_pair
+
+
+@pytest.mark.parametrize("name1, name2", [("123", "456"), ("!!!", "John"), ("John", "42"), ("", "")])
+def test_names_without_letters_are_not_scored(name1, name2):
+    assert score_pair(name1, name2) is None
+
+
+@pytest.mark.parametrize("name1, name2", [("123", "456"), ("---", "...")])
+def test_prefilter_defers_names_without_letters_to_the_api(name1, name2):
+    prefilter = PreFilter()
+    assert prefilter.evaluate(name1, name2) is None
+    assert prefilter.stats()['forwarded'] == 1
+
+
+def test_fallback_never_matches_names_without_letters():
+    result = fallback_result("123", "456")
+    assert result['is_match'] == "no"
+    assert result['confidence_score'] == 0.0
+    assert result['fallback'] is True
+
+
+def test_jaccard_of_empty_sets_is_zero():
+    assert jaccard_similarity([], []) == 0.0
+    assert jaccard_similarity(["john"], []) == 0.0
+    assert jaccard_similarity(["john"], ["john"]) == 1.0
+
+
+def test_exact_match_after_normalization():
+    result = PreFilter().evaluate("John  Smith", "john smith!")
+    assert result['is_match'] == "yes"
+    assert result['confidence_score'] == 1.0
+
+
+@pytest.mark.parametrize("name1, name2", [("John Smith 1", "John Smith 2"), ("John Smith", "JOHNSMITH123")])
+def test_pairs_whose_numbers_differ_go_to_the_api(name1, name2):
+    assert not score_pair(name1, name2)['exact']
+    assert PreFilter().evaluate(name1, name2) is None
+
+
+def test_same_numbers_still_match_locally():
+    assert PreFilter().evaluate("John Smith 2", "john smith 2")['confidence_score'] == 1.0
@@ -0,0 +1,70 @@
+import pytest
+
+from api_client import MatchClient, build_endpoint
+from mock_server import start_server
+from result_archive import prewarm_cache
+from result_cache import ResultCache, pair_hash, pair_key
+from result_store import ResultStore
+from results_table import SOURCE_LOCAL_ENGINE, ColumnarResults
+
+PRODUCTION = "https://api.example.com/api/v1/utility/util"
+STAND_IN = "http://127.0.0.1:8000/api/v1/utility/util"
+RESULT = {'is_match': "yes", 'confidence_score': 0.9, 'reason': "r"}
+ROWS = [dict(RESULT, name1="John Smith", name2="Jon Smith", sheet_name="Name Match API True Data")]
+
+
+def test_pair_key_is_order_and_case_insensitive():
+    assert pair_key("John  Smith", "JON SMITH") == pair_key("jon smith", "john smith")
+
+
+def test_cache_entries_are_per_endpoint():
+    cache = ResultCache()
+    cache.put("John Smith", "Jon Smith", RESULT, STAND_IN)
+    assert cache.get("John Smith", "Jon Smith", STAND_IN) == RESULT
+    assert cache.get("John Smith", "Jon Smith", PRODUCTION) is None
+
+
+def test_store_entries_are_per_endpoint(tmp_path):
+    store = ResultStore(str(tmp_path / "results.db"))
+    try:
+        store.put("John Smith", "Jon Smith", RESULT, STAND_IN)
+        store.flush()
+        assert store.get("John Smith", "Jon Smith", STAND_IN) is not None
+        assert store.get("John Smith", "Jon Smith", PRODUCTION) is None
+    finally:
+        store.close()
+    assert pair_hash("a", "b", STAND_IN) != pair_hash("a", "b", PRODUCTION)
+
+
+def test_client_does_not_reuse_another_servers_verdicts(tmp_path):
+    first, second = start_server(), start_server()
+    store = ResultStore(str(tmp_path / "results.db"))
+    try:
+        client = MatchClient(cache=ResultCache(), store=store, local_fallback=False)
+        for server in (first, second, first):
+            result, error = client.match("John Smith", "Jon Smith", build_endpoint(server.base_url))
+            assert error is None
+        assert result['cached']
+        assert first.stats['requests'] == 1
+        assert second.stats['requests'] == 1
+    finally:
+        store.close()
+        first.shutdown()
+        second.shutdown()
+
+
+def test_prewarm_uses_the_runs_endpoint():
+    cache = ResultCache()
+    assert prewarm_cache(ColumnarResults.from_rows(ROWS, endpoint=STAND_IN), cache) == 1
+    assert cache.get("John Smith", "Jon Smith", STAND_IN) is not None
+    assert cache.get("John Smith", "Jon Smith", PRODUCTION) is None
+
+
+@pytest.mark.parametrize("table", [
+    ColumnarResults.from_rows(ROWS),
+    ColumnarResults.from_rows(ROWS, source=SOURCE_LOCAL_ENGINE, endpoint=PRODUCTION),
+])
+def test_prewarm_skips_runs_of_unknown_or_local_origin(table):
+    cache = ResultCache()
+    assert prewarm_cache(table, cache) == 0
+    assert len(cache) == 0
@@ -0,0 +1,111 @@
+import sqlite3
+import time
+
+import pytest
+
+from api_client import MatchClient
+from mock_server import start_server
+from api_client import build_endpoint
+from prefilter import PreFilter
+from result_cache import ResultCache
+from result_store import _SCHEMA, MAX_WRITE_RETRIES, ResultStore
+
+API_RESULT = {'is_match': "yes", 'confidence_score': 0.91, 'reason': "API"}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultStore(str(tmp_path / "results.db"), flush_interval=0.01)
+    yield store
+    store.close()
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_api_results_are_served(store):
+    store.put("John Smith", "Jon Smith", API_RESULT)
+    assert store.get("John Smith", "Jon Smith")['confidence_score'] == 0.91
+    store.flush()
+    assert store.get("Jon Smith", "John Smith")['is_match'] == "yes"
+
+
+@pytest.mark.parametrize("flag", ['prefiltered', 'fallback'])
+def test_local_verdicts_are_history_only(store, flag):
+    store.put("John Smith", "John Smith", dict(API_RESULT, **{flag: True}))
+    assert store.get("John Smith", "John Smith") is None
+    store.flush()
+    assert store.get("John Smith", "John Smith") is None
+    assert store.count() == 1
+
+
+def test_reused_verdict_keeps_the_api_origin(store):
+    store.put("John Smith", "Jon Smith", API_RESULT)
+    store.flush()
+    store.put("John Smith", "Jon Smith", dict(API_RESULT, cached=True))
+    assert store.get("John Smith", "Jon Smith") is not None
+    store.flush()
+    assert store.get("John Smith", "Jon Smith") is not None
+
+
+def test_stored_results_expire(store):
+    store.put("John Smith", "Jon Smith", API_RESULT)
+    store.flush()
+    with sqlite3.connect(store.path) as connection:
+        connection.execute("UPDATE results SET verified_at = '2000-01-01 00:00:00'")
+    assert store.get("John Smith", "Jon Smith") is None
+    assert store.stats()['expirations'] == 1
+    store.configure(ttl_seconds=0)
+    assert store.get("John Smith", "Jon Smith") is not None
+
+
+def test_prefiltered_verdicts_are_not_reused_once_the_prefilter_is_off(store):
+    server = start_server()
+    try:
+        prefilter = PreFilter()
+        client = MatchClient(cache=ResultCache(), prefilter=prefilter, store=store, local_fallback=False)
+        endpoint = build_endpoint(server.base_url)
+        result, _ = client.match("John Smith", "John Smith", endpoint)
+        assert result['prefiltered']
+        # The app records pre-filtered verdicts in the history
+        store.put("John Smith", "John Smith", result)
+        store.flush()
+
+        prefilter.configure(enabled=False)
+        result, error = client.match("John Smith", "John Smith", endpoint)
+        assert error is None
+        assert not result.get('cached') and not result.get('prefiltered')
+        assert server.stats['requests'] == 1
+    finally:
+        server.shutdown()
+
+
+def test_failed_writes_are_reported_and_retried(store):
+    with sqlite3.connect(store.path) as connection:
+        connection.execute("DROP TABLE results")
+    store.put("John Smith", "Jon Smith", API_RESULT)
+    assert wait_for(lambda: store.stats()['failed_batches'] >= 1)
+    assert "no such table" in store.stats()['last_error']
+    assert store.get("John Smith", "Jon Smith") is not None
+
+    with sqlite3.connect(store.path) as connection:
+        connection.executescript(_SCHEMA)
+    assert wait_for(lambda: store.stats()['writes'] == 1)
+    assert store.stats()['pending'] == 0
+    assert store.stats()['dropped'] == 0
+    assert store.count() == 1
+
+
+def test_rows_are_dropped_after_bounded_retries(store):
+    with sqlite3.connect(store.path) as connection:
+        connection.execute("DROP TABLE results")
+    store.put("John Smith", "Jon Smith", API_RESULT)
+    assert wait_for(lambda: store.stats()['dropped'] == 1)
+    assert store.stats()['failed_batches'] == MAX_WRITE_RETRIES + 1
+    assert store.stats()['pending'] == 0
@@ -0,0 +1,36 @@
+import pytest
+
+from results_table import ColumnarResults
+
+ROWS = [
+    {'name1': "Ann", 'name2': "Anne", 'is_match': "yes", 'confidence_score': 0.9},
+    {'name1': "Bob", 'name2': "Rob", 'error': "API Error: 503"},
+    {'name1': "cal", 'name2': "Cal", 'is_match': "yes", 'confidence_score': 1.0},
+    {'name1': "Dee", 'name2': "Di", 'is_match': "no", 'confidence_score': 0.4},
+    {'name1': "Eve", 'name2': "Ava", 'error': "Timeout Error"},
+    {'name1': "Fay", 'name2': "Faye", 'is_match': "yes", 'confidence_score': 0.9},
+]
+
+
+@pytest.fixture
+def table():
+    return ColumnarResults.from_rows(ROWS)
+
+
+def sorted_rows(table, sort_by, descending):
+    frame, _ = table.view(page_size=len(ROWS), sort_by=sort_by, descending=descending)
+    return frame['row'].tolist()
+
+
+@pytest.mark.parametrize("descending, expected", [
+    (False, [4, 1, 6, 3, 2, 5]),
+    (True, [3, 1, 6, 4, 2, 5]),
+])
+def test_failed_rows_sort_last_and_ties_keep_row_order(table, descending, expected):
+    assert sorted_rows(table, 'confidence_score', descending) == expected
+
+
+def test_names_sort_case_insensitively_both_ways(table):
+    assert sorted_rows(table, 'name1', False) == [1, 2, 3, 4, 5, 6]
+    assert sorted_rows(table, 'name1', True) == [6, 5, 4, 3, 2, 1]
+    assert sorted_rows(table, 'row', True) == [6, 5, 4, 3, 2, 1]
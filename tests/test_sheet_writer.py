@@ -0,0 +1,68 @@
+import pytest
+
+from api_client import DEFAULT_DATA_SHEET, FALSE_DATA_SHEET, TRUE_DATA_SHEET
+from sheet_writer import DigestSet, RoutedSheetWriter, SheetSink, row_digest
+
+
+class FlakySink(SheetSink):
+    """Records appended batches; fails while ``failing`` is set"""
+
+    def __init__(self):
+        self.failing = False
+        self.batches = []
+
+    def append_rows(self, sheet_name, rows):
+        if self.failing:
+            raise OSError("quota exceeded")
+        self.batches.append((sheet_name, [(row['name1'], row['name2']) for row in rows]))
+
+
+def routed(name1, name2, sheet_name=TRUE_DATA_SHEET):
+    return {'name1': name1, 'name2': name2, 'is_match': "yes", 'confidence_score': 0.9, 'sheet_name': sheet_name}
+
+
+def test_digest_ignores_order_case_and_padding():
+    assert row_digest("John Smith", "Jon Smith") == row_digest(" jon smith ", "JOHN SMITH")
+
+
+@pytest.mark.parametrize("name1, name2", [
+    ("John Smith Jr", "John Smith Sr"),
+    ("José Pérez", "Jose Perez"),
+    ("Dr John Smith", "John Smith"),
+])
+def test_names_that_only_normalize_alike_are_distinct(name1, name2):
+    assert row_digest(name1, "Other") != row_digest(name2, "Other")
+
+
+def test_jr_and_sr_rows_are_both_written():
+    sink = FlakySink()
+    writer = RoutedSheetWriter(sink, batch_size=10, dedup=DigestSet())
+    assert writer.add(routed("John Smith Jr", "J Smith"))
+    assert writer.add(routed("John Smith Sr", "J Smith"))
+    assert not writer.add(routed("john smith jr", "J Smith"))
+    assert writer.flush() == 2
+
+
+def test_failed_flush_requeues_rows_in_order():
+    sink = FlakySink()
+    writer = RoutedSheetWriter(sink, batch_size=10, dedup=DigestSet())
+    writer.add(routed("A", "B"))
+    writer.add(routed("C", "D", FALSE_DATA_SHEET))
+    sink.failing = True
+    with pytest.raises(OSError):
+        writer.flush()
+    assert writer.stats()['buffered'] == 2
+    assert writer.stats()['failed_flushes'] == 1
+    assert writer.stats()['last_error'] == "quota exceeded"
+    # Still pending, so a retry of the same pair is not queued twice
+    assert not writer.add(routed("B", "A"))
+
+    writer.add(routed("E", "F"))
+    sink.failing = False
+    assert writer.flush() == 3
+    assert sink.batches == [
+        (TRUE_DATA_SHEET, [("A", "B"), ("E", "F")]),
+        (FALSE_DATA_SHEET, [("C", "D")]),
+    ]
+    assert writer.stats()['buffered'] == 0
+    assert not writer.add(routed("A", "B", DEFAULT_DATA_SHEET))
@@ -0,0 +1,32 @@
+import pytest
+
+from streaming_pipeline import open_sink, run_streaming_batch
+
+PAIRS = [("John Smith", "Jon Smith"), ("Ada Lovelace", "Ada Lovelace"), ("Li Wei", "Lee Wei")]
+
+
+class ScriptedClient:
+    """Stands in for MatchClient.match; pairs in ``failing`` come back as errors"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls = []
+
+    def match(self, name1, name2, endpoint):
+        self.calls.append(name1)
+        if name1 in self.failing:
+            return None, "API Error: 503 - Service Unavailable"
+        return {'is_match': "yes", 'confidence_score': 0.9, 'reason': "scripted"}, None
+
+
+@pytest.mark.parametrize("extension", ["ndjson", "csv"])
+def test_resume_retries_failed_rows_only(tmp_path, extension):
+    path = str(tmp_path / f"results.{extension}")
+    first = run_streaming_batch(PAIRS, open_sink(path), client=ScriptedClient(failing={"Li Wei"}), concurrency=2)
+    assert (first['processed'], first['errors']) == (3, 1)
+
+    client = ScriptedClient()
+    second = run_streaming_batch(PAIRS, open_sink(path), client=client, concurrency=2)
+    assert client.calls == ["Li Wei"]
+    assert (second['skipped'], second['processed'], second['errors']) == (2, 1, 0)
+    assert len(open_sink(path).completed_rows()) == 3